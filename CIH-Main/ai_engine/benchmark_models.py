@@ -0,0 +1,168 @@
+"""
+RUL MODEL BENCHMARK
+===================
+Scores every .joblib model in this directory on all available FD test
+sets (last observed cycle vs. the true RUL file) and measures what it
+costs to serve:
+
+- load time (median of --load-repeats joblib.load calls)
+- single-row latency p50/p99 and throughput, as the streaming path calls it
+- batch throughput on --batch-rows rows
+
+Files that are not models (feature_info.joblib) are skipped. Each model
+gets the feature columns it was trained on (see model_feature_columns).
+The JSON report is sorted and carries library versions and a hash of
+each model file, so reports from different commits can be diffed.
+
+Run from this directory (dataset paths are relative):
+    python benchmark_models.py --output benchmark_report.json
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+import platform
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import sklearn
+import joblib
+
+from evaluation import rmse, mae, r2, nasa_score, model_feature_columns, available_test_sets, latency_percentiles
+
+
+def file_sha256(path) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def timed_load(path, repeats=3):
+    """(model, median load seconds)"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model = joblib.load(path)
+        timings.append(time.perf_counter() - start)
+    return model, float(np.median(timings))
+
+
+def batch_throughput(predict, X, repeats=5) -> float:
+    """Rows per second, best of `repeats` after one warm-up call"""
+    predict(X)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(X)
+        best = min(best, time.perf_counter() - start)
+    return len(X) / best
+
+
+def benchmark_model(path, test_sets, batch_rows=10_000, latency_samples=500, load_repeats=3):
+    model, load_seconds = timed_load(path, load_repeats)
+    if not hasattr(model, 'predict'):
+        return None
+    any_X = next(iter(test_sets.values()))[0]
+    columns = model_feature_columns(model, any_X.columns)
+
+    entry = {
+        'model': os.path.basename(path),
+        'sha256': file_sha256(path),
+        'type': type(model).__name__,
+        'features': len(columns),
+        'file_bytes': os.path.getsize(path),
+        'load_ms': load_seconds * 1e3,
+        'test': {}
+    }
+    if hasattr(model, 'get_booster'):
+        entry['trees'] = model.get_booster().num_boosted_rounds()
+
+    for name, (X_test, rul_true) in test_sets.items():
+        pred = model.predict(X_test[columns])
+        entry['test'][name] = {
+            'engines': len(rul_true),
+            'rmse': rmse(rul_true, pred),
+            'mae': mae(rul_true, pred),
+            'r2': r2(rul_true, pred),
+            'nasa_score': nasa_score(rul_true, pred)
+        }
+
+    X_all = pd.concat([X[columns] for X, _ in test_sets.values()], ignore_index=True)
+    latency = latency_percentiles(model.predict, X_all, n=latency_samples)
+    entry['single_row'] = {**latency, 'rows_per_second': 1e3 / latency['mean_ms']}
+    X_batch = X_all.iloc[np.arange(batch_rows) % len(X_all)].reset_index(drop=True)
+    entry['batch'] = {'rows': batch_rows, 'rows_per_second': batch_throughput(model.predict, X_batch)}
+    return entry
+
+
+def run_benchmark(pattern='*.joblib', batch_rows=10_000, latency_samples=500, load_repeats=3, use_cache=True):
+    test_sets = available_test_sets(use_cache)
+    if not test_sets:
+        raise ValueError("No test sets found (need test_FDxxx.txt and RUL_FDxxx.txt)")
+    print(f"Test sets: {', '.join(f'{n} ({len(r)} engines)' for n, (_, r) in test_sets.items())}")
+
+    results, skipped = [], []
+    for path in sorted(glob.glob(pattern)):
+        entry = benchmark_model(path, test_sets, batch_rows, latency_samples, load_repeats)
+        if entry is None:
+            skipped.append(os.path.basename(path))
+            print(f"  - {path}: not a model, skipped")
+            continue
+        print(f"  ✓ {path}")
+        results.append(entry)
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': sys.platform,
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'xgboost': xgb.__version__,
+            'sklearn': sklearn.__version__
+        },
+        'settings': {'batch_rows': batch_rows, 'latency_samples': latency_samples, 'load_repeats': load_repeats},
+        'test_sets': sorted(test_sets),
+        'models': results,
+        'skipped': skipped
+    }
+
+
+def print_report(report):
+    print("\n" + "=" * 110)
+    print("MODEL BENCHMARK")
+    print("=" * 110)
+    names = report['test_sets']
+    header = f"{'model':<38} {'load ms':>8} "
+    header += "".join(f"{n + ' RMSE':>11}{'NASA':>8}" for n in names)
+    header += f" {'p50 ms':>7} {'p99 ms':>7} {'row/s':>7} {'batch row/s':>12}"
+    print(header)
+    for m in report['models']:
+        line = f"{m['model']:<38} {m['load_ms']:>8.1f} "
+        line += "".join(f"{m['test'][n]['rmse']:>11.2f}{m['test'][n]['nasa_score']:>8.0f}" for n in names)
+        line += (f" {m['single_row']['p50_ms']:>7.3f} {m['single_row']['p99_ms']:>7.3f} "
+                 f"{m['single_row']['rows_per_second']:>7.0f} {m['batch']['rows_per_second']:>12.0f}")
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark accuracy and inference speed of the saved models')
+    parser.add_argument('--models', default='*.joblib', help='Glob of model files')
+    parser.add_argument('--batch-rows', type=int, default=10_000, help='Rows per batch prediction')
+    parser.add_argument('--latency-samples', type=int, default=500, help='Single-row predictions timed')
+    parser.add_argument('--load-repeats', type=int, default=3)
+    parser.add_argument('--no-cache', action='store_true', help='Recompute features')
+    parser.add_argument('--output', default='benchmark_report.json')
+    args = parser.parse_args()
+
+    report = run_benchmark(args.models, args.batch_rows, args.latency_samples, args.load_repeats,
+                           use_cache=not args.no_cache)
+    print_report(report)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"\n✓ Report saved to: {args.output}")
@@ -18,11 +18,17 @@ import numpy as np
 import xgboost as xgb
 import joblib
 import os
-from sklearn.model_selection import train_test_split
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.model_selection import GroupShuffleSplit
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import warnings
 warnings.filterwarnings('ignore')
 
+from features import SENSOR_MAP, ChunkedFeatures, add_features
+
 # ============================================================================
 # NASA C-MAPSS SENSOR ABBREVIATIONS
 # ============================================================================
@@ -78,10 +84,135 @@ DATASET_PATHS = {
     }
 }
 
-def load_and_process_data(filepath):
+# ============================================================================
+# FEATURE SPECIFICATION & CACHE
+# ============================================================================
+
+# Everything that changes the engineered features. Bump "version" when the
+# feature code changes in a way these fields do not capture.
+FEATURE_SPEC = {
+    'version': 2,
+    'rolling_window': 10,
+    'rul_clip': 125,
+    'derivatives': True
+}
+
+# Engineered feature matrices (float32 .npy + column metadata), keyed by
+# source file hash and FEATURE_SPEC
+FEATURE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.feature_cache')
+
+# Rows read at a time when building a cache entry: memory per build is
+# bounded by this and the number of engines, not by the file size
+FEATURE_CHUNK_ROWS = 100_000
+
+def feature_cache_key(filepath):
+    """sha256 of the source file contents and the feature spec"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    digest.update(json.dumps(FEATURE_SPEC, sort_keys=True).encode())
+    return digest.hexdigest()[:32]
+
+def _cache_paths(filepath):
+    key = feature_cache_key(filepath)
+    stem = os.path.join(FEATURE_CACHE_DIR, f"{os.path.basename(filepath).rsplit('.', 1)[0]}-{key}")
+    return stem + '.npy', stem + '.json'
+
+def build_feature_cache(filepath, chunk_rows=FEATURE_CHUNK_ROWS):
     """
-    Load NASA C-MAPSS data and perform comprehensive preprocessing
+    Engineer features for one file and store them as a float32 matrix, the
+    same as load_and_process_data() would produce, reading `chunk_rows`
+    rows at a time. Returns the cache paths. Runs in worker processes, so
+    only paths (not frames) travel back to the parent.
     """
+    npy_path, meta_path = _cache_paths(filepath)
+    if os.path.exists(npy_path) and os.path.exists(meta_path):
+        return npy_path, meta_path
+    
+    # Pass 1: each engine's last cycle (for the RUL label) and the row count
+    max_cycles, rows = None, 0
+    for chunk in read_raw_data(filepath, usecols=['unit_nr', 'time_cycles'], chunksize=chunk_rows):
+        last = chunk.groupby('unit_nr')['time_cycles'].max()
+        max_cycles = last if max_cycles is None else pd.concat([max_cycles, last]).groupby(level=0).max()
+        rows += len(chunk)
+    if rows == 0:
+        raise ValueError(f"{filepath}: empty dataset")
+    
+    # Pass 2: features chunk by chunk into a memory-mapped matrix. Write to
+    # temporary names first so readers never see partial files
+    os.makedirs(FEATURE_CACHE_DIR, exist_ok=True)
+    pid = os.getpid()
+    features = ChunkedFeatures(list(SENSOR_MAP.values()), window=FEATURE_SPEC['rolling_window'],
+                               derivatives=FEATURE_SPEC['derivatives'])
+    matrix, meta, row = None, None, 0
+    for chunk in read_raw_data(filepath, chunksize=chunk_rows):
+        df = features.add_features(prepare_data(chunk, max_cycles))
+        if matrix is None:
+            meta = {
+                'source': os.path.abspath(filepath),
+                'spec': FEATURE_SPEC,
+                'columns': list(df.columns),
+                'int_columns': [c for c in df.columns if pd.api.types.is_integer_dtype(df[c])]
+            }
+            matrix = np.lib.format.open_memmap(f"{npy_path}.{pid}.tmp.npy", mode='w+', dtype=np.float32,
+                                               shape=(rows, len(df.columns)))
+        matrix[row:row + len(df)] = df.to_numpy(dtype=np.float32)
+        row += len(df)
+    matrix.flush()
+    del matrix
+    with open(f"{meta_path}.{pid}.tmp", 'w') as f:
+        json.dump(meta, f)
+    os.replace(f"{npy_path}.{pid}.tmp.npy", npy_path)
+    os.replace(f"{meta_path}.{pid}.tmp", meta_path)
+    return npy_path, meta_path
+
+def read_feature_cache(npy_path, meta_path):
+    with open(meta_path) as f:
+        meta = json.load(f)
+    df = pd.DataFrame(np.load(npy_path), columns=meta['columns'])
+    for col in meta['int_columns']:
+        df[col] = df[col].astype(np.int64)
+    return df
+
+def load_features(filepath, use_cache=True):
+    """load_and_process_data() through the feature cache"""
+    if not use_cache:
+        return load_and_process_data(filepath)
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"Dataset not found: {os.path.abspath(filepath)}")
+    return read_feature_cache(*build_feature_cache(filepath))
+
+def load_datasets(kind='train', use_cache=True, workers=None):
+    """
+    Load and engineer features for every dataset's `kind` file ('train' or
+    'test'), building missing cache entries in a process pool.
+    
+    Returns ({dataset_name: DataFrame}, {dataset_name: error}).
+    """
+    frames, errors = {}, {}
+    pending = {}
+    for name, paths in DATASET_PATHS.items():
+        filepath = paths[kind]
+        if not os.path.exists(filepath):
+            errors[name] = FileNotFoundError(f"Dataset not found: {os.path.abspath(filepath)}")
+        else:
+            pending[name] = filepath
+    
+    build = build_feature_cache if use_cache else load_and_process_data
+    if len(pending) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers or min(len(pending), os.cpu_count() or 1)) as pool:
+            futures = {name: pool.submit(build, filepath) for name, filepath in pending.items()}
+            results = {name: future.result() for name, future in futures.items()}
+    else:
+        results = {name: build(filepath) for name, filepath in pending.items()}
+    
+    for name, result in results.items():
+        frames[name] = read_feature_cache(*result) if use_cache else result
+    return frames, errors
+
+def read_raw_data(filepath, **kwargs):
+    """Raw NASA C-MAPSS file (extra keyword arguments go to read_csv, e.g. chunksize)"""
     # Standard NASA columns
     index_names = ['unit_nr', 'time_cycles']
     setting_names = ['setting_1', 'setting_2', 'setting_3']
@@ -90,60 +221,39 @@ def load_and_process_data(filepath):
     
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"Dataset not found: {os.path.abspath(filepath)}")
+    return pd.read_csv(filepath, sep=r'\s+', header=None, names=col_names, **kwargs)
+
+def prepare_data(df, max_cycles):
+    """
+    RUL label, sensor names and column selection for raw rows.
+    `max_cycles` maps unit_nr to the engine's last cycle in the file.
+    """
+    # Calculate RUL, clipped to max 125 (as per NASA recommendations)
+    df = df.assign(RUL=(df['unit_nr'].map(max_cycles) - df['time_cycles']).clip(upper=FEATURE_SPEC['rul_clip']))
     
-    # Load data
-    df = pd.read_csv(filepath, sep=r'\s+', header=None, names=col_names)
-    
-    # Calculate RUL
-    max_cycles = df.groupby('unit_nr')['time_cycles'].max().reset_index()
-    max_cycles.columns = ['unit_nr', 'max']
-    df = df.merge(max_cycles, on='unit_nr', how='left')
-    df['RUL'] = df['max'] - df['time_cycles']
-    
-    # Clip RUL to max 125 (as per NASA recommendations)
-    df['RUL'] = df['RUL'].clip(upper=125)
-    
-    # Rename sensors to meaningful names
-    sensor_map = {
-        's_2': 'LPC_Outlet_Temp',
-        's_3': 'HPC_Outlet_Temp',
-        's_4': 'LPT_Outlet_Temp',
-        's_7': 'HPC_Outlet_Pressure',
-        's_8': 'Fan_Speed',
-        's_9': 'Core_Speed',
-        's_11': 'Combustion_Pressure',
-        's_12': 'Fuel_Flow_Ratio',
-        's_13': 'Corrected_Fan_Speed',
-        's_14': 'Corrected_Core_Speed',
-        's_15': 'Bypass_Ratio',
-        's_17': 'Bleed_Enthalpy',
-        's_20': 'HPT_Coolant_Bleed',
-        's_21': 'LPT_Coolant_Bleed'  # This is vibration-related
-    }
-    df = df.rename(columns=sensor_map)
+    # Rename sensors to meaningful names (s_21, LPT coolant bleed, is the vibration proxy)
+    df = df.rename(columns=SENSOR_MAP)
     
     # Drop useless columns (constant or very low variance)
-    drop_cols = ['max', 'setting_1', 'setting_2', 'setting_3',
+    drop_cols = ['setting_1', 'setting_2', 'setting_3',
                  's_1', 's_5', 's_6', 's_10', 's_16', 's_18', 's_19']
-    df = df.drop(columns=[c for c in drop_cols if c in df.columns])
-    
-    # Feature Engineering: Rolling averages (temporal features)
-    sensors = list(sensor_map.values())
-    df_rolling = df.groupby('unit_nr')[sensors].rolling(window=10, min_periods=1).mean().reset_index(drop=True)
-    df_rolling.columns = [f"{col}_mean" for col in sensors]
-    df = pd.concat([df, df_rolling], axis=1)
-    
-    # Additional features: Rate of change
-    df_diff = df.groupby('unit_nr')[sensors].diff().reset_index(drop=True)
-    df_diff.columns = [f"{col}_diff" for col in sensors]
-    df = pd.concat([df, df_diff], axis=1)
+    return df.drop(columns=[c for c in drop_cols if c in df.columns])
+
+def load_and_process_data(filepath):
+    """
+    Load NASA C-MAPSS data and perform comprehensive preprocessing
+    """
+    df = read_raw_data(filepath)
+    df = prepare_data(df, df.groupby('unit_nr')['time_cycles'].max())
     
-    # Fill NaN values from diff operation
-    df = df.fillna(0)
+    # Feature Engineering: rolling averages (temporal features) and rate of
+    # change, shared with the serving path (see features.py)
+    df = add_features(df, list(SENSOR_MAP.values()), window=FEATURE_SPEC['rolling_window'],
+                      derivatives=FEATURE_SPEC['derivatives'])
     
     return df
 
-def train_multi_dataset_model():
+def train_multi_dataset_model(use_cache=True, workers=None):
     """
     Train a unified model on ALL NASA C-MAPSS datasets
     """
@@ -154,17 +264,16 @@ def train_multi_dataset_model():
     
     all_train_data = []
     
-    # Load all training datasets
-    for dataset_name, paths in DATASET_PATHS.items():
-        print(f"\nProcessing {dataset_name}...")
-        try:
-            df = load_and_process_data(paths['train'])
-            df['dataset'] = dataset_name  # Add dataset identifier
-            all_train_data.append(df)
-            print(f"  ✓ {dataset_name}: {len(df)} samples, {df['unit_nr'].nunique()} engines")
-        except FileNotFoundError as e:
-            print(f"  ✗ {dataset_name}: {e}")
+    # Load all training datasets (in parallel, through the feature cache)
+    frames, errors = load_datasets('train', use_cache=use_cache, workers=workers)
+    for dataset_name in DATASET_PATHS:
+        if dataset_name in errors:
+            print(f"  ✗ {dataset_name}: {errors[dataset_name]}")
             continue
+        df = frames[dataset_name]
+        df['dataset'] = dataset_name  # Add dataset identifier
+        all_train_data.append(df)
+        print(f"  ✓ {dataset_name}: {len(df)} samples, {df['unit_nr'].nunique()} engines")
     
     if not all_train_data:
         raise ValueError("No datasets could be loaded!")
@@ -187,10 +296,12 @@ def train_multi_dataset_model():
           f"{len([c for c in feature_cols if '_diff' in c])} derivatives, "
           f"{len([c for c in feature_cols if '_mean' not in c and '_diff' not in c])} original")
     
-    # Split for validation
-    X_train, X_val, y_train, y_val = train_test_split(
-        X, y, test_size=0.15, random_state=42
-    )
+    # Split for validation by engine, so no engine has cycles on both sides
+    # (see tune_model.py for grouped cross-validation and parameter search)
+    groups = combined_df['dataset'] + ':' + combined_df['unit_nr'].astype(str)
+    train_idx, val_idx = next(GroupShuffleSplit(n_splits=1, test_size=0.15, random_state=42).split(X, y, groups))
+    X_train, X_val = X.iloc[train_idx], X.iloc[val_idx]
+    y_train, y_val = y.iloc[train_idx], y.iloc[val_idx]
     
     # Train XGBoost model
     print("\nTraining XGBoost model...")
@@ -282,67 +393,49 @@ def train_multi_dataset_model():
     
     return model, feature_importance
 
-def test_on_individual_datasets(model):
+def test_on_individual_datasets(model, use_cache=True):
     """
     Test the multi-dataset model on individual test sets
+    (last observed cycle of each engine vs. the true RUL file)
     """
+    # evaluation imports this module, so import it here
+    from evaluation import rmse, mae, r2, nasa_score, load_test_set, model_feature_columns
+    
     print("\n" + "="*80)
     print("TESTING ON INDIVIDUAL DATASETS")
     print("="*80)
     
-    for dataset_name, paths in DATASET_PATHS.items():
+    for dataset_name in DATASET_PATHS:
         try:
             print(f"\n{dataset_name} Test Set:")
             print("-" * 50)
             
-            # Load test data
-            test_df = load_and_process_data(paths['test'])
-            
-            # Load ground truth RUL
-            rul_true = pd.read_csv(paths['rul'], header=None)[0].values
-            
-            # Get last cycle of each engine
-            last_cycles = test_df.groupby('unit_nr').last().reset_index()
-            
-            # Prepare features
-            feature_cols = [col for col in last_cycles.columns 
-                           if col not in ['unit_nr', 'time_cycles', 'RUL', 'dataset']]
-            X_test = last_cycles[feature_cols]
-            
-            # Predict
-            predictions = model.predict(X_test)
-            
-            # Calculate metrics
-            rmse = np.sqrt(mean_squared_error(rul_true, predictions))
-            mae = mean_absolute_error(rul_true, predictions)
-            r2 = r2_score(rul_true, predictions)
-            
-            # NASA scoring function (asymmetric)
-            errors = predictions - rul_true
-            scores = []
-            for error in errors:
-                if error < 0:  # Early prediction
-                    scores.append(np.exp(-error/13) - 1)
-                else:  # Late prediction (more penalty)
-                    scores.append(np.exp(error/10) - 1)
-            nasa_score = np.sum(scores)
+            X_test, rul_true = load_test_set(dataset_name, use_cache=use_cache)
+            predictions = model.predict(X_test[model_feature_columns(model, X_test.columns)])
             
             print(f"  Engines: {len(rul_true)}")
-            print(f"  RMSE: {rmse:.2f} cycles")
-            print(f"  MAE:  {mae:.2f} cycles")
-            print(f"  R²:   {r2:.4f}")
-            print(f"  NASA Score: {nasa_score:.2f} (lower is better)")
+            print(f"  RMSE: {rmse(rul_true, predictions):.2f} cycles")
+            print(f"  MAE:  {mae(rul_true, predictions):.2f} cycles")
+            print(f"  R²:   {r2(rul_true, predictions):.4f}")
+            print(f"  NASA Score: {nasa_score(rul_true, predictions):.2f} (lower is better)")
             
         except FileNotFoundError:
             print(f"  ✗ Test files not found")
             continue
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train the multi-dataset RUL model')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processes for feature engineering (default: one per dataset)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'Recompute features instead of using {FEATURE_CACHE_DIR}')
+    args = parser.parse_args()
+    
     # Train the model
-    model, feature_importance = train_multi_dataset_model()
+    model, feature_importance = train_multi_dataset_model(use_cache=not args.no_cache, workers=args.workers)
     
     # Test on individual datasets
-    test_on_individual_datasets(model)
+    test_on_individual_datasets(model, use_cache=not args.no_cache)
     
     print("\n" + "="*80)
     print("TRAINING COMPLETE!")
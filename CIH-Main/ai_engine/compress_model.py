@@ -0,0 +1,181 @@
+"""
+RUL MODEL COMPRESSION
+=====================
+Builds smaller variants of a trained model for the per-reading streaming
+path and reports what each one costs in accuracy and buys in latency.
+
+Variants:
+1. truncation   - the first N boosting rounds of the teacher (booster[:N])
+2. pruning      - the teacher with splits whose loss reduction is below
+                  gamma collapsed (XGBoost 'prune' updater, no retraining)
+3. distillation - a shallow student ensemble fitted to the teacher's
+                  predictions on the training features
+
+Each variant is scored on the FD test sets (last cycle vs. true RUL), and
+timed on single rows (as the streaming path calls it) and on a batch.
+Single-row latency is mostly fixed per-call overhead, so the per-row
+batch cost is what reflects the size of the ensemble.
+
+The cheapest variant within --max-rmse-increase of the teacher's mean
+test RMSE is saved; serve it with
+    AEGISFLOW_STREAM_MODEL_PATH=ai_engine/stream_rul_predictor.joblib
+while batch uploads keep the full model.
+
+Run from this directory (dataset paths are relative):
+    python compress_model.py --model rul_predictor.joblib
+"""
+
+import json
+import time
+import argparse
+
+import numpy as np
+import xgboost as xgb
+import joblib
+
+from tune_model import load_training_data
+from evaluation import rmse, nasa_score, model_feature_columns, available_test_sets, latency_percentiles
+
+
+def as_regressor(booster):
+    """Wrap a Booster in the sklearn estimator the backend loads"""
+    model = xgb.XGBRegressor()
+    model.load_model(bytearray(booster.save_raw('ubj')))
+    return model
+
+
+def model_size(model) -> dict:
+    trees = model.get_booster().trees_to_dataframe()
+    return {
+        'trees': int(trees['Tree'].nunique()),
+        'leaves': int((trees['Feature'] == 'Leaf').sum()),
+        'bytes': len(model.get_booster().save_raw('ubj'))
+    }
+
+
+def truncate(teacher, n_trees):
+    return as_regressor(teacher.get_booster()[:n_trees])
+
+
+def prune(teacher, X, y, gamma):
+    """Collapse splits with gain < gamma, re-evaluated on (X, y)"""
+    booster = teacher.get_booster().copy()
+    pruned = xgb.train(
+        {'process_type': 'update', 'updater': 'prune', 'gamma': gamma},
+        xgb.DMatrix(X, label=y),
+        num_boost_round=booster.num_boosted_rounds(),
+        xgb_model=booster
+    )
+    return as_regressor(pruned)
+
+
+def distill(teacher, X, max_depth, n_estimators, learning_rate=0.1, seed=42):
+    """Student trained on the teacher's outputs instead of the true RUL"""
+    student = xgb.XGBRegressor(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        learning_rate=learning_rate,
+        objective='reg:squarederror',
+        tree_method='hist',
+        random_state=seed
+    )
+    student.fit(X, teacher.predict(X), verbose=False)
+    return student
+
+
+def evaluate(name, model, teacher, test_sets, X_batch, repeats=5):
+    entry = {'variant': name, **model_size(model), 'test': {}}
+    for set_name, (X_test, rul_true) in test_sets.items():
+        pred = model.predict(X_test)
+        entry['test'][set_name] = {
+            'rmse': rmse(rul_true, pred),
+            'nasa_score': nasa_score(rul_true, pred),
+            'teacher_rmse': rmse(teacher.predict(X_test), pred)  # agreement with the full model
+        }
+    entry['mean_test_rmse'] = float(np.mean([t['rmse'] for t in entry['test'].values()]))
+    entry['latency'] = latency_percentiles(model.predict, X_batch)
+    timings = []
+    for _ in range(repeats + 1):
+        start = time.perf_counter()
+        model.predict(X_batch)
+        timings.append(time.perf_counter() - start)
+    entry['batch_us_per_row'] = min(timings[1:]) / len(X_batch) * 1e6
+    return entry
+
+
+def compress(model_path, tree_counts, prune_gammas, distill_depths, distill_rounds, use_cache=True):
+    teacher = joblib.load(model_path)
+    X, y, _ = load_training_data(use_cache)
+    columns = model_feature_columns(teacher, X.columns)
+    X = X[columns]
+    test_sets = {name: (X_test[columns], rul) for name, (X_test, rul) in available_test_sets(use_cache).items()}
+    n_rounds = teacher.get_booster().num_boosted_rounds()
+    print(f"Teacher: {model_path}, {n_rounds} trees, {len(columns)} features; "
+          f"{len(X)} training rows, test sets: {', '.join(test_sets)}")
+
+    variants = [('full', teacher)]
+    variants += [(f'truncate-{n}', truncate(teacher, n)) for n in tree_counts if n < n_rounds]
+    variants += [(f'prune-gamma{g:g}', prune(teacher, X, y, g)) for g in prune_gammas]
+    for depth in distill_depths:
+        start = time.perf_counter()
+        student = distill(teacher, X, depth, distill_rounds)
+        print(f"  distilled depth {depth} x {distill_rounds} trees in {time.perf_counter() - start:.1f}s")
+        variants.append((f'distill-d{depth}', student))
+
+    results = [evaluate(name, model, teacher, test_sets, X) for name, model in variants]
+    return results, dict(variants)
+
+
+def choose(results, max_rmse_increase):
+    """Cheapest variant (batch cost) within the accuracy tolerance of the full model"""
+    limit = results[0]['mean_test_rmse'] + max_rmse_increase
+    eligible = [r for r in results if r['mean_test_rmse'] <= limit]
+    return min(eligible, key=lambda r: r['batch_us_per_row'])
+
+
+def print_report(results, chosen):
+    print("\n" + "=" * 100)
+    print("ACCURACY VS. LATENCY")
+    print("=" * 100)
+    test_names = sorted({name for r in results for name in r['test']})
+    header = f"{'variant':<16} {'trees':>5} {'leaves':>6} {'KB':>6} "
+    header += "".join(f"{name + ' RMSE':>11}{'NASA':>8}" for name in test_names)
+    header += f" {'p50 ms':>7} {'p99 ms':>7} {'batch us/row':>13}"
+    print(header)
+    for r in results:
+        line = f"{r['variant']:<16} {r['trees']:>5} {r['leaves']:>6} {r['bytes'] / 1024:>6.0f} "
+        line += "".join(f"{r['test'][n]['rmse']:>11.2f}{r['test'][n]['nasa_score']:>8.0f}" for n in test_names)
+        line += f" {r['latency']['p50_ms']:>7.3f} {r['latency']['p99_ms']:>7.3f} {r['batch_us_per_row']:>13.2f}"
+        if r is chosen:
+            line += "  <- streaming"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compress the RUL model for low-latency streaming inference')
+    parser.add_argument('--model', default='rul_predictor.joblib', help='Teacher model')
+    parser.add_argument('--trees', type=int, nargs='*', default=[10, 25, 50], help='Truncation tree counts')
+    parser.add_argument('--prune-gammas', type=float, nargs='*', default=[200, 1000], help='Pruning thresholds')
+    parser.add_argument('--distill-depths', type=int, nargs='*', default=[2, 3], help='Student tree depths')
+    parser.add_argument('--distill-rounds', type=int, default=50, help='Student trees')
+    parser.add_argument('--max-rmse-increase', type=float, default=1.0, help='Allowed mean test RMSE loss')
+    parser.add_argument('--no-cache', action='store_true', help='Recompute features')
+    parser.add_argument('--output', default='stream_rul_predictor.joblib', help='Chosen streaming model')
+    parser.add_argument('--report', default='compression_report.json')
+    args = parser.parse_args()
+
+    print("=" * 100)
+    print("RUL MODEL COMPRESSION")
+    print("=" * 100)
+    results, models = compress(
+        args.model, args.trees, args.prune_gammas, args.distill_depths, args.distill_rounds,
+        use_cache=not args.no_cache
+    )
+    chosen = choose(results, args.max_rmse_increase)
+    print_report(results, chosen)
+
+    joblib.dump(models[chosen['variant']], args.output)
+    print(f"\n✓ Streaming model ({chosen['variant']}) saved to: {args.output}")
+    with open(args.report, 'w') as f:
+        json.dump({'teacher': args.model, 'chosen': chosen['variant'], 'results': results}, f, indent=2)
+    print(f"✓ Report saved to: {args.report}")
@@ -0,0 +1,102 @@
+"""
+MODEL EVALUATION HELPERS
+========================
+Vectorized accuracy metrics, test-set loading and latency measurement
+shared by the training, tuning and benchmarking scripts.
+
+NASA scoring function (PHM08): asymmetric exponential penalty where late
+predictions (predicted RUL > true RUL) cost more than early ones.
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from comprehensive_train_model import DATASET_PATHS, load_features
+
+NON_FEATURE_COLS = ['unit_nr', 'time_cycles', 'RUL', 'dataset']
+
+
+def rmse(y_true, y_pred) -> float:
+    d = np.asarray(y_pred, dtype=np.float64) - np.asarray(y_true, dtype=np.float64)
+    return float(np.sqrt(np.mean(d * d)))
+
+
+def mae(y_true, y_pred) -> float:
+    return float(np.mean(np.abs(np.asarray(y_pred, dtype=np.float64) - np.asarray(y_true, dtype=np.float64))))
+
+
+def r2(y_true, y_pred) -> float:
+    y_true = np.asarray(y_true, dtype=np.float64)
+    d = np.asarray(y_pred, dtype=np.float64) - y_true
+    return float(1 - np.sum(d * d) / np.sum((y_true - y_true.mean()) ** 2))
+
+
+def nasa_score(y_true, y_pred) -> float:
+    """Sum of exp(-d/13)-1 for early (d < 0) and exp(d/10)-1 for late predictions, d = pred - true"""
+    d = np.asarray(y_pred, dtype=np.float64) - np.asarray(y_true, dtype=np.float64)
+    return float(np.sum(np.where(d < 0, np.expm1(-d / 13), np.expm1(d / 10))))
+
+
+def feature_columns(df) -> list:
+    return [c for c in df.columns if c not in NON_FEATURE_COLS]
+
+
+def model_feature_columns(model, columns) -> list:
+    """
+    Columns a model was trained on. Models fitted on numpy arrays carry no
+    names; they were trained on a prefix of the feature layout (sensors,
+    rolling means, derivatives), so the first n_features_in_ columns.
+    """
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None:
+        return list(names)
+    return list(columns)[:model.n_features_in_]
+
+
+def load_test_set(dataset_name, use_cache=True):
+    """
+    Last observed cycle of every test engine with its true RUL from the
+    RUL_FDxxx file. Returns (features DataFrame, true RUL array).
+
+    Only the feature columns are used: the RUL column computed by
+    load_and_process_data() assumes run-to-failure data and is wrong for
+    the truncated test trajectories.
+    """
+    paths = DATASET_PATHS[dataset_name]
+    test_df = load_features(paths['test'], use_cache=use_cache)
+    rul_true = pd.read_csv(paths['rul'], header=None)[0].to_numpy(dtype=np.float64)
+    last = test_df.drop_duplicates('unit_nr', keep='last').sort_values('unit_nr')
+    return last[feature_columns(last)].reset_index(drop=True), rul_true
+
+
+def available_test_sets(use_cache=True) -> dict:
+    """{dataset_name: (X, rul_true)} for every dataset whose test and RUL files exist"""
+    sets = {}
+    for name, paths in DATASET_PATHS.items():
+        if os.path.exists(paths['test']) and os.path.exists(paths['rul']):
+            sets[name] = load_test_set(name, use_cache=use_cache)
+    return sets
+
+
+def latency_percentiles(predict, X, n=200, warmup=20) -> dict:
+    """
+    Single-row latency of `predict` (called with 1-row slices of X, as the
+    streaming path does). Returns p50/p99/mean in milliseconds.
+    """
+    rows = [X.iloc[[i % len(X)]] if hasattr(X, 'iloc') else X[i % len(X):i % len(X) + 1]
+            for i in range(n)]
+    for row in rows[:warmup]:
+        predict(row)
+    timings = np.empty(n)
+    for i, row in enumerate(rows):
+        start = time.perf_counter()
+        predict(row)
+        timings[i] = time.perf_counter() - start
+    return {
+        'p50_ms': float(np.percentile(timings, 50) * 1e3),
+        'p99_ms': float(np.percentile(timings, 99) * 1e3),
+        'mean_ms': float(timings.mean() * 1e3)
+    }
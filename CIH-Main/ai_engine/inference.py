@@ -1,64 +1,81 @@
-import joblib
-import pandas as pd
 import numpy as np
 import os
-from collections import deque
+import time
+import logging
+import threading
+
+try:
+    from .features import SENSORS, ROLLING_WINDOW, StreamingFeatures, feature_names
+except ImportError:  # imported from this directory
+    from features import SENSORS, ROLLING_WINDOW, StreamingFeatures, feature_names
+
+logger = logging.getLogger(__name__)
 
 MODEL_PATH = os.path.join(os.path.dirname(__file__), 'rul_predictor.joblib')
 
-# Load Model
-try:
-    model = joblib.load(MODEL_PATH)
-    print("AI Engine: Hybrid Model loaded.")
-except Exception as e:
-    print(f"Error: {e}")
-    model = None
+# Optional compressed model for the per-reading streaming path (see
+# compress_model.py); batch uploads keep the full model.
+STREAM_MODEL_PATH = os.environ.get('AEGISFLOW_STREAM_MODEL_PATH')
+
+# Set by load_models(). Unpickling imports xgboost, and through it
+# scikit-learn and scipy (over a second), so it happens on first use or
+# when the server calls load_models() at startup, not on import.
+model = None
+stream_model = None
+_load_lock = threading.Lock()
+_load_attempted = False
+
+def load_models():
+    """Load the model and the optional streaming model (once). Returns the model, None if it failed."""
+    global model, stream_model, _load_attempted
+    with _load_lock:
+        if _load_attempted:
+            return model
+        _load_attempted = True
+        import joblib
+        
+        try:
+            model = joblib.load(MODEL_PATH)
+            logger.info("AI Engine: Hybrid Model loaded.")
+        except Exception as e:
+            logger.error(f"AI Engine: could not load model from {MODEL_PATH}: {e}")
+            return None
+        
+        stream_model = model
+        if STREAM_MODEL_PATH:
+            try:
+                candidate = joblib.load(STREAM_MODEL_PATH)
+                if candidate.n_features_in_ != model.n_features_in_:
+                    raise ValueError(f"expects {candidate.n_features_in_} features, the main model {model.n_features_in_}")
+                stream_model = candidate
+                logger.info(f"AI Engine: streaming model loaded from {STREAM_MODEL_PATH}.")
+            except Exception as e:
+                logger.error(f"AI Engine: could not load streaming model from {STREAM_MODEL_PATH}, using the main model: {e}")
+        return model
 
 # Define the exact features the model was trained on
 # (Original Sensors + Rolling Mean Sensors)
-ORIGINAL_SENSORS = [
-    'LPC_Outlet_Temp', 'HPC_Outlet_Temp', 'LPT_Outlet_Temp', 
-    'HPC_Outlet_Pressure', 'Fan_Speed', 'Core_Speed', 
-    'Combustion_Pressure', 'Fuel_Flow_Ratio', 'Corrected_Fan_Speed', 
-    'Corrected_Core_Speed', 'Bypass_Ratio', 'Bleed_Enthalpy', 
-    'HPT_Coolant_Bleed', 'LPT_Coolant_Bleed'
-]
+ORIGINAL_SENSORS = SENSORS
 
 # This is the order the model expects
 SENSOR_ORDER = ORIGINAL_SENSORS
+FEATURE_COLUMNS = feature_names(SENSOR_ORDER)
 
 class StatefulPredictor:
     def __init__(self):
-        self.history = deque(maxlen=10)
+        # O(1) rolling state, identical to the training features
+        self.history = StreamingFeatures(len(SENSOR_ORDER), ROLLING_WINDOW)
 
-    def predict(self, current_sensor_data):
-        if model is None: return 0.0
-        
-        # 1. Update History
-        clean_row = {k: current_sensor_data.get(k, 0) for k in SENSOR_ORDER}
-        self.history.append(clean_row)
-        
-        # 2. Calculate Rolling Means
-        history_df = pd.DataFrame(list(self.history))
-        rolling_means = history_df.mean().to_dict()
-        
-        # 3. Construct Input Data
-        input_data = {}
-        for sensor in SENSOR_ORDER:
-            input_data[sensor] = clean_row[sensor]
-        for sensor in SENSOR_ORDER:
-            input_data[f"{sensor}_mean"] = rolling_means[sensor]
-            
-        # 4. Create DataFrame & FORCE Column Order
-        # This prevents the "feature_names_in_" crash
-        expected_cols = SENSOR_ORDER + [f"{s}_mean" for s in SENSOR_ORDER]
-        input_df = pd.DataFrame([input_data])
-        
-        # Select columns in the exact order training used
-        input_df = input_df[expected_cols]
+    def features(self, current_sensor_data):
+        """Add a reading to the history and return the model input row"""
+        import pandas as pd
+        row = self.history.update([current_sensor_data.get(k, 0) for k in SENSOR_ORDER])
+        # Columns in the exact order training used
+        return pd.DataFrame(row[None, :], columns=FEATURE_COLUMNS)
 
-        prediction = model.predict(input_df)
-        return float(prediction[0])
+    def predict(self, current_sensor_data):
+        if model is None and load_models() is None: return 0.0
+        return predict_stream_features(self.features(current_sensor_data))
     
     
 # Create a global instance
@@ -68,6 +85,52 @@ def predict_rul(sensor_data):
     # Wrapper function to keep compatibility with backend
     return predictor.predict(sensor_data)
 
+def build_features(sensor_data):
+    """Feature-building half of predict_rul (updates the stream history)"""
+    return predictor.features(sensor_data)
+
+def predict_features(input_df):
+    """Model half of predict_rul"""
+    if model is None and load_models() is None: return 0.0
+    prediction = model.predict(input_df)
+    return float(prediction[0])
+
+def predict_stream_features(input_df):
+    """predict_features() with the streaming model (the main model unless one is configured)"""
+    if stream_model is None and load_models() is None: return 0.0
+    prediction = stream_model.predict(input_df)
+    return float(prediction[0])
+
+def predict_matrix(X):
+    """Model half for many feature rows at once (columns as FEATURE_COLUMNS)"""
+    if model is None and load_models() is None: return np.zeros(len(X))
+    return model.predict(X)
+
+def warm_up(sample_rows, batch_sizes=(1, 16, 128), passes=2):
+    """
+    Run the feature and model paths on representative readings so lazy
+    initialization in pandas and xgboost happens before real traffic.
+    Uses a throwaway predictor: the live stream history is untouched.
+    
+    Returns {batch_size: seconds} for the last pass.
+    """
+    if model is None and load_models() is None:
+        raise RuntimeError(f"Model not loaded from {MODEL_PATH}")
+    import pandas as pd
+    
+    warm = StatefulPredictor()
+    frames = [warm.features(row) for row in sample_rows]
+    timings = {}
+    for _ in range(passes):
+        for size in batch_sizes:
+            batch = pd.concat([frames[i % len(frames)] for i in range(size)], ignore_index=True)
+            start = time.perf_counter()
+            model.predict(batch)
+            timings[size] = time.perf_counter() - start
+            if stream_model is not model:
+                stream_model.predict(batch)
+    return timings
+
 def reset_predictor():
     """Reset the predictor history to start fresh"""
     global predictor
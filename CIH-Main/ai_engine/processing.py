@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 import os
 
+from features import add_features, ROLLING_WINDOW
+
 def load_data(filepath):
     # 1. Standard Loading
     index_names = ['unit_nr', 'time_cycles']
@@ -46,17 +48,8 @@ def load_data(filepath):
     df = df.drop(columns=drop_cols)
 
     # 5. HYBRID FEATURE ENGINEERING
-    # Create Rolling Averages (Window = 10 cycles)
+    # Rolling averages (Window = 10 cycles), per engine (see features.py)
     sensors = list(sensor_map.values())
-    
-    # Group by unit_nr to ensure rolling doesn't cross between different engines
-    df_rolling = df.groupby('unit_nr')[sensors].rolling(window=10, min_periods=1).mean().reset_index()
-    
-    # Cleanup indexes and rename
-    df_rolling = df_rolling.drop(columns=['level_1', 'unit_nr']) 
-    df_rolling.columns = [f"{col}_mean" for col in sensors]
-    
-    # Join back to original data
-    df = pd.concat([df, df_rolling], axis=1)
+    df = add_features(df, sensors, window=ROLLING_WINDOW, derivatives=False)
     
     return df
\ No newline at end of file
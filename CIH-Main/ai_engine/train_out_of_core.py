@@ -0,0 +1,220 @@
+"""
+OUT-OF-CORE RUL MODEL TRAINING
+==============================
+Trains the multi-dataset model without ever holding the full dataset in
+memory, for fleet telemetry that does not fit in RAM.
+
+1. Each source file is turned into a float32 feature matrix by the feature
+   cache of comprehensive_train_model.py (worker processes, one file at a
+   time). Files are read in chunks of --chunk-rows rows, with each engine's
+   rolling-window state carried across chunk boundaries.
+2. The matrices are memory-mapped and streamed in fixed-size row chunks
+   through an XGBoost DataIter into an external-memory quantile DMatrix,
+   whose pages live on disk next to the feature cache.
+3. Validation holds out whole engines (hashed on dataset + unit), so no
+   cycle of a validation engine is seen in training.
+
+Peak memory is bounded by the chunk size (times the feature workers) and
+the quantized pages, not by the number of rows. Memory high-water marks (ru_maxrss) are printed after
+each phase.
+
+Run from this directory (dataset paths are relative):
+    python train_out_of_core.py --chunk-rows 50000
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import xgboost as xgb
+import joblib
+
+from comprehensive_train_model import DATASET_PATHS, FEATURE_CACHE_DIR, build_feature_cache
+
+# Same hyperparameters as train_multi_dataset_model()
+PARAMS = {
+    'objective': 'reg:squarederror',
+    'eta': 0.05,
+    'max_depth': 6,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'tree_method': 'hist',
+    'max_bin': 256,
+    'seed': 42
+}
+NUM_BOOST_ROUND = 200
+VALIDATION_FRACTION = 0.15
+NON_FEATURE_COLS = ['unit_nr', 'time_cycles', 'RUL', 'dataset']
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """High-water mark of resident memory in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def report_memory(phase):
+    print(f"  [memory] {phase:28s} peak RSS {peak_rss_mb():8.1f} MB "
+          f"(worker processes {peak_rss_mb(resource.RUSAGE_CHILDREN):.1f} MB)")
+
+
+def is_validation_unit(dataset_idx, units, fraction=VALIDATION_FRACTION):
+    """Deterministic per-engine split: hash (dataset, unit) into [0, 1)"""
+    h = (units.astype(np.uint64) * np.uint64(2654435761) + np.uint64(dataset_idx * 40503)) % np.uint64(2 ** 32)
+    return h.astype(np.float64) / 2 ** 32 < fraction
+
+
+class FeatureChunkIter(xgb.DataIter):
+    """
+    Streams (features, RUL) chunks of memory-mapped feature caches.
+    `subset` selects the training or the validation engines.
+    """
+
+    def __init__(self, sources, chunk_rows, subset, cache_prefix):
+        self._sources = sources  # [(dataset_idx, npy_path, meta)]
+        self._subset = subset
+        columns = sources[0][2]['columns']
+        self.feature_names = [c for c in columns if c not in NON_FEATURE_COLS]
+        self._feature_idx = [columns.index(c) for c in self.feature_names]
+        self._unit_idx = columns.index('unit_nr')
+        self._rul_idx = columns.index('RUL')
+        self._chunks = []
+        for i, (_, npy_path, _) in enumerate(sources):
+            rows = np.load(npy_path, mmap_mode='r').shape[0]
+            self._chunks.extend((i, start, min(start + chunk_rows, rows)) for start in range(0, rows, chunk_rows))
+        self._pos = 0
+        self.rows = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        while self._pos < len(self._chunks):
+            i, start, stop = self._chunks[self._pos]
+            self._pos += 1
+            dataset_idx, npy_path, _ = self._sources[i]
+            block = np.load(npy_path, mmap_mode='r')[start:stop]
+            validation = is_validation_unit(dataset_idx, block[:, self._unit_idx])
+            mask = validation if self._subset == 'val' else ~validation
+            if not mask.any():
+                continue
+            rows = block[mask]
+            self.rows += len(rows)
+            input_data(
+                data=np.ascontiguousarray(rows[:, self._feature_idx]),
+                label=rows[:, self._rul_idx],
+                feature_names=self.feature_names
+            )
+            return True
+        return False
+
+    def reset(self):
+        self._pos = 0
+        self.rows = 0
+
+
+def external_memory_matrix(it, ref=None, max_bin=256):
+    """Quantized external-memory DMatrix (XGBoost >= 3.0), else the older paged DMatrix"""
+    if hasattr(xgb, 'ExtMemQuantileDMatrix'):
+        return xgb.ExtMemQuantileDMatrix(it, ref=ref, max_bin=max_bin)
+    return xgb.DMatrix(it)
+
+
+def streaming_rmse(booster, it):
+    """RMSE over an iterator's rows, predicting one chunk at a time"""
+    sq_sum, n = 0.0, 0
+    it.reset()
+    chunks = []
+
+    def collect(data, label, **kwargs):
+        chunks.append((data, label))
+
+    while it.next(collect):
+        data, label = chunks.pop()
+        pred = booster.inplace_predict(data)
+        sq_sum += float(np.sum((pred - label) ** 2))
+        n += len(label)
+    return np.sqrt(sq_sum / n) if n else float('nan')
+
+
+def train_out_of_core(chunk_rows=50_000, num_boost_round=NUM_BOOST_ROUND, workers=None,
+                      output='multi_dataset_rul_predictor_ooc.joblib'):
+    print("=" * 80)
+    print("OUT-OF-CORE MULTI-DATASET RUL TRAINING")
+    print("=" * 80)
+    report_memory("start")
+
+    # 1. Feature caches, built one file per worker process
+    available = [(idx, name, paths['train']) for idx, (name, paths) in enumerate(DATASET_PATHS.items())
+                 if os.path.exists(paths['train'])]
+    for name, paths in DATASET_PATHS.items():
+        if not os.path.exists(paths['train']):
+            print(f"  ✗ {name}: not found ({os.path.abspath(paths['train'])})")
+    if not available:
+        raise ValueError("No datasets could be loaded!")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or min(len(available), os.cpu_count() or 1)) as pool:
+        build = partial(build_feature_cache, chunk_rows=chunk_rows)
+        cache_paths = list(pool.map(build, [path for _, _, path in available]))
+    sources = []
+    for (idx, name, _), (npy_path, meta_path) in zip(available, cache_paths):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        rows = np.load(npy_path, mmap_mode='r').shape[0]
+        print(f"  ✓ {name}: {rows} rows -> {os.path.basename(npy_path)}")
+        sources.append((idx, npy_path, meta))
+    print(f"Feature caches ready in {time.perf_counter() - start:.1f}s")
+    report_memory("feature caches")
+
+    # 2. Stream chunks into external-memory matrices
+    pages_dir = os.path.join(FEATURE_CACHE_DIR, 'xgb_pages')
+    os.makedirs(pages_dir, exist_ok=True)
+    train_it = FeatureChunkIter(sources, chunk_rows, 'train', os.path.join(pages_dir, 'train'))
+    val_it = FeatureChunkIter(sources, chunk_rows, 'val', os.path.join(pages_dir, 'val'))
+
+    start = time.perf_counter()
+    dtrain = external_memory_matrix(train_it, max_bin=PARAMS['max_bin'])
+    dval = external_memory_matrix(val_it, ref=dtrain, max_bin=PARAMS['max_bin'])
+    print(f"\nExternal-memory matrices: {dtrain.num_row()} train / {dval.num_row()} validation rows, "
+          f"{dtrain.num_col()} features, chunks of {chunk_rows} rows ({time.perf_counter() - start:.1f}s)")
+    report_memory("matrices built")
+
+    # 3. Train
+    print(f"\nTraining {num_boost_round} rounds...")
+    start = time.perf_counter()
+    booster = xgb.train(
+        PARAMS, dtrain, num_boost_round=num_boost_round,
+        evals=[(dtrain, 'train'), (dval, 'val')], verbose_eval=50
+    )
+    print(f"Training finished in {time.perf_counter() - start:.1f}s")
+    report_memory("training")
+
+    val_rmse = streaming_rmse(booster, val_it)
+    print(f"\nValidation RMSE (held-out engines, streamed): {val_rmse:.2f} cycles")
+    report_memory("validation")
+
+    # Same artifact type as the in-memory trainer (sklearn wrapper, joblib)
+    model = xgb.XGBRegressor()
+    model.load_model(bytearray(booster.save_raw('ubj')))
+    joblib.dump(model, output)
+    print(f"\n✓ Model saved to: {output}")
+
+    shutil.rmtree(pages_dir, ignore_errors=True)
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train the RUL model from disk in bounded memory')
+    parser.add_argument('--chunk-rows', type=int, default=50_000, help='Rows per streamed chunk')
+    parser.add_argument('--rounds', type=int, default=NUM_BOOST_ROUND, help='Boosting rounds')
+    parser.add_argument('--workers', type=int, default=None, help='Processes for feature engineering')
+    parser.add_argument('--output', default='multi_dataset_rul_predictor_ooc.joblib', help='Model path')
+    args = parser.parse_args()
+
+    train_out_of_core(args.chunk_rows, args.rounds, args.workers, args.output)
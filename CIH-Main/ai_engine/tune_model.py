@@ -0,0 +1,240 @@
+"""
+HYPERPARAMETER TUNING WITH ENGINE-GROUPED CROSS-VALIDATION
+==========================================================
+A random row split puts cycles of the same engine on both sides and
+overstates accuracy. Here every fold holds out whole engines
+(GroupKFold on dataset + unit_nr). Each fit early-stops on engines split
+off its own training part, never on the fold it is scored on, so the CV
+score used to rank candidates is not tuned on the held-out engines.
+
+For every candidate parameter set:
+1. k-fold CV (folds of all candidates run in parallel in a process pool)
+   -> RMSE and NASA score over the held-out engines, best iteration
+2. refit on all training data with the median best iteration
+3. RMSE / NASA score on the FD test sets (last cycle vs. true RUL)
+4. single-row inference latency (p50/p99), measured serially in this
+   process so parallel fits do not distort it
+
+Run from this directory (dataset paths are relative):
+    python tune_model.py --search random --trials 20 --latency-budget-ms 2
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.model_selection import GroupKFold, GroupShuffleSplit
+
+from comprehensive_train_model import load_datasets
+from evaluation import rmse, nasa_score, feature_columns, available_test_sets, latency_percentiles
+
+PARAM_GRID = {
+    'max_depth': [3, 4, 6],
+    'learning_rate': [0.05, 0.1],
+    'min_child_weight': [1, 5],
+    'subsample': [0.8],
+    'colsample_bytree': [0.8]
+}
+
+PARAM_SPACE = {
+    'max_depth': lambda rng: rng.randint(2, 8),
+    'learning_rate': lambda rng: 10 ** rng.uniform(-2, -0.7),
+    'min_child_weight': lambda rng: rng.choice([1, 2, 5, 10]),
+    'subsample': lambda rng: rng.uniform(0.6, 1.0),
+    'colsample_bytree': lambda rng: rng.uniform(0.5, 1.0),
+    'reg_lambda': lambda rng: 10 ** rng.uniform(-1, 1)
+}
+
+# Share of each fold's training engines held out for early stopping
+EARLY_STOPPING_FRACTION = 0.15
+
+# Training data, loaded once per worker process by _init_worker()
+_data = {}
+
+
+def grid_candidates(grid=PARAM_GRID):
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def random_candidates(n, seed=42, space=PARAM_SPACE):
+    rng = random.Random(seed)
+    return [{k: sample(rng) for k, sample in space.items()} for _ in range(n)]
+
+
+def load_training_data(use_cache=True):
+    """(X, y, groups) over every available training set; groups = dataset + unit"""
+    frames, errors = load_datasets('train', use_cache=use_cache)
+    if not frames:
+        raise ValueError("No datasets could be loaded!")
+    for name, err in errors.items():
+        print(f"  ✗ {name}: {err}")
+    parts = []
+    for name, df in frames.items():
+        df['dataset'] = name
+        parts.append(df)
+    combined = pd.concat(parts, ignore_index=True)
+    groups = combined['dataset'] + ':' + combined['unit_nr'].astype(str)
+    return combined[feature_columns(combined)], combined['RUL'].to_numpy(), groups.to_numpy()
+
+
+def _init_worker(use_cache):
+    _data['X'], _data['y'], _data['groups'] = load_training_data(use_cache)
+
+
+def _make_model(params, n_estimators, early_stopping_rounds=None, seed=42):
+    return xgb.XGBRegressor(
+        n_estimators=n_estimators,
+        objective='reg:squarederror',
+        tree_method='hist',
+        early_stopping_rounds=early_stopping_rounds,
+        n_jobs=1,  # parallelism comes from the process pool
+        random_state=seed,
+        **params
+    )
+
+
+def _fit_fold(job):
+    """Worker: fit one (candidate, fold), early-stopping on the inner engines; score the fold's engines"""
+    trial, fold, params, train_idx, stop_idx, val_idx, max_rounds, patience = job
+    X, y = _data['X'], _data['y']
+    model = _make_model(params, max_rounds, early_stopping_rounds=patience)
+    model.fit(X.iloc[train_idx], y[train_idx], eval_set=[(X.iloc[stop_idx], y[stop_idx])], verbose=False)
+    pred = model.predict(X.iloc[val_idx])
+    return trial, fold, {
+        'rmse': rmse(y[val_idx], pred),
+        'nasa_score': nasa_score(y[val_idx], pred),
+        'best_iteration': int(model.best_iteration) + 1
+    }
+
+
+def _refit(job):
+    """Worker: fit one candidate on all data; returns the booster as bytes"""
+    trial, params, rounds = job
+    model = _make_model(params, rounds)
+    model.fit(_data['X'], _data['y'], verbose=False)
+    return trial, bytes(model.get_booster().save_raw('ubj'))
+
+
+def tune(candidates, folds=5, max_rounds=500, patience=25, workers=None, use_cache=True, latency_budget_ms=None):
+    X, y, groups = load_training_data(use_cache)
+    n_groups = len(np.unique(groups))
+    folds = min(folds, n_groups)
+    print(f"Training data: {len(X)} rows, {X.shape[1]} features, {n_groups} engines, {folds} folds")
+    splits = []
+    for train_idx, val_idx in GroupKFold(n_splits=folds).split(X, y, groups):
+        # Inner split of the training engines: fit / early-stopping
+        inner = GroupShuffleSplit(n_splits=1, test_size=EARLY_STOPPING_FRACTION, random_state=42)
+        fit_pos, stop_pos = next(inner.split(train_idx, groups=groups[train_idx]))
+        splits.append((train_idx[fit_pos], train_idx[stop_pos], val_idx))
+    test_sets = available_test_sets(use_cache)
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    jobs = [(t, k, params, train_idx, stop_idx, val_idx, max_rounds, patience)
+            for t, params in enumerate(candidates) for k, (train_idx, stop_idx, val_idx) in enumerate(splits)]
+    fold_results = {t: [] for t in range(len(candidates))}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(use_cache,)) as pool:
+        for trial, fold, result in pool.map(_fit_fold, jobs):
+            fold_results[trial].append(result)
+        print(f"Cross-validation: {len(jobs)} fits on {workers} processes in {time.perf_counter() - start:.1f}s")
+
+        rounds = {t: int(np.median([r['best_iteration'] for r in res])) for t, res in fold_results.items()}
+        start = time.perf_counter()
+        boosters = dict(pool.map(_refit, [(t, candidates[t], rounds[t]) for t in range(len(candidates))]))
+        print(f"Refit: {len(candidates)} models in {time.perf_counter() - start:.1f}s")
+
+    results = []
+    for t, params in enumerate(candidates):
+        model = xgb.XGBRegressor()
+        model.load_model(bytearray(boosters[t]))
+        res = fold_results[t]
+        entry = {
+            'trial': t,
+            'params': params,
+            'n_estimators': rounds[t],
+            'cv_rmse': float(np.mean([r['rmse'] for r in res])),
+            'cv_rmse_std': float(np.std([r['rmse'] for r in res])),
+            'cv_nasa_score': float(np.mean([r['nasa_score'] for r in res])),
+            'test': {},
+            'latency': latency_percentiles(model.predict, X)
+        }
+        for name, (X_test, rul_true) in test_sets.items():
+            pred = model.predict(X_test)
+            entry['test'][name] = {'rmse': rmse(rul_true, pred), 'nasa_score': nasa_score(rul_true, pred)}
+        if latency_budget_ms is not None:
+            entry['within_budget'] = entry['latency']['p99_ms'] <= latency_budget_ms
+        results.append(entry)
+
+    results.sort(key=lambda r: r['cv_rmse'])
+    return results
+
+
+def print_report(results, latency_budget_ms=None):
+    print("\n" + "=" * 100)
+    print("CANDIDATES (sorted by CV RMSE)")
+    print("=" * 100)
+    test_names = sorted({name for r in results for name in r['test']})
+    header = f"{'#':>3} {'trees':>5} {'CV RMSE':>14} {'CV NASA':>9} "
+    header += "".join(f"{name + ' RMSE':>11}" for name in test_names)
+    header += f" {'p50 ms':>7} {'p99 ms':>7}  params"
+    print(header)
+    for r in results:
+        line = f"{r['trial']:>3} {r['n_estimators']:>5} {r['cv_rmse']:>7.2f} ± {r['cv_rmse_std']:<4.2f} {r['cv_nasa_score']:>9.0f} "
+        line += "".join(f"{r['test'][name]['rmse']:>11.2f}" for name in test_names)
+        line += f" {r['latency']['p50_ms']:>7.3f} {r['latency']['p99_ms']:>7.3f}  "
+        line += ", ".join(f"{k}={v:.3g}" if isinstance(v, float) else f"{k}={v}" for k, v in r['params'].items())
+        if r.get('within_budget') is False:
+            line += "  (over budget)"
+        print(line)
+
+    eligible = [r for r in results if r.get('within_budget', True)]
+    if eligible:
+        best = eligible[0]
+        budget = f" within {latency_budget_ms} ms p99" if latency_budget_ms is not None else ""
+        print(f"\nBest{budget}: trial {best['trial']} ({best['n_estimators']} trees, "
+              f"CV RMSE {best['cv_rmse']:.2f}, p99 {best['latency']['p99_ms']:.3f} ms)")
+    else:
+        print(f"\nNo candidate meets the {latency_budget_ms} ms p99 latency budget")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Grouped cross-validation and hyperparameter search')
+    parser.add_argument('--search', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--trials', type=int, default=20, help='Random search candidates')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--max-rounds', type=int, default=500, help='Upper bound for early stopping')
+    parser.add_argument('--patience', type=int, default=25, help='Early stopping rounds')
+    parser.add_argument('--workers', type=int, default=None, help='Processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency-budget-ms', type=float, default=None, help='Single-row p99 budget')
+    parser.add_argument('--no-cache', action='store_true', help='Recompute features')
+    parser.add_argument('--output', default='tuning_results.json')
+    args = parser.parse_args()
+
+    candidates = grid_candidates() if args.search == 'grid' else random_candidates(args.trials, args.seed)
+    print("=" * 100)
+    print(f"HYPERPARAMETER SEARCH: {args.search}, {len(candidates)} candidates")
+    print("=" * 100)
+
+    results = tune(
+        candidates,
+        folds=args.folds,
+        max_rounds=args.max_rounds,
+        patience=args.patience,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        latency_budget_ms=args.latency_budget_ms
+    )
+    print_report(results, args.latency_budget_ms)
+
+    with open(args.output, 'w') as f:
+        json.dump({'search': args.search, 'folds': args.folds, 'results': results}, f, indent=2)
+    print(f"\n✓ Results saved to: {args.output}")
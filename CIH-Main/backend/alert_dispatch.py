@@ -0,0 +1,413 @@
+"""
+ALERT DISPATCH
+==============
+Non-blocking delivery of alerts to external channels.
+
+`AlertDispatcher.submit()` only enqueues, so the request handlers and the
+WebSocket loop never wait on SMTP or HTTP. Each channel has its own bounded
+queue and worker task that batches alerts, retries failed batches with
+exponential backoff, and reuses connections between batches. Blocking
+network I/O runs in the default thread pool.
+
+Channels:
+- FileSinkChannel: appends JSON lines to a file
+- WebhookChannel:  POSTs a JSON array to an HTTP(S) endpoint (keep-alive pool)
+- SMTPChannel:     sends one digest email per batch over a persistent session
+"""
+
+import asyncio
+import logging
+import smtplib
+import time
+from email.message import EmailMessage
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlsplit
+
+from encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_RANK = {"info": 0, "warning": 1, "critical": 2}
+
+
+# ============================================================================
+# CHANNELS
+# ============================================================================
+
+class Channel:
+    """
+    Base channel. Subclasses implement `deliver(batch)` (blocking, runs in a
+    worker thread) and optionally `close()`.
+    """
+    name = "channel"
+
+    def __init__(self, min_severity="info", batch_size=50, max_wait=1.0, timeout=10.0):
+        self.min_severity = SEVERITY_RANK[min_severity]
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.timeout = timeout
+
+    def accepts(self, alert) -> bool:
+        return SEVERITY_RANK.get(alert["alert_type"], 0) >= self.min_severity
+
+    def deliver(self, batch):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FileSinkChannel(Channel):
+    """Append alerts as JSON lines"""
+    name = "file"
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    def deliver(self, batch):
+        with open(self.path, "ab") as f:
+            f.write(b"".join(dumps(alert) + b"\n" for alert in batch))
+
+
+class WebhookChannel(Channel):
+    """POST batches as a JSON array, reusing keep-alive connections"""
+    name = "webhook"
+
+    def __init__(self, url, headers=None, pool_size=2, **kwargs):
+        super().__init__(**kwargs)
+        parts = urlsplit(url)
+        self._conn_class = HTTPSConnection if parts.scheme == "https" else HTTPConnection
+        self._host = parts.hostname
+        self._port = parts.port
+        self._path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self._headers = {"Content-Type": "application/json", **(headers or {})}
+        self._pool = []
+        self._pool_size = pool_size
+
+    def _acquire(self):
+        if self._pool:
+            return self._pool.pop()
+        return self._conn_class(self._host, self._port, timeout=self.timeout)
+
+    def _release(self, conn):
+        if len(self._pool) < self._pool_size:
+            self._pool.append(conn)
+        else:
+            conn.close()
+
+    def deliver(self, batch):
+        conn = self._acquire()
+        try:
+            conn.request("POST", self._path, body=dumps(batch), headers=self._headers)
+            response = conn.getresponse()
+            response.read()
+        except Exception:
+            conn.close()  # never return a broken connection to the pool
+            raise
+        if response.status >= 300:
+            conn.close()
+            raise RuntimeError(f"webhook returned HTTP {response.status}")
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+
+    def close(self):
+        while self._pool:
+            self._pool.pop().close()
+
+
+class SMTPChannel(Channel):
+    """Send one digest email per batch over a persistent SMTP session"""
+    name = "smtp"
+
+    def __init__(self, host, port, sender, recipients, username=None, password=None,
+                 starttls=False, **kwargs):
+        kwargs.setdefault("min_severity", "critical")
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self._smtp = None
+
+    def _session(self):
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close()
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password)
+        self._smtp = smtp
+        return smtp
+
+    def deliver(self, batch):
+        worst = max(batch, key=lambda a: SEVERITY_RANK.get(a["alert_type"], 0))
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(self.recipients)
+        if len(batch) == 1:
+            msg["Subject"] = f"{worst['alert_type'].upper()}: Engine {worst['engine_id']}"
+        else:
+            msg["Subject"] = f"{worst['alert_type'].upper()}: {len(batch)} AegisFlow alerts"
+        msg.set_content("\n".join(
+            f"[{a['timestamp']}] {a['alert_type'].upper()} Engine {a['engine_id']} "
+            f"cycle {a['cycle']} RUL {a['rul']:.1f}: {a['message']}"
+            for a in batch
+        ))
+        try:
+            self._session().send_message(msg)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+
+# ============================================================================
+# DISPATCHER
+# ============================================================================
+
+class _ChannelWorker:
+    def __init__(self, channel, queue_size):
+        self.channel = channel
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.task = None
+        self.stats = {
+            "delivered": 0,
+            "failed": 0,
+            "dropped": 0,
+            "batches": 0,
+            "retries": 0,
+            "latency_sum": 0.0,
+            "latency_max": 0.0,
+        }
+
+
+class AlertDispatcher:
+    def __init__(self, channels, queue_size=10000, retries=3, backoff=0.5, latency_observer=None):
+        """latency_observer(channel_name, seconds) is called for every delivered alert"""
+        self.retries = retries
+        self.backoff = backoff
+        self.latency_observer = latency_observer
+        self._workers = [_ChannelWorker(channel, queue_size) for channel in channels]
+
+    def submit(self, alert):
+        """Queue an alert for every channel that accepts it. Never blocks."""
+        if not self._workers:
+            return
+        item = (time.monotonic(), alert.model_dump())
+        for worker in self._workers:
+            if not worker.channel.accepts(item[1]):
+                continue
+            try:
+                worker.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                worker.stats["dropped"] += 1
+
+    async def start(self):
+        for worker in self._workers:
+            worker.task = asyncio.create_task(self._run(worker))
+        if self._workers:
+            logger.info(f"Alert dispatch started: {', '.join(w.channel.name for w in self._workers)}")
+
+    async def stop(self, drain_timeout=5.0):
+        """Deliver what is queued (up to drain_timeout), then stop workers"""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(w.queue.join() for w in self._workers)), drain_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Alert dispatch: shutdown with undelivered alerts")
+        for worker in self._workers:
+            if worker.task:
+                worker.task.cancel()
+        await asyncio.gather(*(w.task for w in self._workers if w.task), return_exceptions=True)
+        for worker in self._workers:
+            await asyncio.to_thread(worker.channel.close)
+
+    async def _next_batch(self, worker):
+        """Wait for one alert, then collect more until batch_size or max_wait"""
+        channel = worker.channel
+        batch = [await worker.queue.get()]
+        deadline = time.monotonic() + channel.max_wait
+        while len(batch) < channel.batch_size:
+            try:
+                batch.append(worker.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(worker.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, worker):
+        channel = worker.channel
+        stats = worker.stats
+        while True:
+            batch = await self._next_batch(worker)
+            alerts = [alert for _, alert in batch]
+            try:
+                for attempt in range(self.retries + 1):
+                    try:
+                        await asyncio.to_thread(channel.deliver, alerts)
+                        break
+                    except Exception as e:
+                        if attempt == self.retries:
+                            stats["failed"] += len(batch)
+                            logger.error(f"Alert dispatch via {channel.name} failed after "
+                                         f"{attempt + 1} attempts: {e}")
+                        else:
+                            stats["retries"] += 1
+                            await asyncio.sleep(self.backoff * 2 ** attempt)
+                else:
+                    continue
+
+                now = time.monotonic()
+                stats["delivered"] += len(batch)
+                stats["batches"] += 1
+                for enqueued_at, _ in batch:
+                    latency = now - enqueued_at
+                    stats["latency_sum"] += latency
+                    if latency > stats["latency_max"]:
+                        stats["latency_max"] = latency
+                    if self.latency_observer is not None:
+                        self.latency_observer(channel.name, latency)
+            finally:
+                for _ in batch:
+                    worker.queue.task_done()
+
+    def queue_depth(self) -> int:
+        return sum(w.queue.qsize() for w in self._workers)
+
+    def stats(self) -> dict:
+        """Per-channel counters, queue depth and mean/max delivery latency (s)"""
+        return {
+            w.channel.name: {
+                "queue_depth": w.queue.qsize(),
+                **{k: v for k, v in w.stats.items() if k != "latency_sum"},
+                "latency_mean": w.stats["latency_sum"] / w.stats["delivered"] if w.stats["delivered"] else 0.0,
+            }
+            for w in self._workers
+        }
+
+
+# Test the dispatcher against local SMTP and HTTP stand-ins
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import threading
+    from datetime import datetime, timezone
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from pydantic import BaseModel
+
+    class Alert(BaseModel):
+        timestamp: datetime
+        engine_id: int
+        alert_type: str
+        rul: float
+        cycle: int
+        message: str
+        sensors: dict
+
+    received = {"http_posts": 0, "http_alerts": 0, "http_connections": set(), "smtp_messages": 0}
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            received["http_posts"] += 1
+            received["http_alerts"] += body.count(b'"engine_id"')
+            received["http_connections"].add(self.client_address)
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    async def smtp_standin(reader, writer):
+        """Just enough SMTP for smtplib.send_message"""
+        writer.write(b"220 localhost ESMTP stand-in\r\n")
+        in_data = False
+        while line := await reader.readline():
+            if in_data:
+                if line == b".\r\n":
+                    in_data = False
+                    received["smtp_messages"] += 1
+                    writer.write(b"250 OK\r\n")
+                continue
+            cmd = line[:4].upper()
+            if cmd == b"DATA":
+                in_data = True
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+            elif cmd == b"QUIT":
+                writer.write(b"221 Bye\r\n")
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    async def main():
+        http = ThreadingHTTPServer(("127.0.0.1", 0), WebhookHandler)
+        threading.Thread(target=http.serve_forever, daemon=True).start()
+        smtp = await asyncio.start_server(smtp_standin, "127.0.0.1", 0)
+        smtp_port = smtp.sockets[0].getsockname()[1]
+        sink = os.path.join(tempfile.mkdtemp(), "alerts.jsonl")
+
+        dispatcher = AlertDispatcher([
+            FileSinkChannel(sink),
+            WebhookChannel(f"http://127.0.0.1:{http.server_port}/alerts", batch_size=20, max_wait=0.1),
+            SMTPChannel("127.0.0.1", smtp_port, "alerts@aegisflow.com", ["oncall@aegisflow.com"],
+                        batch_size=10, max_wait=0.1),
+        ])
+        await dispatcher.start()
+
+        start = time.perf_counter()
+        for i in range(200):
+            dispatcher.submit(Alert(
+                timestamp=datetime.now(timezone.utc), engine_id=i % 20,
+                alert_type="critical" if i % 4 == 0 else "warning",
+                rul=15.0, cycle=100 + i, message=f"test alert {i}", sensors={},
+            ))
+        submit_us = (time.perf_counter() - start) / 200 * 1e6
+
+        await dispatcher.stop()
+        smtp.close()
+        http.shutdown()
+
+        with open(sink) as f:
+            file_lines = sum(1 for _ in f)
+        print(f"submit(): {submit_us:.1f} us/alert")
+        print(f"file sink: {file_lines} lines")
+        print(f"webhook:   {received['http_alerts']} alerts in {received['http_posts']} POSTs "
+              f"over {len(received['http_connections'])} connection(s)")
+        print(f"smtp:      {received['smtp_messages']} digest emails")
+        for name, stats in dispatcher.stats().items():
+            print(f"  {name:8s} {stats}")
+
+    asyncio.run(main())
@@ -0,0 +1,177 @@
+"""
+STATEFUL ALERT ENGINE
+=====================
+Per-engine, per-rule state machines that turn a stream of predictions into
+a small number of meaningful alerts:
+
+- raise once when a rule first crosses a threshold
+- re-notify only when the severity escalates
+- clear with hysteresis (the value must move back past a separate clear
+  threshold, so readings hovering at a boundary do not flap)
+- after a clear, suppress re-raising the same (or lower) severity for a
+  configurable cooldown
+
+State is kept for at most `max_engines` engines; the engine evaluated least
+recently is forgotten first (counted in stats["evicted"]).
+
+Only transitions that should notify someone are returned; everything else
+is counted in `stats`.
+"""
+
+import time
+from collections import OrderedDict
+
+SEVERITY_NAMES = {1: "warning", 2: "critical"}
+
+
+class AlertRule:
+    """
+    A threshold rule with one or more severity levels.
+
+    levels: list of (severity, raise_threshold, clear_threshold) in
+    ascending severity. direction "below" raises when the value drops under
+    raise_threshold and clears once it is back at/above clear_threshold;
+    "above" is the mirror image.
+    """
+
+    def __init__(self, name, extract, direction, levels, messages):
+        self.name = name
+        self.extract = extract
+        self.direction = direction
+        self.levels = levels
+        self.messages = messages
+
+    def target_level(self, value) -> int:
+        """Highest level index (1-based) whose raise condition holds, 0 if none"""
+        target = 0
+        for i, (_, raise_at, _) in enumerate(self.levels, start=1):
+            if (value < raise_at) if self.direction == "below" else (value > raise_at):
+                target = i
+        return target
+
+    def clears(self, level, value) -> bool:
+        """True if value is past the clear threshold of level"""
+        clear_at = self.levels[level - 1][2]
+        return value >= clear_at if self.direction == "below" else value < clear_at
+
+
+def default_rules(rul_hysteresis=5.0, temp_hysteresis=2.0):
+    """Rules matching the original check_alert_conditions thresholds"""
+    return [
+        AlertRule(
+            name="rul",
+            extract=lambda rul, sensors: rul,
+            direction="below",
+            levels=[
+                (1, 50, 50 + rul_hysteresis),
+                (2, 20, 20 + rul_hysteresis),
+            ],
+            messages={
+                1: "WARNING: Engine {engine_id} approaching maintenance window. RUL: {rul:.1f} cycles remaining.",
+                2: "CRITICAL: Engine {engine_id} requires immediate maintenance. RUL: {rul:.1f} cycles remaining.",
+            },
+        ),
+        AlertRule(
+            name="lpt_temp",
+            extract=lambda rul, sensors: sensors.get('LPT_Outlet_Temp', 0),
+            direction="above",
+            levels=[(1, 1427, 1427 - temp_hysteresis)],
+            messages={1: "WARNING: High LPT temperature detected on Engine {engine_id}"},
+        ),
+    ]
+
+
+class AlertEngine:
+    def __init__(self, rules=None, cooldown_seconds=300.0, clock=time.monotonic, max_engines=10000):
+        self.rules = rules if rules is not None else default_rules()
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self.max_engines = max_engines
+        # engine_id -> per rule: [level, last_notified_at, last_notified_level] or None
+        self._state = OrderedDict()
+        self.stats = {"evaluated": 0, "raised": 0, "escalated": 0, "cleared": 0, "suppressed": 0, "evicted": 0}
+
+    def evaluate(self, engine_id, rul, sensors):
+        """
+        Update state for one prediction.
+
+        Returns a list of (rule, severity_name, message) for transitions that
+        should notify, most severe first. Usually empty.
+        """
+        self.stats["evaluated"] += 1
+        events = []
+        now = None
+        states = self._state.get(engine_id)
+        if states is not None:
+            self._state.move_to_end(engine_id)
+
+        for idx, rule in enumerate(self.rules):
+            value = rule.extract(rul, sensors)
+            state = states[idx] if states is not None else None
+            current = state[0] if state else 0
+
+            target = rule.target_level(value)
+            new = target
+            for level in range(current, target, -1):
+                if not rule.clears(level, value):
+                    new = level
+                    break
+
+            if new == current:
+                continue
+            if states is None:
+                states = self._state[engine_id] = [None] * len(self.rules)
+                while len(self._state) > self.max_engines:
+                    self._state.popitem(last=False)
+                    self.stats["evicted"] += 1
+            if state is None:
+                state = states[idx] = [0, float('-inf'), 0]
+            state[0] = new
+
+            if new < current:
+                if new == 0:
+                    self.stats["cleared"] += 1
+                continue
+
+            # Escalation (includes the initial raise)
+            if now is None:
+                now = self.clock()
+            if new <= state[2] and now - state[1] < self.cooldown_seconds:
+                self.stats["suppressed"] += 1
+                continue
+
+            self.stats["escalated" if current else "raised"] += 1
+            state[1] = now
+            state[2] = new
+            severity = rule.levels[new - 1][0]
+            message = rule.messages[new].format(engine_id=engine_id, rul=rul, value=value)
+            events.append((severity, rule, SEVERITY_NAMES[severity], message))
+
+        if len(events) > 1:
+            events.sort(key=lambda e: -e[0])
+        return [(rule, name, message) for _, rule, name, message in events]
+
+    def active(self):
+        """Number of (engine, rule) pairs currently in a raised state"""
+        return sum(1 for states in list(self._state.values()) for state in states if state and state[0])
+
+    def reset_engine(self, engine_id):
+        """Forget all rule state for an engine"""
+        self._state.pop(engine_id, None)
+
+    def __len__(self):
+        """Engines with rule state"""
+        return len(self._state)
+
+
+# Test the engine
+if __name__ == "__main__":
+    engine = AlertEngine(cooldown_seconds=60, clock=lambda: 0.0)
+    notified = 0
+    # A degrading engine hovering around both thresholds
+    for cycle, rul in enumerate([120, 60, 49, 51, 48, 52, 30, 19, 21, 18, 26, 40, 56, 45]):
+        events = engine.evaluate(34, rul, {})
+        notified += len(events)
+        for rule, severity, message in events:
+            print(f"cycle {cycle:2d} RUL {rul:5.1f} -> {severity:8s} {message}")
+    print(f"\n{notified} notifications for 14 predictions; stats: {engine.stats}")
@@ -0,0 +1,513 @@
+"""
+INDEXED ALERT STORE
+===================
+Fixed-capacity ring buffer of alerts with secondary indexes by engine ID,
+alert type (severity) and time bucket, plus an optional SQLite (WAL) spill
+tier that keeps history once alerts fall out of the memory window.
+
+Every alert gets a monotonically increasing sequence number (its ID). The ID
+doubles as the pagination cursor and as the SSE event ID, and it stays
+unique across restarts when the spill tier is enabled.
+
+SharedAlertStore is the multi-worker variant: alerts are written through
+to SQLite as they are added and every read goes to the database, so each
+uvicorn worker sees the alerts raised by all of them.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+
+from encoding import dumps_str
+
+
+def to_epoch(ts) -> float:
+    """datetime (naive = UTC) or epoch seconds -> epoch seconds"""
+    if isinstance(ts, datetime):
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        return ts.timestamp()
+    return float(ts)
+
+
+class _SeqIndex:
+    """
+    Ascending list of sequence numbers with O(1) append and popleft.
+
+    A plain list + head offset (instead of a deque) so we can bisect for
+    cursors. The dead prefix is compacted once it outgrows the live part.
+    """
+    __slots__ = ("seqs", "head")
+
+    def __init__(self):
+        self.seqs = []
+        self.head = 0
+
+    def __len__(self):
+        return len(self.seqs) - self.head
+
+    def append(self, seq):
+        self.seqs.append(seq)
+
+    def popleft(self):
+        self.head += 1
+        if self.head > 64 and self.head * 2 > len(self.seqs):
+            del self.seqs[:self.head]
+            self.head = 0
+
+    def iter_before(self, cursor=None):
+        """Yield live sequence numbers < cursor, newest first"""
+        seqs = self.seqs
+        i = len(seqs) if cursor is None else bisect_left(seqs, cursor, self.head)
+        while i > self.head:
+            i -= 1
+            yield seqs[i]
+
+
+class AlertSubscription:
+    """A live feed of newly added alerts matching optional filters"""
+    __slots__ = ("engine_id", "alert_type", "queue", "overflowed")
+
+    def __init__(self, engine_id=None, alert_type=None, queue_size=256):
+        self.engine_id = engine_id
+        self.alert_type = alert_type
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        # Set when the consumer fell behind and alerts were not queued;
+        # it should resync from the store by sequence number
+        self.overflowed = False
+
+    def matches(self, alert) -> bool:
+        return ((self.engine_id is None or alert.engine_id == self.engine_id) and
+                (self.alert_type is None or alert.alert_type == self.alert_type))
+
+
+class _SQLiteSpill:
+    """Append-only SQLite tier for alerts evicted from the ring buffer"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS alerts (
+                seq INTEGER PRIMARY KEY,
+                ts REAL NOT NULL,
+                engine_id INTEGER NOT NULL,
+                alert_type TEXT NOT NULL,
+                rul REAL,
+                cycle INTEGER,
+                message TEXT,
+                sensors TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_engine ON alerts (engine_id, seq)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_type ON alerts (alert_type, seq)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts (ts)")
+
+    def max_seq(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(seq) FROM alerts").fetchone()
+        return row[0] or 0
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
+
+    @staticmethod
+    def _row(a):
+        return (to_epoch(a.timestamp), a.engine_id, a.alert_type, a.rul, a.cycle, a.message, dumps_str(a.sensors))
+
+    def write(self, records):
+        """Insert (seq, alert) pairs in one transaction"""
+        rows = [(seq, *self._row(a)) for seq, a in records]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR IGNORE INTO alerts VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+
+    def insert(self, alert) -> int:
+        """Insert one alert; the database assigns (and returns) its sequence number"""
+        with self._lock:
+            return self._conn.execute(
+                "INSERT INTO alerts (ts, engine_id, alert_type, rul, cycle, message, sensors) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", self._row(alert)
+            ).lastrowid
+
+    def query(self, engine_id=None, alert_type=None, since=None, until=None,
+              cursor=None, limit=50, ascending=False):
+        clauses, params = [], []
+        if engine_id is not None:
+            clauses.append("engine_id = ?")
+            params.append(engine_id)
+        if alert_type is not None:
+            clauses.append("alert_type = ?")
+            params.append(alert_type)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts <= ?")
+            params.append(until)
+        if cursor is not None:
+            clauses.append("seq > ?" if ascending else "seq < ?")
+            params.append(cursor)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "ASC" if ascending else "DESC"
+        sql = f"SELECT * FROM alerts {where} ORDER BY seq {order} LIMIT ?"
+        with self._lock:
+            return self._conn.execute(sql, (*params, limit)).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class AlertStore:
+    """
+    Ring buffer of the most recent alerts with secondary indexes.
+
+    `model` is the alert class (needs timestamp, engine_id, alert_type, rul,
+    cycle, message, sensors); it is used to rebuild alerts read back from
+    the spill tier.
+    """
+
+    def __init__(self, model, capacity=1000, bucket_seconds=60, spill_path=None):
+        self.model = model
+        self.capacity = capacity
+        self.bucket_seconds = bucket_seconds
+        self._ring = [None] * capacity  # slot -> (seq, alert, epoch)
+        self._by_engine = {}
+        self._by_type = {}
+        self._by_bucket = {}
+        self._bucket_keys = _SeqIndex()  # ascending bucket ids that have live alerts
+        self._spill = _SQLiteSpill(spill_path) if spill_path else None
+        self._pending_spill = []
+        self._subscribers = set()
+        self._spilled = self._spill.count() if self._spill else 0
+        self._first_seq = self._spill.max_seq() + 1 if self._spill else 1
+        self._next_seq = self._first_seq
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def add(self, alert) -> int:
+        """Store an alert and return its sequence number"""
+        seq = self._next_seq
+        self._next_seq += 1
+        slot = seq % self.capacity
+
+        evicted = self._ring[slot]
+        if evicted is not None:
+            self._evict(evicted)
+
+        epoch = to_epoch(alert.timestamp)
+        bucket = int(epoch // self.bucket_seconds)
+        self._ring[slot] = (seq, alert, epoch)
+
+        self._index(self._by_engine, alert.engine_id).append(seq)
+        self._index(self._by_type, alert.alert_type).append(seq)
+        if bucket not in self._by_bucket:
+            self._by_bucket[bucket] = _SeqIndex()
+            keys = self._bucket_keys
+            if len(keys) and bucket < keys.seqs[-1]:
+                insort(keys.seqs, bucket, keys.head)  # late timestamp
+            else:
+                keys.append(bucket)
+        self._by_bucket[bucket].append(seq)
+
+        for sub in self._subscribers:
+            if sub.matches(alert):
+                try:
+                    sub.queue.put_nowait((seq, alert))
+                except asyncio.QueueFull:
+                    sub.overflowed = True
+        return seq
+
+    def subscribe(self, engine_id=None, alert_type=None, queue_size=256) -> AlertSubscription:
+        """Receive (seq, alert) for every matching alert added from now on"""
+        sub = AlertSubscription(engine_id, alert_type, queue_size)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        self._subscribers.discard(sub)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    @staticmethod
+    def _index(indexes, key):
+        index = indexes.get(key)
+        if index is None:
+            index = indexes[key] = _SeqIndex()
+        return index
+
+    def _evict(self, record):
+        """Drop the oldest record from every index (always their leftmost entry)"""
+        seq, alert, epoch = record
+        for indexes, key in ((self._by_engine, alert.engine_id), (self._by_type, alert.alert_type)):
+            index = indexes[key]
+            index.popleft()
+            if not index:
+                del indexes[key]
+        bucket = int(epoch // self.bucket_seconds)
+        index = self._by_bucket[bucket]
+        index.popleft()
+        if not index:
+            del self._by_bucket[bucket]
+            # Buckets are created in (mostly) time order, so the emptied one
+            # is normally the oldest key
+            keys = self._bucket_keys
+            if keys.seqs[keys.head] == bucket:
+                keys.popleft()
+            else:
+                del keys.seqs[bisect_left(keys.seqs, bucket, keys.head)]
+
+        if self._spill is not None:
+            self._pending_spill.append((seq, alert))
+            if len(self._pending_spill) >= 64:
+                self.flush()
+
+    def flush(self):
+        """Write evicted alerts that are still buffered to the spill tier"""
+        if self._spill is not None and self._pending_spill:
+            self._spill.write(self._pending_spill)
+            self._spilled += len(self._pending_spill)
+            self._pending_spill = []
+
+    def close(self):
+        """Persist everything (including the memory window) and close the spill tier"""
+        if self._spill is None:
+            return
+        self.flush()
+        live = [(seq, alert) for seq, alert, _ in filter(None, self._ring)]
+        if live:
+            self._spill.write(live)
+        self._spill.close()
+        self._spill = None
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        """Alerts held in memory"""
+        return min(self._next_seq - self._first_seq, self.capacity)
+
+    @property
+    def total(self) -> int:
+        """Alerts held in memory plus alerts in the spill tier"""
+        return len(self) + self._spilled + len(self._pending_spill)
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest alert (0 if none)"""
+        return self._next_seq - 1
+
+    @property
+    def _oldest_seq(self) -> int:
+        return max(self._first_seq, self._next_seq - self.capacity)
+
+    def recent(self, n):
+        """Newest n (seq, alert) pairs, newest first"""
+        start = max(self._oldest_seq, self._next_seq - n)
+        return [(seq, self._ring[seq % self.capacity][1]) for seq in range(self._next_seq - 1, start - 1, -1)]
+
+    def _candidates(self, engine_id, alert_type, since, until, cursor):
+        """Pick the most selective index and yield its sequence numbers, newest first"""
+        indexes = []
+        if engine_id is not None:
+            indexes.append(self._by_engine.get(engine_id, _SeqIndex()))
+        if alert_type is not None:
+            indexes.append(self._by_type.get(alert_type, _SeqIndex()))
+        if indexes:
+            yield from min(indexes, key=len).iter_before(cursor)
+            return
+
+        if since is not None or until is not None:
+            lo = None if since is None else int(since // self.bucket_seconds)
+            hi = None if until is None else int(until // self.bucket_seconds) + 1
+            for bucket in self._bucket_keys.iter_before(hi):
+                if lo is not None and bucket < lo:
+                    return
+                yield from self._by_bucket[bucket].iter_before(cursor)
+            return
+
+        start = self._next_seq if cursor is None else min(cursor, self._next_seq)
+        yield from range(start - 1, self._oldest_seq - 1, -1)
+
+    def query(self, engine_id=None, alert_type=None, since=None, until=None, cursor=None, limit=50):
+        """
+        Filtered page of alerts, newest first.
+
+        since/until are datetimes or epoch seconds (inclusive). cursor is the
+        sequence number of the last alert of the previous page; pass the
+        returned next_cursor to get the following (older) page.
+        Returns (list of (seq, alert), next_cursor or None).
+        """
+        since = None if since is None else to_epoch(since)
+        until = None if until is None else to_epoch(until)
+        results = []
+
+        for seq in self._candidates(engine_id, alert_type, since, until, cursor):
+            _, alert, epoch = self._ring[seq % self.capacity]
+            if engine_id is not None and alert.engine_id != engine_id:
+                continue
+            if alert_type is not None and alert.alert_type != alert_type:
+                continue
+            if (since is not None and epoch < since) or (until is not None and epoch > until):
+                continue
+            results.append((seq, alert))
+            if len(results) > limit:
+                break
+
+        # Memory window exhausted: continue from the spill tier
+        if len(results) <= limit and self._spill is not None and (self._spilled or self._pending_spill):
+            self.flush()
+            spill_cursor = self._oldest_seq if cursor is None else min(cursor, self._oldest_seq)
+            rows = self._spill.query(engine_id, alert_type, since, until, spill_cursor,
+                                     limit + 1 - len(results))
+            results.extend((row[0], self._from_row(row)) for row in rows)
+
+        if len(results) > limit:
+            results = results[:limit]
+            return results, results[-1][0]
+        return results, None
+
+    def since_seq(self, after_seq, engine_id=None, alert_type=None, limit=1000):
+        """Matching alerts with seq > after_seq, oldest first (used to resume streams)"""
+        results = []
+        if self._spill is not None and after_seq + 1 < self._oldest_seq:
+            self.flush()
+            rows = self._spill.query(engine_id, alert_type, cursor=after_seq, limit=limit, ascending=True)
+            results.extend((row[0], self._from_row(row)) for row in rows)
+        for seq in range(max(after_seq + 1, self._oldest_seq), self._next_seq):
+            if len(results) >= limit:
+                break
+            alert = self._ring[seq % self.capacity][1]
+            if engine_id is not None and alert.engine_id != engine_id:
+                continue
+            if alert_type is not None and alert.alert_type != alert_type:
+                continue
+            results.append((seq, alert))
+        return results
+
+    def _from_row(self, row):
+        seq, ts, engine_id, alert_type, rul, cycle, message, sensors = row
+        return self.model(
+            timestamp=datetime.fromtimestamp(ts, timezone.utc),
+            engine_id=engine_id,
+            alert_type=alert_type,
+            rul=rul,
+            cycle=cycle,
+            message=message,
+            sensors=json.loads(sensors) if sensors else {},
+        )
+
+
+class SharedAlertStore:
+    """
+    AlertStore interface over a SQLite file shared by several processes.
+
+    add() inserts at once and SQLite hands out the sequence numbers, so IDs
+    stay unique and ordered across workers. Subscribers are fed by a poller
+    that reads new rows every `poll_interval` seconds, which also delivers
+    alerts raised by the other workers.
+    """
+
+    def __init__(self, model, path, poll_interval=0.5):
+        self.model = model
+        self.poll_interval = poll_interval
+        self._db = _SQLiteSpill(path)
+        self._subscribers = set()
+        self._poller = None
+        self._polled_seq = self._db.max_seq()
+
+    _from_row = AlertStore._from_row
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def add(self, alert) -> int:
+        return self._db.insert(alert)
+
+    def subscribe(self, engine_id=None, alert_type=None, queue_size=256) -> AlertSubscription:
+        """Receive (seq, alert) for every matching alert added (by any worker) from now on"""
+        if self._poller is None:
+            self._polled_seq = self._db.max_seq()
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+        sub = AlertSubscription(engine_id, alert_type, queue_size)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        self._subscribers.discard(sub)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self._subscribers:
+                self._polled_seq = self._db.max_seq()
+                continue
+            for row in self._db.query(cursor=self._polled_seq, limit=1000, ascending=True):
+                seq, alert = row[0], self._from_row(row)
+                self._polled_seq = seq
+                for sub in self._subscribers:
+                    if sub.matches(alert):
+                        try:
+                            sub.queue.put_nowait((seq, alert))
+                        except asyncio.QueueFull:
+                            sub.overflowed = True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return self.total
+
+    @property
+    def total(self) -> int:
+        return self._db.count()
+
+    @property
+    def last_seq(self) -> int:
+        return self._db.max_seq()
+
+    def recent(self, n):
+        return [(row[0], self._from_row(row)) for row in self._db.query(limit=n)]
+
+    def query(self, engine_id=None, alert_type=None, since=None, until=None, cursor=None, limit=50):
+        """Same contract as AlertStore.query()"""
+        since = None if since is None else to_epoch(since)
+        until = None if until is None else to_epoch(until)
+        rows = self._db.query(engine_id, alert_type, since, until, cursor, limit + 1)
+        results = [(row[0], self._from_row(row)) for row in rows[:limit]]
+        return results, (results[-1][0] if len(rows) > limit else None)
+
+    def since_seq(self, after_seq, engine_id=None, alert_type=None, limit=1000):
+        rows = self._db.query(engine_id, alert_type, cursor=after_seq, limit=limit, ascending=True)
+        return [(row[0], self._from_row(row)) for row in rows]
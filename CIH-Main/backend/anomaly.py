@@ -0,0 +1,271 @@
+"""
+STREAMING ANOMALY DETECTION
+===========================
+Online per-engine, per-sensor statistics with O(1) updates per reading.
+
+For every engine we keep, per sensor:
+- a fast EWMA mean and EWMA variance (current behaviour and noise level)
+- a slow EWMA mean (the engine's own baseline)
+
+Each sensor is seeded from its first non-missing value and counts its own
+readings (missing values are not counted). Two anomaly types are flagged
+once a sensor has `warmup` readings:
+- "spike": |x - fast mean| / std > z_threshold (scored before the update)
+- "drift": |fast mean - baseline| / std > drift_threshold
+
+State lives in preallocated (engines x sensors) arrays that grow by doubling.
+The single-reading path works in place through scratch buffers, so the
+stream does not allocate arrays per reading.
+"""
+
+import numpy as np
+
+_EPS = 1e-9
+
+
+class StreamingAnomalyDetector:
+    def __init__(self, sensors, alpha=0.1, baseline_alpha=0.01, z_threshold=5.0,
+                 drift_threshold=3.0, warmup=20, capacity=64):
+        self.sensors = list(sensors)
+        self.alpha = alpha
+        self.baseline_alpha = baseline_alpha
+        self.z_threshold = z_threshold
+        self.drift_threshold = drift_threshold
+        self.warmup = warmup
+
+        n = len(self.sensors)
+        self._rows = {}  # engine_id -> row in the state arrays
+        self.count = np.zeros((capacity, n), dtype=np.int64)  # readings seen per sensor
+        self.mean = np.zeros((capacity, n))
+        self.var = np.zeros((capacity, n))
+        self.baseline = np.zeros((capacity, n))
+
+        # Scratch buffers for the single-reading path
+        self._x = np.empty(n)
+        self._diff = np.empty(n)
+        self._std = np.empty(n)
+        self._score = np.empty(n)
+        self._nan = np.empty(n, dtype=bool)
+        self._present = np.empty(n, dtype=bool)
+        self._seed = np.empty(n, dtype=bool)
+        self._ready = np.empty(n, dtype=bool)
+        # Results of the last update() call
+        self.spike = np.zeros(n, dtype=bool)
+        self.drift = np.zeros(n, dtype=bool)
+
+    # ------------------------------------------------------------------
+    # State management
+    # ------------------------------------------------------------------
+
+    def _row(self, engine_id) -> int:
+        row = self._rows.get(engine_id)
+        if row is None:
+            row = len(self._rows)
+            if row == len(self.count):
+                self._grow()
+            self._rows[engine_id] = row
+        return row
+
+    def _grow(self):
+        capacity = 2 * len(self.count)
+        for name in ("count", "mean", "var", "baseline"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def reset_engine(self, engine_id):
+        """Forget an engine's statistics (e.g. when its stream restarts)"""
+        row = self._rows.get(engine_id)
+        if row is not None:
+            self.count[row] = 0
+
+    @property
+    def engines(self) -> int:
+        return len(self._rows)
+
+    # ------------------------------------------------------------------
+    # Single reading (streaming path)
+    # ------------------------------------------------------------------
+
+    def update(self, engine_id, values) -> bool:
+        """
+        Score and absorb one reading (len(sensors) floats in sensor order,
+        NaN = missing).
+
+        Per-sensor results are left in the `spike` and `drift` arrays, which
+        are reused between calls. Returns True if any sensor is anomalous.
+        """
+        row = self._row(engine_id)
+        x = self._x
+        x[:] = values
+        mean, var, baseline = self.mean[row], self.var[row], self.baseline[row]
+        spike, drift = self.spike, self.drift
+
+        count = self.count[row]
+        nan, present, seed, ready = self._nan, self._present, self._seed, self._ready
+        np.isnan(x, out=nan)
+        np.logical_not(nan, out=present)
+
+        # Seed each sensor from its first non-missing value
+        np.equal(count, 0, out=seed)
+        seed &= present
+        np.copyto(mean, x, where=seed)
+        np.copyto(baseline, x, where=seed)
+        np.copyto(var, 0.0, where=seed)
+
+        # Only sensors with enough readings before this one are scored
+        np.greater_equal(count, max(self.warmup, 1), out=ready)
+        count += present
+
+        # Missing sensors: treat the reading as equal to the current mean
+        np.copyto(x, mean, where=nan)
+
+        diff, std, score = self._diff, self._std, self._score
+
+        # Spike score against the statistics *before* this reading
+        np.subtract(x, mean, out=diff)
+        np.sqrt(var, out=std)
+        std += _EPS
+        np.abs(diff, out=score)
+        score /= std
+        np.greater(score, self.z_threshold, out=spike)
+
+        # EWMA mean and variance: incr = a*d; mean += incr; var = (1-a)(var + d*incr)
+        np.multiply(diff, self.alpha, out=score)
+        mean += score
+        diff *= score
+        var += diff
+        var *= 1.0 - self.alpha
+
+        # Slow baseline
+        np.subtract(x, baseline, out=diff)
+        diff *= self.baseline_alpha
+        baseline += diff
+
+        # Drift of the fast mean away from the baseline, in noise units
+        np.sqrt(var, out=std)
+        std += _EPS
+        np.subtract(mean, baseline, out=score)
+        np.abs(score, out=score)
+        score /= std
+        np.greater(score, self.drift_threshold, out=drift)
+
+        spike &= ready
+        drift &= ready
+        return bool(spike.any() or drift.any())
+
+    # ------------------------------------------------------------------
+    # Many engines at once (batch path)
+    # ------------------------------------------------------------------
+
+    def update_batch(self, engine_ids, X):
+        """
+        Absorb one reading for each of several *distinct* engines.
+
+        X is (len(engine_ids), len(sensors)). Returns (spike, drift) boolean
+        masks of the same shape.
+        """
+        rows = np.fromiter((self._row(e) for e in engine_ids), dtype=np.intp, count=len(engine_ids))
+        X = np.array(X, dtype=np.float64)
+        count = self.count[rows]
+        mean, var, baseline = self.mean[rows], self.var[rows], self.baseline[rows]
+
+        missing = np.isnan(X)
+        seed = (count == 0) & ~missing
+        mean[seed] = X[seed]
+        baseline[seed] = X[seed]
+        var[seed] = 0.0
+        X[missing] = mean[missing]
+
+        diff = X - mean
+        spike = np.abs(diff) / (np.sqrt(var) + _EPS) > self.z_threshold
+
+        incr = self.alpha * diff
+        mean += incr
+        var = (1.0 - self.alpha) * (var + diff * incr)
+        baseline += self.baseline_alpha * (X - baseline)
+        drift = np.abs(mean - baseline) / (np.sqrt(var) + _EPS) > self.drift_threshold
+
+        self.count[rows] = count + ~missing
+        self.mean[rows] = mean
+        self.var[rows] = var
+        self.baseline[rows] = baseline
+
+        quiet = count < max(self.warmup, 1)
+        spike[quiet] = False
+        drift[quiet] = False
+        return spike, drift
+
+    def describe(self, spike_row, drift_row) -> list:
+        """[{'sensor', 'type'}] for one reading's flags"""
+        return (
+            [{'sensor': self.sensors[i], 'type': 'spike'} for i in np.flatnonzero(spike_row)] +
+            [{'sensor': self.sensors[i], 'type': 'drift'} for i in np.flatnonzero(drift_row)]
+        )
+
+
+def detect_in_frame(df, sensors, unit_col='unit_nr', **kwargs):
+    """
+    Run a fresh detector over a whole uploaded frame (rows ordered by cycle
+    within each unit). Engines advance in lockstep: step k updates every
+    engine's k-th reading in one vectorized call.
+
+    Returns {engine_id: (spike_row, drift_row)} for each engine's last reading.
+    """
+    detector = StreamingAnomalyDetector(sensors, capacity=max(64, df[unit_col].nunique()), **kwargs)
+    X = df.reindex(columns=sensors).to_numpy(dtype=np.float64)
+    units = df[unit_col].to_numpy()
+    step = df.groupby(unit_col, sort=False).cumcount().to_numpy()
+
+    order = np.argsort(step, kind='stable')
+    bounds = np.flatnonzero(np.diff(step[order])) + 1
+    last = {}
+    for idx in np.split(order, bounds):
+        spike, drift = detector.update_batch(units[idx], X[idx])
+        for i, unit in enumerate(units[idx]):
+            last[unit] = (spike[i], drift[i])
+    return last
+
+
+# Test the detector on the simulator's training data
+if __name__ == "__main__":
+    import os
+    import time
+
+    import pandas as pd
+
+    sensor_map = {
+        's_2': 'LPC_Outlet_Temp', 's_3': 'HPC_Outlet_Temp', 's_4': 'LPT_Outlet_Temp',
+        's_7': 'HPC_Outlet_Pressure', 's_8': 'Fan_Speed', 's_9': 'Core_Speed',
+        's_11': 'Combustion_Pressure', 's_12': 'Fuel_Flow_Ratio', 's_13': 'Corrected_Fan_Speed',
+        's_14': 'Corrected_Core_Speed', 's_15': 'Bypass_Ratio', 's_17': 'Bleed_Enthalpy',
+        's_20': 'HPT_Coolant_Bleed', 's_21': 'LPT_Coolant_Bleed'
+    }
+    cols = ['unit_nr', 'time_cycles'] + [f'setting_{i}' for i in range(1, 4)] + [f's_{i}' for i in range(1, 22)]
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../dataset/train_FD001.txt')
+    df = pd.read_csv(path, sep=r'\s+', header=None, names=cols).rename(columns=sensor_map)
+    sensors = list(sensor_map.values())
+
+    # Streaming path: one reading at a time
+    detector = StreamingAnomalyDetector(sensors)
+    X = df[sensors].to_numpy()
+    units = df['unit_nr'].to_numpy()
+    flagged_at = {}
+    start = time.perf_counter()
+    for unit, row, cycle in zip(units, X, df['time_cycles'].to_numpy()):
+        if detector.update(unit, row) and unit not in flagged_at:
+            flagged_at[unit] = cycle
+    elapsed = time.perf_counter() - start
+    life = df.groupby('unit_nr')['time_cycles'].max()
+    print(f"update(): {elapsed / len(df) * 1e6:.2f} us/reading over {len(df)} readings, {detector.engines} engines")
+    print(f"Engines flagged: {len(flagged_at)}/{len(life)}, first flag at "
+          f"{np.mean([flagged_at[u] / life[u] for u in flagged_at]) * 100:.0f}% of life on average")
+
+    # Batch path: whole frame in lockstep
+    start = time.perf_counter()
+    last = detect_in_frame(df, sensors)
+    elapsed = time.perf_counter() - start
+    n_anomalous = sum(1 for spike, drift in last.values() if spike.any() or drift.any())
+    print(f"detect_in_frame(): {elapsed * 1e3:.1f} ms for {len(df)} readings; "
+          f"{n_anomalous} engines anomalous at their last reading")
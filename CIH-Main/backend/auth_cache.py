@@ -0,0 +1,84 @@
+"""
+VERIFIED-TOKEN CACHE
+====================
+Maps bearer tokens that already passed signature and expiry checks to the
+immutable User built for them, so repeat requests skip jwt.decode, the user
+lookup and model construction.
+
+- Entries expire at the token's own `exp` claim.
+- Size is bounded; the oldest cached token is evicted first (hits stay
+  lock-free and never reorder entries).
+- All tokens of a user can be dropped at once (deactivation, role change).
+  Dropping also bumps the user's generation: read generation() before
+  looking the user up and pass it to put(), and a lookup that raced with
+  the change is not cached.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerifiedTokenCache:
+    def __init__(self, maxsize=10000, clock=time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = OrderedDict()  # token -> (exp, username, user)
+        self._by_user = {}  # username -> set of tokens
+        self._generations = {}  # username -> invalidations so far
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token):
+        """Cached user for a still-valid token, else None"""
+        entry = self._entries.get(token)
+        if entry is not None and entry[0] > self.clock():
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        if entry is not None:
+            with self._lock:
+                self._drop(token)
+        return None
+
+    def generation(self, username) -> int:
+        return self._generations.get(username, 0)
+
+    def put(self, token, exp, username, user, generation=None):
+        """Cache a verified token; skipped if the user was invalidated since `generation` was read"""
+        with self._lock:
+            if generation is not None and generation != self._generations.get(username, 0):
+                return
+            if token in self._entries:
+                self._drop(token)
+            self._entries[token] = (exp, username, user)
+            self._by_user.setdefault(username, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, username) -> int:
+        """Forget every cached token of a user. Returns how many were dropped."""
+        with self._lock:
+            self._generations[username] = self._generations.get(username, 0) + 1
+            tokens = self._by_user.pop(username, ())
+            for token in tokens:
+                self._entries.pop(token, None)
+            return len(tokens)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _drop(self, token):
+        entry = self._entries.pop(token, None)
+        if entry is not None:
+            tokens = self._by_user.get(entry[1])
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._by_user[entry[1]]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,116 @@
+"""
+FAST RESPONSE ENCODING
+======================
+Central JSON encoding layer for REST responses and WebSocket frames.
+
+Uses orjson when it is installed (native datetime + NumPy support, returns
+bytes) and falls back to the standard library otherwise. Both backends
+produce the same JSON for the payloads this API emits; non-finite floats
+(NaN, e.g. missing sensors, and +-Infinity) are encoded as null by both.
+"""
+
+import json
+import math
+from datetime import date, datetime
+
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _default(obj):
+    """Fallback for types neither backend handles natively"""
+    # Pydantic models (Alert, User, ...)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj) -> bytes:
+        """Encode obj to UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def dumps_str(obj) -> str:
+        """Encode obj to a JSON str (for websocket.send_text)"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode("utf-8")
+
+    def loads(data):
+        """Decode JSON bytes or str; raises ValueError on malformed input"""
+        return orjson.loads(data)
+
+else:
+    def _finite(obj):
+        """obj with non-finite floats replaced by None (what orjson emits)"""
+        if isinstance(obj, float):
+            return obj if math.isfinite(obj) else None
+        if isinstance(obj, dict):
+            return {key: _finite(value) for key, value in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [_finite(value) for value in obj]
+        return obj
+
+    # allow_nan=False: never emit the invalid NaN/Infinity literals
+    _encoder = json.JSONEncoder(default=lambda obj: _finite(_default(obj)), separators=(",", ":"),
+                                ensure_ascii=False, allow_nan=False)
+
+    def _encode(obj) -> str:
+        try:
+            return _encoder.encode(obj)
+        except ValueError:
+            # Rare: a non-finite float somewhere; walk the payload once to null it
+            return _encoder.encode(_finite(obj))
+
+    def dumps(obj) -> bytes:
+        """Encode obj to UTF-8 JSON bytes"""
+        return _encode(obj).encode("utf-8")
+
+    def dumps_str(obj) -> str:
+        """Encode obj to a JSON str (for websocket.send_text)"""
+        return _encode(obj)
+
+    def loads(data):
+        """Decode JSON bytes or str; raises ValueError on malformed input"""
+        return json.loads(data)
+
+
+class FastJSONResponse(Response):
+    """
+    JSONResponse replacement that skips FastAPI's jsonable_encoder walk.
+
+    Use it as `response_class` on a route (or return it directly) when the
+    handler already returns plain dicts/lists, NumPy scalars or datetimes.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+# Test the encoder
+if __name__ == "__main__":
+    from datetime import timezone
+
+    sample = {
+        "timestamp": datetime.now(timezone.utc),
+        "rul": np.float64(42.5),
+        "cycle": np.int64(120),
+        "sensors": {"LPT_Outlet_Temp": np.float32(1401.25)},
+        "history": np.arange(3),
+    }
+    print(f"Backend: {BACKEND}")
+    print(dumps_str(sample))
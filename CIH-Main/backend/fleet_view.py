@@ -0,0 +1,158 @@
+"""
+FLEET SUMMARY VIEW
+==================
+Materialized view of the latest state of every engine, maintained as
+predictions arrive so that reading it never rescans the fleet:
+
+- status counts: adjusted by the old and new status of the updated engine
+- lowest RUL: a sorted list of (rul, engine_id) kept with bisect; the k
+  most urgent engines are its first k entries
+- out-of-range sensors: running count of out-of-range readings per
+  sensor, plus how many engines are out of range on it right now
+
+Updates cost O(log n) for the search (plus a list memmove); summary(k)
+costs O(k + sensors).
+"""
+
+import time
+from bisect import bisect_left, insort
+
+import numpy as np
+
+
+class FleetView:
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        # engine_id -> [rul, status, cycle, updated, out-of-range sensors (tuple)]
+        self._latest = {}
+        self._by_rul = []  # sorted (rul, engine_id)
+        self.status_counts = {}
+        self.readings = 0
+        self.readings_out_of_range = {}  # sensor -> readings out of range (cumulative)
+        self.engines_out_of_range = {}  # sensor -> engines whose latest reading is out of range
+        self.updated = None
+
+    def __len__(self):
+        return len(self._latest)
+
+    @staticmethod
+    def _adjust(counts, keys, delta):
+        for key in keys:
+            value = counts.get(key, 0) + delta
+            if value:
+                counts[key] = value
+            else:
+                counts.pop(key, None)
+
+    def _set_latest(self, engine_id, cycle, rul, status, out_of_range, now):
+        rul = float(rul)
+        if rul != rul:  # NaN would corrupt the sorted index
+            return
+        old = self._latest.get(engine_id)
+        if old is not None:
+            del self._by_rul[bisect_left(self._by_rul, (old[0], engine_id))]
+            self._adjust(self.status_counts, (old[1],), -1)
+            self._adjust(self.engines_out_of_range, old[4], -1)
+        insort(self._by_rul, (rul, engine_id))
+        self._adjust(self.status_counts, (status,), 1)
+        self._adjust(self.engines_out_of_range, out_of_range, 1)
+        self._latest[engine_id] = [rul, status, cycle, now, out_of_range]
+
+    def update(self, engine_id, cycle, rul, status, out_of_range=()):
+        """One prediction; out_of_range = names of the sensors outside their valid range"""
+        now = self.clock()
+        out_of_range = tuple(out_of_range)
+        self.readings += 1
+        self._adjust(self.readings_out_of_range, out_of_range, 1)
+        self._set_latest(engine_id, cycle, rul, status, out_of_range, now)
+        self.updated = now
+
+    def update_many(self, engine_ids, cycles, ruls, statuses, out_of_range_mask, sensors):
+        """
+        A batch of predictions in arrival order. out_of_range_mask is
+        (n, len(sensors)) booleans. Only each engine's last reading changes
+        its latest state; every reading counts towards the sensor totals.
+        """
+        n = len(engine_ids)
+        if not n:
+            return
+        now = self.clock()
+        mask = np.asarray(out_of_range_mask, dtype=bool)
+        self.readings += n
+        for sensor, count in zip(sensors, mask.sum(axis=0).tolist()):
+            if count:
+                self.readings_out_of_range[sensor] = self.readings_out_of_range.get(sensor, 0) + count
+
+        # Position of each engine's last reading
+        reversed_ids = np.asarray(engine_ids)[::-1]
+        _, first_in_reversed = np.unique(reversed_ids, return_index=True)
+        for i in sorted((n - 1 - first_in_reversed).tolist()):
+            flagged = tuple(sensors[j] for j in np.flatnonzero(mask[i])) if mask[i].any() else ()
+            self._set_latest(int(engine_ids[i]), int(cycles[i]), ruls[i], statuses[i], flagged, now)
+        self.updated = now
+
+    def lowest_rul(self, k=10) -> list:
+        out = []
+        for rul, engine_id in self._by_rul[:k]:
+            _, status, cycle, updated, out_of_range = self._latest[engine_id]
+            out.append({
+                "engine_id": engine_id,
+                "rul": round(rul, 2),
+                "status": status,
+                "cycle": cycle,
+                "updated": updated,
+                "sensors_out_of_range": list(out_of_range)
+            })
+        return out
+
+    def summary(self, k=10) -> dict:
+        # Every sensor an engine is out of range on has out-of-range readings
+        sensors = sorted(self.readings_out_of_range.items(), key=lambda item: -item[1])
+        return {
+            "engines": len(self._latest),
+            "readings": self.readings,
+            "status_counts": dict(self.status_counts),
+            "lowest_rul": self.lowest_rul(k),
+            "sensors_out_of_range": [
+                {"sensor": sensor, "readings": count, "engines": self.engines_out_of_range.get(sensor, 0)}
+                for sensor, count in sensors
+            ],
+            "updated": self.updated
+        }
+
+
+# Incremental view vs. recomputing the summary from all engines
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    n_engines, n_updates = 100_000, 200_000
+    sensors = [f"s{i}" for i in range(14)]
+    view = FleetView()
+    latest = {}
+
+    def status_of(rul):
+        return "Critical" if rul < 20 else "Warning" if rul < 50 else "Healthy"
+
+    engine_ids = rng.integers(0, n_engines, size=n_updates)
+    ruls = rng.uniform(0, 125, size=n_updates).round(2)
+    masks = rng.random((n_updates, len(sensors))) < 0.01
+    start = time.perf_counter()
+    for i in range(n_updates):
+        e, rul = int(engine_ids[i]), float(ruls[i])
+        view.update(e, i, rul, status_of(rul), [sensors[j] for j in np.flatnonzero(masks[i])])
+        latest[e] = (rul, status_of(rul))
+    update_us = (time.perf_counter() - start) / n_updates * 1e6
+
+    start = time.perf_counter()
+    for _ in range(100):
+        summary = view.summary(10)
+    read_us = (time.perf_counter() - start) / 100 * 1e6
+
+    start = time.perf_counter()
+    counts = {}
+    for rul, status in latest.values():
+        counts[status] = counts.get(status, 0) + 1
+    lowest = sorted((rul, e) for e, (rul, _) in latest.items())[:10]
+    full_ms = (time.perf_counter() - start) * 1e3
+
+    print(f"{len(view)} engines, {n_updates} updates: {update_us:.1f} us/update")
+    print(f"summary(10): {read_us:.1f} us (full recomputation: {full_ms:.1f} ms)")
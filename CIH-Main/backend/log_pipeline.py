@@ -0,0 +1,209 @@
+"""
+LOG PIPELINE
+============
+Keeps log I/O off the event loop.
+
+Callers only format the record and push it onto an in-memory queue
+(QueueHandler). A background QueueListener thread does the slow part:
+writing to a size-rotated file and to the console.
+
+- RateLimitFilter: per call site, allows a burst of records and then a
+  steady rate; excess records are dropped before they are queued and the
+  next record that passes reports how many were suppressed. ERROR and
+  above always pass, as do records logged with extra=NO_RATE_LIMIT
+  (e.g. alerts, where every line matters). Beyond max_sites call sites
+  the least recently used one is forgotten.
+- JSONFormatter: one JSON object per line for log shippers.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from encoding import dumps_str
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# logger.warning(..., extra=NO_RATE_LIMIT) bypasses RateLimitFilter
+NO_RATE_LIMIT = {"rate_limit": False}
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per (file, line) call site"""
+
+    def __init__(self, rate=1.0, burst=10, exempt_level=logging.ERROR, max_sites=1000, clock=time.monotonic):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.exempt_level = exempt_level
+        self.max_sites = max_sites
+        self.clock = clock
+        self._sites = OrderedDict()  # (pathname, lineno) -> [tokens, updated, suppressed]
+        self._lock = threading.Lock()  # records arrive from threadpool threads too
+
+    def filter(self, record) -> bool:
+        if record.levelno >= self.exempt_level or not getattr(record, "rate_limit", True):
+            return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            now = self.clock()
+            site = self._sites.get(key)
+            if site is None:
+                site = self._sites[key] = [self.burst, now, 0]
+                if len(self._sites) > self.max_sites:
+                    self._sites.popitem(last=False)
+            else:
+                self._sites.move_to_end(key)
+            tokens = min(self.burst, site[0] + (now - site[1]) * self.rate)
+            site[1] = now
+            if tokens < 1:
+                site[0] = tokens
+                site[2] += 1
+                return False
+            site[0] = tokens - 1
+            suppressed, site[2] = site[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _FastQueueHandler(QueueHandler):
+    """
+    QueueHandler that prepares records in place. The stock prepare() copies
+    every record and runs a formatter; the root logger is the last stop for
+    these records, so merging args and rendering the traceback is enough.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _SuppressedNote(logging.Formatter):
+    """Text formatter that notes how many similar records were dropped"""
+
+    def format(self, record) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} [{suppressed} similar messages suppressed]" if suppressed else text
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return dumps_str(entry)
+
+
+def setup_logging(level=logging.INFO, path=None, max_bytes=10_000_000, backup_count=5,
+                  json_format=False, console=True, rate=1.0, burst=10) -> QueueListener:
+    """
+    Route all logging through a queue to a background writer thread.
+    Replaces any handlers already on the root logger. The listener is
+    stopped (and the queue flushed) at interpreter exit.
+    """
+    formatter = JSONFormatter() if json_format else _SuppressedNote(TEXT_FORMAT)
+    handlers = []
+    if path:
+        handlers.append(RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"))
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _FastQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(rate=rate, burst=burst))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_listener, listener)
+    return listener
+
+
+def stop_listener(listener):
+    """Flush queued records and stop the writer thread (safe to call twice)"""
+    if listener._thread is not None:
+        listener.stop()
+
+
+# Compare caller-side cost against synchronous file handlers
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    n = 20000
+
+    class SlowFileHandler(logging.FileHandler):
+        """A file on storage with 0.2 ms write latency"""
+
+        def emit(self, record):
+            time.sleep(0.0002)
+            super().emit(record)
+
+    def bench(logger, count=n):
+        start = time.perf_counter()
+        for i in range(count):
+            logger.info(f"WebSocket client connected. Active connections: {i}")
+        return (time.perf_counter() - start) / count * 1e6
+
+    def direct_logger(name, handler_class):
+        logger = logging.getLogger(name)
+        logger.propagate = False
+        handler = handler_class(os.path.join(directory, f"{name}.log"))
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        return logger
+
+    print(f"FileHandler, local disk:          {bench(direct_logger('direct', logging.FileHandler)):.1f} us/record")
+    print(f"FileHandler, 0.2 ms write stalls: {bench(direct_logger('slow', SlowFileHandler), 2000):.1f} us/record")
+
+    path = os.path.join(directory, "queued.log")
+    listener = setup_logging(path=path, console=False, rate=1e9, burst=n)
+    print(f"Queue pipeline (caller side):     {bench(logging.getLogger('queued')):.1f} us/record")
+    stop_listener(listener)
+
+    listener = setup_logging(path=path, console=False, json_format=True, rate=1.0, burst=3)
+    logger = logging.getLogger("sampled")
+
+    def missing(cycle):
+        logger.warning(f"Missing sensors in cycle {cycle}")
+
+    for i in range(100):
+        missing(i)
+    time.sleep(1.1)
+    missing(100)
+    stop_listener(listener)
+    with open(path) as f:
+        lines = f.read().splitlines()[n:]
+    print(f"\nRate-limited 101 repetitive warnings to {len(lines)} lines:")
+    for line in lines:
+        print(f"  {line}")
@@ -12,25 +12,39 @@ Enhanced with:
 import sys
 import os
 import asyncio
-import json
-import pandas as pd
+import numpy as np
 import io
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List
 import logging
-from collections import defaultdict
+from contextlib import asynccontextmanager
 import time
+from math import nan, ceil, isfinite
 
-from fastapi import FastAPI, WebSocket, UploadFile, File, Depends, HTTPException, status, Header
+from fastapi import FastAPI, WebSocket, UploadFile, File, Depends, HTTPException, status, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, EmailStr
-import jwt
-import bcrypt
+from pydantic import BaseModel, ConfigDict, EmailStr
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from ai_engine.inference import predict_rul, reset_predictor
-from sensor_sim_fixed import EngineSimulator
+from ai_engine import inference
+from ai_engine.inference import build_features, predict_features, predict_stream_features, predict_matrix, reset_predictor, StatefulPredictor, SENSOR_ORDER
+from ai_engine.features import FleetStreamingFeatures, lockstep_rounds
+from encoding import FastJSONResponse, dumps_str, loads
+from alert_store import AlertStore, SharedAlertStore
+from alert_engine import AlertEngine, default_rules
+from sensor_rules import SensorRuleSet, DEFAULT_RULES_PATH
+from auth_cache import VerifiedTokenCache
+from rate_limit import TokenBucketLimiter, MemoryBucketStore, SQLiteBucketStore
+from anomaly import StreamingAnomalyDetector, detect_in_frame
+from timeseries_store import TimeSeriesStore, DOWNSAMPLE_METHODS
+from fleet_view import FleetView
+from shared_state import LocalState, SQLiteState, SharedUserStatus
+from alert_dispatch import AlertDispatcher, FileSinkChannel, SMTPChannel, WebhookChannel
+from profiling import SamplingProfiler, ProfilerBusy, Tracer
+from log_pipeline import setup_logging, NO_RATE_LIMIT
+from metrics import REGISTRY, CONTENT_TYPE, Counter, Gauge, Histogram, HTTPMetricsMiddleware, monitor_event_loop_lag
 
 # ============================================================================
 # CONFIGURATION
@@ -40,34 +54,147 @@ from sensor_sim_fixed import EngineSimulator
 SECRET_KEY = "your-secret-key-change-in-production"  # CHANGE THIS IN PRODUCTION!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+TOKEN_CACHE_SIZE = 10000  # verified tokens kept in memory
 
 # Alert Configuration
 ALERT_EMAIL = "alerts@aegisflow.com"  # Configure your SMTP server
 ALERT_PHONE = "+1234567890"  # Configure Twilio/similar service
 
+# Alert Dispatch Configuration (a channel is enabled when its setting is present)
+ALERT_SMTP_HOST = os.environ.get("AEGISFLOW_SMTP_HOST")
+ALERT_SMTP_PORT = int(os.environ.get("AEGISFLOW_SMTP_PORT", "25"))
+ALERT_SMTP_USER = os.environ.get("AEGISFLOW_SMTP_USER")
+ALERT_SMTP_PASSWORD = os.environ.get("AEGISFLOW_SMTP_PASSWORD")
+ALERT_EMAIL_RECIPIENTS = os.environ.get("AEGISFLOW_ALERT_RECIPIENTS", ALERT_EMAIL).split(",")
+ALERT_WEBHOOK_URL = os.environ.get("AEGISFLOW_ALERT_WEBHOOK")  # Slack/Teams/PagerDuty/SMS gateway
+ALERT_FILE_SINK = os.environ.get("AEGISFLOW_ALERT_FILE")  # JSON lines
+ALERT_DISPATCH_QUEUE_SIZE = 10000  # per channel; alerts beyond this are dropped and counted
+ALERT_DISPATCH_RETRIES = 3
+
+# Multi-Worker Configuration (uvicorn --workers N needs STATE_BACKEND=sqlite)
+STATE_BACKEND = os.environ.get("AEGISFLOW_STATE_BACKEND", "local")  # "local" or "sqlite" (shared by all workers)
+STATE_DB = os.environ.get("AEGISFLOW_STATE_DB", "aegisflow_state.db")
+STATE_PUBLISH_SECONDS = 1.0  # how stale other workers' counters may be
+
+# Alert Store Configuration
+ALERT_STORE_CAPACITY = 1000  # alerts kept in memory (ring buffer)
+ALERT_STORE_BUCKET_SECONDS = 60  # time-index granularity
+ALERT_SPILL_PATH = os.environ.get("AEGISFLOW_ALERT_DB", "aegisflow_alerts.db")  # "" disables the SQLite tier
+
+# Alert Stream (SSE) Configuration
+SSE_HEARTBEAT_SECONDS = 15  # comment line to keep proxies from closing idle streams
+SSE_RETRY_MS = 3000  # client reconnect delay
+SSE_QUEUE_SIZE = 256  # per-subscriber backlog before resyncing from the store
+SSE_REPLAY_PAGE = 1000  # alerts read from the store per replay query
+
+# Alert Engine Configuration
+ALERT_COOLDOWN_SECONDS = 300  # suppress re-raising a cleared alert for this long
+ALERT_RUL_HYSTERESIS = 5.0  # RUL must recover this many cycles past a threshold to clear
+ALERT_TEMP_HYSTERESIS = 2.0  # LPT temperature margin (°R) to clear
+ALERT_ENGINE_MAX_ENGINES = 100_000  # engines with rule state (least recently evaluated evicted)
+
+# Sensor Rules Configuration (valid ranges + critical thresholds)
+SENSOR_RULES_PATH = os.environ.get("AEGISFLOW_SENSOR_RULES", DEFAULT_RULES_PATH)
+
 # Rate Limiting Configuration
-RATE_LIMIT_REQUESTS = 100  # requests per minute
+RATE_LIMIT_REQUESTS = int(os.environ.get("AEGISFLOW_RATE_LIMIT_REQUESTS", "100"))  # requests per minute
 RATE_LIMIT_WINDOW = 60  # seconds
+RATE_LIMIT_BURST = int(os.environ.get("AEGISFLOW_RATE_LIMIT_BURST", "20"))  # bucket size: requests allowed back-to-back
+RATE_LIMIT_MAX_KEYS = 10000  # in-memory buckets kept (least recently used evicted)
+RATE_LIMIT_BACKEND = os.environ.get(
+    "AEGISFLOW_RATE_LIMIT_BACKEND", "sqlite" if STATE_BACKEND == "sqlite" else "memory"
+)  # "memory" or "sqlite"
+RATE_LIMIT_DB = os.environ.get("AEGISFLOW_RATE_LIMIT_DB", "aegisflow_ratelimit.db")
+
+# Prediction History Configuration (SQLite WAL, written by a background thread)
+TIMESERIES_DB = os.environ.get("AEGISFLOW_TIMESERIES_DB", "aegisflow_timeseries.db")  # "" disables history
+TIMESERIES_BATCH_SIZE = 5000  # rows per insert transaction
+TIMESERIES_FLUSH_SECONDS = 1.0  # longest a row waits for its batch
+TIMESERIES_QUEUE_SIZE = 10000  # queued write batches; beyond this rows are dropped and counted
+HISTORY_DEFAULT_POINTS = 500  # /engines/{id}/history downsampling target
+HISTORY_MAX_POINTS = 5000
+
+# Fleet Summary Configuration (GET /fleet/summary)
+FLEET_SUMMARY_DEFAULT_LOWEST = 10  # engines listed by lowest RUL
+FLEET_SUMMARY_MAX_LOWEST = 100
+
+# Fleet Ingest Configuration (POST /predict/batch)
+PREDICT_BATCH_MAX_READINGS = 100_000  # per request
+PREDICT_BATCH_MAX_BYTES = 64 * 1024 * 1024
+
+# Readiness Configuration
+WARMUP_SAMPLE_ROWS = 32  # representative readings used to warm the model at startup
+WARMUP_BATCH_SIZES = (1, 16, 128)
+CANARY_INTERVAL_SECONDS = 30  # background canary prediction period
+CANARY_MAX_AGE_SECONDS = 3 * CANARY_INTERVAL_SECONDS  # /readyz fails if the last good canary is older
+
+# Logging Configuration
+LOG_LEVEL = os.environ.get("AEGISFLOW_LOG_LEVEL", "INFO")
+LOG_FILE = os.environ.get("AEGISFLOW_LOG_FILE", "aegisflow.log")  # "" logs to the console only
+LOG_MAX_BYTES = 10 * 1024 * 1024  # rotate the log file at this size
+LOG_BACKUP_COUNT = 5
+LOG_JSON = os.environ.get("AEGISFLOW_LOG_JSON", "0") == "1"  # one JSON object per line
+LOG_RATE_LIMIT_PER_SECOND = 1.0  # sustained records per second from one call site
+LOG_RATE_LIMIT_BURST = 20  # records one call site may log back-to-back (errors are never limited)
+
+# Metrics Configuration
+EVENT_LOOP_LAG_INTERVAL = 0.5  # seconds between event-loop lag probes
+
+# Profiling & Tracing Configuration (admin endpoints; both off until requested)
+PROFILE_MAX_SECONDS = 60
+PROFILE_INTERVAL_MS = 5  # default sampling interval
+TRACE_BUFFER_SIZE = 200  # finished traces kept in memory
 
 # ============================================================================
 # LOGGING SETUP
 # ============================================================================
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('aegisflow.log'),
-        logging.StreamHandler()
-    ]
-)
+# Handlers run in a background thread; callers only enqueue records. Set up
+# by the lifespan, so importing this module leaves the process's logging alone.
+log_listener = None
+
+def start_logging():
+    global log_listener
+    if log_listener is None:
+        log_listener = setup_logging(
+            level=LOG_LEVEL,
+            path=LOG_FILE,
+            max_bytes=LOG_MAX_BYTES,
+            backup_count=LOG_BACKUP_COUNT,
+            json_format=LOG_JSON,
+            rate=LOG_RATE_LIMIT_PER_SECOND,
+            burst=LOG_RATE_LIMIT_BURST
+        )
+
 logger = logging.getLogger(__name__)
 
 # ============================================================================
 # FASTAPI APP INITIALIZATION
 # ============================================================================
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_logging()
+    open_storage()
+    await alert_dispatcher.start()
+    lag_monitor = asyncio.create_task(
+        monitor_event_loop_lag(EVENT_LOOP_LAG, EVENT_LOOP_LAG_SECONDS, interval=EVENT_LOOP_LAG_INTERVAL)
+    )
+    # Warm-up runs in the background so /livez answers immediately; /readyz waits for it
+    global runtime_loading
+    runtime_loading = asyncio.create_task(asyncio.to_thread(load_runtime))
+    readiness_task = asyncio.create_task(readiness_loop())
+    if timeseries is not None:
+        timeseries.start()
+    server_state.start()
+    yield
+    readiness_task.cancel()
+    lag_monitor.cancel()
+    await alert_dispatcher.stop()
+    close_storage()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="AegisFlow RUL Prediction API",
     description="Production-grade API for predicting Remaining Useful Life of turbofan engines",
     version="2.0.0",
@@ -88,6 +215,7 @@ app.add_middleware(
 # ============================================================================
 
 security = HTTPBearer()
+token_cache = VerifiedTokenCache(maxsize=TOKEN_CACHE_SIZE)
 
 # Pre-hashed passwords using bcrypt
 # Generated with: bcrypt.hashpw(b"admin123", bcrypt.gensalt())
@@ -112,6 +240,9 @@ USERS_DB = {
 }
 
 class User(BaseModel):
+    # Immutable: one instance is shared by every request using the same token
+    model_config = ConfigDict(frozen=True)
+    
     username: str
     email: EmailStr
     role: str
@@ -126,6 +257,7 @@ class LoginRequest(BaseModel):
     password: str
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
+    import bcrypt
     try:
         return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
     except Exception as e:
@@ -133,6 +265,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    import jwt
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
@@ -141,22 +274,58 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
     """Dependency to get current authenticated user"""
+    token = credentials.credentials
+    
+    # Fast path: token already verified, not yet expired and its user unchanged on other workers
+    user = token_cache.get(token)
+    if user is not None and not sync_user(user.username):
+        return user
+    
+    import jwt
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        
-        user_dict = USERS_DB.get(username)
-        if user_dict is None:
-            raise HTTPException(status_code=401, detail="User not found")
-        
-        return User(**user_dict)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
+    
+    username: str = payload.get("sub")
+    if username is None:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    
+    sync_user(username)
+    # Read before the user record: a deactivation in between makes put() a no-op
+    generation = token_cache.generation(username)
+    user_dict = USERS_DB.get(username)
+    if user_dict is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    
+    user = User(**user_dict)
+    token_cache.put(token, payload["exp"], username, user, generation)
+    return user
+
+user_generations = {}  # username -> shared status generation applied to USERS_DB in this worker
+
+def sync_user(username: str) -> bool:
+    """Apply a change another worker made to a user (multi-worker mode). True if there was one."""
+    if user_status is None:
+        return False
+    status = user_status.get(username)
+    if status is None or status[1] == user_generations.get(username, 0):
+        return False
+    active, generation = status
+    if username in USERS_DB:
+        USERS_DB[username]["active"] = active
+    user_generations[username] = generation
+    token_cache.invalidate_user(username)
+    return True
+
+def set_user_active(username: str, active: bool):
+    """Activate/deactivate a user; cached tokens are dropped so the change applies immediately"""
+    USERS_DB[username]["active"] = active
+    if user_status is not None:
+        user_generations[username] = user_status.set_active(username, active)
+    token_cache.invalidate_user(username)
 
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Ensure user is active"""
@@ -164,32 +333,39 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def require_admin(current_user: User = Depends(get_current_active_user)) -> User:
+    """Ensure user has the admin role"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return current_user
+
 # ============================================================================
 # RATE LIMITING
 # ============================================================================
 
-rate_limit_storage = defaultdict(lambda: {"count": 0, "reset_time": time.time() + RATE_LIMIT_WINDOW})
+def build_rate_limit_store(shared=False):
+    """Per-process buckets, or (shared) a SQLite file used by every worker"""
+    if shared:
+        return SQLiteBucketStore(RATE_LIMIT_DB)
+    return MemoryBucketStore(max_keys=RATE_LIMIT_MAX_KEYS)
+
+# Per-process buckets until open_storage() switches to the shared file (RATE_LIMIT_BACKEND "sqlite")
+rate_limiter = TokenBucketLimiter(
+    rate=RATE_LIMIT_REQUESTS / RATE_LIMIT_WINDOW,
+    capacity=RATE_LIMIT_BURST,
+    store=build_rate_limit_store()
+)
 
 def check_rate_limit(user: User = Depends(get_current_active_user)):
-    """Rate limiting middleware"""
-    current_time = time.time()
-    user_key = user.username
-    
-    # Reset counter if window has passed
-    if current_time > rate_limit_storage[user_key]["reset_time"]:
-        rate_limit_storage[user_key] = {
-            "count": 0,
-            "reset_time": current_time + RATE_LIMIT_WINDOW
-        }
-    
-    # Check limit
-    if rate_limit_storage[user_key]["count"] >= RATE_LIMIT_REQUESTS:
+    """Rate limiting dependency (token bucket per user)"""
+    allowed, retry_after = rate_limiter.acquire(user.username)
+    if not allowed:
+        wait = max(1, ceil(retry_after))
         raise HTTPException(
             status_code=429,
-            detail=f"Rate limit exceeded. Try again in {int(rate_limit_storage[user_key]['reset_time'] - current_time)} seconds"
+            detail=f"Rate limit exceeded. Try again in {wait} seconds",
+            headers={"Retry-After": str(wait)}
         )
-    
-    rate_limit_storage[user_key]["count"] += 1
     return user
 
 # ============================================================================
@@ -205,102 +381,367 @@ class Alert(BaseModel):
     message: str
     sensors: dict
 
-alert_history: List[Alert] = []
+def build_alert_store():
+    """
+    In-memory ring buffer with a SQLite spill tier; with shared state, a
+    write-through SQLite store so every worker sees every alert
+    """
+    if STATE_BACKEND == "sqlite":
+        return SharedAlertStore(Alert, ALERT_SPILL_PATH or STATE_DB)
+    return AlertStore(
+        Alert,
+        capacity=ALERT_STORE_CAPACITY,
+        bucket_seconds=ALERT_STORE_BUCKET_SECONDS,
+        spill_path=ALERT_SPILL_PATH or None
+    )
+
+alert_store = None  # opened by the lifespan (open_storage)
+
+def build_alert_channels() -> list:
+    """Alert delivery channels enabled by configuration"""
+    channels = []
+    if ALERT_FILE_SINK:
+        channels.append(FileSinkChannel(ALERT_FILE_SINK))
+    if ALERT_WEBHOOK_URL:
+        channels.append(WebhookChannel(ALERT_WEBHOOK_URL))
+    if ALERT_SMTP_HOST:
+        # Email only for critical alerts, one digest per batch
+        channels.append(SMTPChannel(
+            ALERT_SMTP_HOST,
+            ALERT_SMTP_PORT,
+            sender=ALERT_EMAIL,
+            recipients=ALERT_EMAIL_RECIPIENTS,
+            username=ALERT_SMTP_USER,
+            password=ALERT_SMTP_PASSWORD,
+            starttls=ALERT_SMTP_USER is not None
+        ))
+    return channels
+
+alert_dispatcher = AlertDispatcher(
+    build_alert_channels(),
+    queue_size=ALERT_DISPATCH_QUEUE_SIZE,
+    retries=ALERT_DISPATCH_RETRIES
+)
 
 async def send_alert(alert: Alert):
     """Send real-time alerts via email/SMS"""
-    alert_history.append(alert)
-    
-    # Keep only last 100 alerts in memory
-    if len(alert_history) > 100:
-        alert_history.pop(0)
+    alert_store.add(alert)
     
-    logger.warning(f"ALERT: {alert.alert_type.upper()} - Engine {alert.engine_id} - RUL: {alert.rul} cycles - {alert.message}")
+    logger.warning(f"ALERT: {alert.alert_type.upper()} - Engine {alert.engine_id} - RUL: {alert.rul} cycles - {alert.message}",
+                   extra=NO_RATE_LIMIT)
     
-    # In production, integrate with:
-    # - SendGrid/AWS SES for email
-    # - Twilio for SMS
-    # - Slack/Teams webhooks
-    # - PagerDuty for on-call alerts
-    
-    if alert.alert_type == "critical":
-        # Example: Send email
-        # await send_email(ALERT_EMAIL, f"CRITICAL: Engine {alert.engine_id}", alert.message)
-        # await send_sms(ALERT_PHONE, f"CRITICAL: Engine {alert.engine_id} RUL: {alert.rul}")
-        pass
+    # Email/webhook/file delivery happens in the dispatcher's worker tasks
+    alert_dispatcher.submit(alert)
 
-def check_alert_conditions(engine_id: int, cycle: int, rul: float, sensors: dict) -> Optional[Alert]:
-    """Check if alert should be triggered"""
-    
-    # Critical: RUL < 20 cycles
-    if rul < 20:
-        return Alert(
-            timestamp=datetime.now(timezone.utc),
-            engine_id=engine_id,
-            alert_type="critical",
-            rul=rul,
-            cycle=cycle,
-            message=f"CRITICAL: Engine {engine_id} requires immediate maintenance. RUL: {rul:.1f} cycles remaining.",
-            sensors=sensors
-        )
+alert_engine = AlertEngine(
+    rules=default_rules(rul_hysteresis=ALERT_RUL_HYSTERESIS, temp_hysteresis=ALERT_TEMP_HYSTERESIS),
+    cooldown_seconds=ALERT_COOLDOWN_SECONDS,
+    max_engines=ALERT_ENGINE_MAX_ENGINES
+)
+
+def check_alert_conditions(engine_id: int, cycle: int, rul: float, sensors: dict) -> List[Alert]:
+    """
+    Check if alerts should be triggered.
     
-    # Warning: RUL < 50 cycles
-    elif rul < 50:
-        return Alert(
-            timestamp=datetime.now(timezone.utc),
-            engine_id=engine_id,
-            alert_type="warning",
-            rul=rul,
-            cycle=cycle,
-            message=f"WARNING: Engine {engine_id} approaching maintenance window. RUL: {rul:.1f} cycles remaining.",
-            sensors=sensors
-        )
+    Rule state is tracked per engine, so an engine that stays below a
+    threshold only alerts once (and again if it escalates).
+    """
+    events = alert_engine.evaluate(engine_id, rul, sensors)
+    if not events:
+        return []
     
-    # Sensor anomaly alerts
-    if sensors.get('LPT_Outlet_Temp', 0) > 1427:
-        return Alert(
-            timestamp=datetime.now(timezone.utc),
+    timestamp = datetime.now(timezone.utc)
+    return [
+        Alert(
+            timestamp=timestamp,
             engine_id=engine_id,
-            alert_type="warning",
+            alert_type=alert_type,
             rul=rul,
             cycle=cycle,
-            message=f"WARNING: High LPT temperature detected on Engine {engine_id}",
+            message=message,
             sensors=sensors
+        ) for rule, alert_type, message in events
+    ]
+
+# ============================================================================
+# METRICS (Prometheus text format at /metrics)
+# ============================================================================
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "aegisflow_http_request_duration_seconds",
+    "HTTP request latency until the response starts, by route template",
+    ["method", "route", "status"]
+)
+STAGE_SECONDS = Histogram(
+    "aegisflow_stage_duration_seconds",
+    "Time spent in each prediction pipeline stage",
+    ["stage"]
+)
+ALERT_DELIVERY_SECONDS = Histogram(
+    "aegisflow_alert_delivery_seconds",
+    "Time from alert submission to delivery, by channel",
+    ["channel"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+EVENT_LOOP_LAG = Gauge("aegisflow_event_loop_lag_seconds", "Latest event loop wake-up delay")
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "aegisflow_event_loop_lag_distribution_seconds",
+    "Event loop wake-up delay"
+)
+
+# Stage children resolved once so the hot paths skip the label lookup
+STAGE_PARSE = STAGE_SECONDS.labels("parse")
+STAGE_FEATURES = STAGE_SECONDS.labels("features")
+STAGE_PREDICT = STAGE_SECONDS.labels("predict")
+STAGE_RULES = STAGE_SECONDS.labels("rules")
+STAGE_ANOMALY = STAGE_SECONDS.labels("anomaly")
+STAGE_ALERTS = STAGE_SECONDS.labels("alerts")
+STAGE_SERIALIZE = STAGE_SECONDS.labels("serialize")
+STAGE_WS_SEND = STAGE_SECONDS.labels("ws_send")
+
+app.add_middleware(HTTPMetricsMiddleware, histogram=HTTP_REQUEST_SECONDS)
+alert_dispatcher.latency_observer = lambda channel, seconds: ALERT_DELIVERY_SECONDS.labels(channel).observe(seconds)
+
+# Values owned by other components are read at scrape time
+Gauge("aegisflow_uptime_seconds", "Seconds since the API started").set_function(
+    lambda: (datetime.now(timezone.utc) - START_TIME).total_seconds()
+)
+Counter("aegisflow_requests_total", "Authenticated API requests").set_function(
+    lambda: server_state.get("total_requests")
+)
+Counter("aegisflow_predictions_total", "RUL predictions made").set_function(
+    lambda: server_state.get("total_predictions")
+)
+Counter("aegisflow_alerts_total", "Alerts raised").set_function(lambda: server_state.get("total_alerts"))
+Gauge("aegisflow_active_websocket_connections", "Open /ws connections").set_function(
+    lambda: server_state.get("active_connections")
+)
+Gauge("aegisflow_alert_stream_subscribers", "Open /alerts/stream connections").set_function(
+    lambda: alert_store.subscribers if alert_store is not None else 0
+)
+Gauge("aegisflow_alert_history_size", "Alerts held in memory").set_function(
+    lambda: len(alert_store) if alert_store is not None else 0
+)
+Gauge("aegisflow_alerts_active", "Alert rules currently raised").set_function(lambda: alert_engine.active())
+
+_rule_events = Counter("aegisflow_alert_rule_events_total", "Alert rule evaluations and transitions", ["event"])
+for _event in ("evaluated", "raised", "escalated", "cleared", "suppressed", "evicted"):
+    _rule_events.labels(_event).set_function(lambda event=_event: alert_engine.stats[event])
+
+_dispatch_depth = Gauge("aegisflow_alert_dispatch_queue_depth", "Alerts waiting for delivery", ["channel"])
+_dispatch_events = Counter("aegisflow_alert_dispatch_total", "Alert delivery outcomes", ["channel", "outcome"])
+for _channel in alert_dispatcher.stats():
+    _dispatch_depth.labels(_channel).set_function(
+        lambda channel=_channel: alert_dispatcher.stats()[channel]["queue_depth"]
+    )
+    for _outcome in ("delivered", "failed", "dropped", "retries"):
+        _dispatch_events.labels(_channel, _outcome).set_function(
+            lambda channel=_channel, outcome=_outcome: alert_dispatcher.stats()[channel][outcome]
         )
-    
-    return None
+
+Gauge("aegisflow_timeseries_queue_depth", "Prediction history batches waiting to be written").set_function(
+    lambda: timeseries.pending if timeseries is not None else 0
+)
+_timeseries_rows = Counter("aegisflow_timeseries_rows_total", "Prediction history rows", ["outcome"])
+_timeseries_rows.labels("written").set_function(lambda: timeseries.written if timeseries is not None else 0)
+_timeseries_rows.labels("dropped").set_function(lambda: timeseries.dropped if timeseries is not None else 0)
+
+Gauge("aegisflow_fleet_engines", "Engines in the fleet summary view").set_function(lambda: len(fleet_view))
+
+Gauge("aegisflow_token_cache_size", "Verified tokens cached").set_function(lambda: len(token_cache))
+_token_cache_lookups = Counter("aegisflow_token_cache_lookups_total", "Token cache lookups", ["result"])
+_token_cache_lookups.labels("hit").set_function(lambda: token_cache.hits)
+_token_cache_lookups.labels("miss").set_function(lambda: token_cache.misses)
+
+profiler = SamplingProfiler(interval=PROFILE_INTERVAL_MS / 1000)
+tracer = Tracer(capacity=TRACE_BUFFER_SIZE)
+
+def stage_done(stage, name: str, start: float):
+    """Record a finished pipeline stage in its histogram and, while tracing is on, the current trace"""
+    end = time.perf_counter()
+    stage.observe(end - start)
+    tracer.record(name, start, end)
 
 # ============================================================================
 # HEALTH CHECK & MONITORING
 # ============================================================================
 
-system_health = {
-    "start_time": datetime.now(timezone.utc),
-    "total_requests": 0,
-    "total_predictions": 0,
-    "total_alerts": 0,
-    "active_connections": 0
+START_TIME = datetime.now(timezone.utc)
+
+def build_server_state(shared=False):
+    """Counters of this process, or (shared) summed over all workers sharing STATE_DB"""
+    counters = ("total_requests", "total_predictions", "total_alerts")
+    gauges = ("active_connections",)
+    if shared:
+        return SQLiteState(STATE_DB, counters, gauges, publish_interval=STATE_PUBLISH_SECONDS)
+    return LocalState(counters, gauges)
+
+# Per process until open_storage() switches to the shared file (STATE_BACKEND "sqlite")
+server_state = build_server_state()
+
+# Users' active flags as changed on any worker; set by open_storage() with shared state
+user_status = None
+
+# Loaded by load_runtime() in the background at startup
+sim = None
+runtime_loading = None  # asyncio task of load_runtime(), created by the lifespan
+
+def load_runtime():
+    """
+    The slow part of startup: unpickling the model (imports xgboost,
+    scikit-learn and scipy), pandas and the simulator's dataset. The
+    lifespan runs it in a thread so /livez and /health answer at once.
+    """
+    global sim
+    from sensor_sim_fixed import EngineSimulator
+    inference.load_models()
+    if sim is None:
+        sim = EngineSimulator()
+
+async def wait_for_runtime():
+    """Dependency of endpoints that need the model or simulator: waits out startup loading"""
+    if runtime_loading is None:  # served without the lifespan
+        await asyncio.to_thread(load_runtime)
+    elif not runtime_loading.done():
+        await asyncio.shield(runtime_loading)
+
+def runtime_loaded() -> bool:
+    return runtime_loading is not None and runtime_loading.done()
+
+# Maintained by readiness_loop(); the probes only read it
+readiness = {
+    "warmed_up": False,
+    "warmup_seconds": None,
+    "canary_ok": False,
+    "canary_checked_at": None,  # time.monotonic() of the last successful canary
+    "canary_latency_ms": None,
+    "error": None
 }
 
+def warm_up_model():
+    """
+    Warm the feature and model paths with readings sampled across an
+    engine's life. Returns (canary_input, expected_rul) for the canary.
+    """
+    df = sim.full_df
+    if df is None or len(df) == 0:
+        raise RuntimeError("No simulator data for warm-up")
+    unit = df[df['unit_nr'] == df['unit_nr'].iloc[0]]
+    step = max(1, len(unit) // WARMUP_SAMPLE_ROWS)
+    rows = [
+        {k: v for k, v in row.items() if k not in ['unit_nr', 'time_cycles', 'setting_1', 'setting_2', 'setting_3']}
+        for row in unit.iloc[::step].to_dict('records')
+    ]
+    
+    start = time.perf_counter()
+    timings = inference.warm_up(rows, WARMUP_BATCH_SIZES)
+    readiness["warmup_seconds"] = time.perf_counter() - start
+    logger.info(f"Model warm-up done in {readiness['warmup_seconds']:.2f}s; "
+                f"batch latency: {', '.join(f'{n}: {t * 1e3:.1f} ms' for n, t in timings.items())}")
+    
+    # Throwaway predictor: the live stream history is untouched
+    canary = StatefulPredictor()
+    for row in rows:
+        canary_input = canary.features(row)
+    return canary_input, predict_features(canary_input)
+
+def run_canary(canary_input, expected: float) -> float:
+    """One known prediction; raises if the model output changed. Returns latency (s)."""
+    start = time.perf_counter()
+    rul = predict_features(canary_input)
+    latency = time.perf_counter() - start
+    if not isfinite(rul) or abs(rul - expected) > 1e-3 * max(1.0, abs(expected)):
+        raise RuntimeError(f"Canary prediction {rul} != expected {expected}")
+    return latency
+
+async def readiness_loop():
+    """Warm up once, then run the canary periodically and cache the result"""
+    await wait_for_runtime()
+    while not readiness["warmed_up"]:
+        try:
+            canary_input, expected = await asyncio.to_thread(warm_up_model)
+            readiness["warmed_up"] = True
+        except Exception as e:
+            readiness["error"] = f"warm-up failed: {e}"
+            logger.error(f"Model warm-up failed: {e}")
+            await asyncio.sleep(CANARY_INTERVAL_SECONDS)
+    
+    while True:
+        try:
+            latency = await asyncio.to_thread(run_canary, canary_input, expected)
+            readiness.update(
+                canary_ok=True,
+                canary_checked_at=time.monotonic(),
+                canary_latency_ms=latency * 1e3,
+                error=None
+            )
+        except Exception as e:
+            if readiness["canary_ok"]:
+                logger.error(f"Canary prediction failed: {e}")
+            readiness.update(canary_ok=False, error=f"canary failed: {e}")
+        await asyncio.sleep(CANARY_INTERVAL_SECONDS)
+
+def is_ready() -> bool:
+    checked_at = readiness["canary_checked_at"]
+    return (
+        readiness["warmed_up"] and readiness["canary_ok"] and checked_at is not None
+        and time.monotonic() - checked_at < CANARY_MAX_AGE_SECONDS
+    )
+
+Gauge("aegisflow_ready", "1 when warmed up and the last canary prediction succeeded").set_function(
+    lambda: 1 if is_ready() else 0
+)
+Gauge("aegisflow_canary_latency_seconds", "Latency of the last successful canary prediction").set_function(
+    lambda: (readiness["canary_latency_ms"] or 0.0) / 1e3
+)
+
+@app.get("/livez", tags=["Monitoring"])
+async def liveness():
+    """Liveness probe: the process is up and the event loop is serving requests."""
+    return Response(b'{"status":"alive"}', media_type="application/json")
+
+@app.get("/readyz", tags=["Monitoring"])
+async def readiness_probe():
+    """
+    Readiness probe: 200 once the model is warmed up and the periodic canary
+    prediction succeeds, 503 otherwise. Reads cached state only.
+    """
+    if is_ready():
+        return Response(b'{"status":"ready"}', media_type="application/json")
+    checked_at = readiness["canary_checked_at"]
+    return FastJSONResponse({
+        "status": "not_ready",
+        "warmed_up": readiness["warmed_up"],
+        "canary_ok": readiness["canary_ok"],
+        "canary_age_seconds": time.monotonic() - checked_at if checked_at is not None else None,
+        "error": readiness["error"]
+    }, status_code=503)
+
 @app.get("/health", tags=["Monitoring"])
 async def health_check():
     """
     Health check endpoint for load balancers and monitoring systems.
-    Returns 200 if system is healthy.
+    Returns 200 if system is healthy, or "starting" while the model and
+    simulator are still loading (requests that need them wait for it).
     """
     try:
+        loading = runtime_loading is not None and not runtime_loaded()
+        
         # Check if model is loaded
-        from ai_engine.inference import model
-        model_status = "healthy" if model is not None else "error"
+        model_status = "loading" if loading else "healthy" if inference.model is not None else "error"
         
         # Check if simulator is loaded
-        sim_status = "healthy" if sim.full_df is not None and len(sim.full_df) > 0 else "error"
+        sim_status = "loading" if loading else "healthy" if sim is not None and len(sim.full_df) > 0 else "error"
         
         # Calculate uptime
-        uptime = datetime.now(timezone.utc) - system_health["start_time"]
+        uptime = datetime.now(timezone.utc) - START_TIME
         
+        if loading:
+            overall = "starting"
+        else:
+            overall = "healthy" if model_status == "healthy" and sim_status == "healthy" else "degraded"
         health_status = {
-            "status": "healthy" if model_status == "healthy" and sim_status == "healthy" else "degraded",
+            "status": overall,
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "uptime_seconds": uptime.total_seconds(),
             "components": {
@@ -310,14 +751,14 @@ async def health_check():
                 "database": "not_configured"  # Add when DB is integrated
             },
             "metrics": {
-                "total_requests": system_health["total_requests"],
-                "total_predictions": system_health["total_predictions"],
-                "total_alerts": system_health["total_alerts"],
-                "active_websocket_connections": system_health["active_connections"]
+                "total_requests": server_state.get("total_requests"),
+                "total_predictions": server_state.get("total_predictions"),
+                "total_alerts": server_state.get("total_alerts"),
+                "active_websocket_connections": server_state.get("active_connections")
             }
         }
         
-        if health_status["status"] == "healthy":
+        if health_status["status"] != "degraded":
             return health_status
         else:
             raise HTTPException(status_code=503, detail=health_status)
@@ -326,25 +767,28 @@ async def health_check():
         logger.error(f"Health check failed: {str(e)}")
         raise HTTPException(status_code=503, detail={"status": "unhealthy", "error": str(e)})
 
-@app.get("/health/detailed", tags=["Monitoring"])
+@app.get("/health/detailed", tags=["Monitoring"], dependencies=[Depends(wait_for_runtime)])
 async def detailed_health_check(current_user: User = Depends(get_current_active_user)):
     """
     Detailed health check with authentication required.
     Provides deep system diagnostics.
     """
-    from ai_engine.inference import model, predictor
+    model, predictor = inference.model, inference.predictor
     
     return {
         "status": "healthy",
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "system": {
-            "uptime_seconds": (datetime.now(timezone.utc) - system_health["start_time"]).total_seconds(),
+            "uptime_seconds": (datetime.now(timezone.utc) - START_TIME).total_seconds(),
             "python_version": sys.version,
-            "platform": sys.platform
+            "platform": sys.platform,
+            "worker_pid": os.getpid(),
+            "state_backend": STATE_BACKEND
         },
         "model": {
             "loaded": model is not None,
             "type": "XGBoost",
+            "streaming_model": inference.STREAM_MODEL_PATH if inference.stream_model is not model else None,
             "predictor_history_size": len(predictor.history) if predictor else 0
         },
         "simulator": {
@@ -352,16 +796,17 @@ async def detailed_health_check(current_user: User = Depends(get_current_active_
             "current_cycle": sim.current_idx,
             "total_cycles": len(sim.unit_data)
         },
-        "metrics": system_health,
+        "metrics": {"start_time": START_TIME, **server_state.snapshot()},
         "alerts": {
-            "total": len(alert_history),
+            "total": alert_store.total,
             "recent": [
                 {
+                    "id": seq,
                     "timestamp": a.timestamp.isoformat(),
                     "type": a.alert_type,
                     "engine": a.engine_id,
                     "rul": a.rul
-                } for a in alert_history[-5:]  # Last 5 alerts
+                } for seq, a in alert_store.recent(5)  # Last 5 alerts
             ]
         }
     }
@@ -369,18 +814,48 @@ async def detailed_health_check(current_user: User = Depends(get_current_active_
 @app.get("/metrics", tags=["Monitoring"])
 async def get_metrics(current_user: User = Depends(get_current_active_user)):
     """
-    Prometheus-compatible metrics endpoint.
+    Prometheus metrics endpoint (text exposition format).
+    """
+    return Response(REGISTRY.expose(), media_type=CONTENT_TYPE)
+
+@app.post("/admin/profile", tags=["Monitoring"])
+async def run_profiler(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(PROFILE_INTERVAL_MS, ge=1, le=1000),
+    current_user: User = Depends(require_admin)
+):
     """
-    uptime = (datetime.now(timezone.utc) - system_health["start_time"]).total_seconds()
+    Sample every thread's stack for `seconds` and return collapsed stacks
+    (flamegraph.pl / speedscope input). Admin only; one profile at a time.
+    """
+    logger.info(f"User {current_user.username} started a {seconds}s profile")
+    try:
+        collapsed, samples = await asyncio.to_thread(profiler.run, seconds, interval_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
     
-    return {
-        "aegisflow_uptime_seconds": uptime,
-        "aegisflow_total_requests": system_health["total_requests"],
-        "aegisflow_total_predictions": system_health["total_predictions"],
-        "aegisflow_total_alerts": system_health["total_alerts"],
-        "aegisflow_active_websocket_connections": system_health["active_connections"],
-        "aegisflow_alert_history_size": len(alert_history)
-    }
+    return Response(
+        collapsed,
+        media_type="text/plain",
+        headers={
+            "Content-Disposition": 'attachment; filename="aegisflow.folded"',
+            "X-Profile-Samples": str(samples)
+        }
+    )
+
+@app.post("/admin/tracing", tags=["Monitoring"])
+def set_tracing(enabled: bool, current_user: User = Depends(require_admin)):
+    """Turn per-request stage tracing on or off (admin only)"""
+    tracer.enabled = enabled
+    if enabled:
+        tracer.clear()
+    logger.info(f"User {current_user.username} {'enabled' if enabled else 'disabled'} tracing")
+    return {"status": "ok", "tracing": enabled}
+
+@app.get("/admin/traces", tags=["Monitoring"], response_class=FastJSONResponse)
+def get_traces(limit: int = Query(50, ge=1, le=TRACE_BUFFER_SIZE), current_user: User = Depends(require_admin)):
+    """Most recent traces with per-stage spans, newest first (admin only)"""
+    return FastJSONResponse({"tracing": tracer.enabled, "traces": tracer.recent(limit)})
 
 # ============================================================================
 # AUTHENTICATION ENDPOINTS
@@ -395,6 +870,7 @@ async def login(login_req: LoginRequest):
     - Username: admin, Password: admin123
     - Username: engineer, Password: engineer123
     """
+    sync_user(login_req.username)
     user_dict = USERS_DB.get(login_req.username)
     
     if not user_dict or not verify_password(login_req.password, user_dict["hashed_password"]):
@@ -423,34 +899,85 @@ async def get_current_user_info(current_user: User = Depends(get_current_active_
     """Get current authenticated user information"""
     return current_user
 
+@app.post("/admin/users/{username}/deactivate", tags=["Authentication"])
+def deactivate_user(username: str, current_user: User = Depends(require_admin)):
+    """Deactivate a user; their existing tokens stop working immediately (admin only)"""
+    if username not in USERS_DB:
+        raise HTTPException(status_code=404, detail="User not found")
+    set_user_active(username, False)
+    logger.info(f"User {current_user.username} deactivated {username}")
+    return {"status": "ok", "username": username, "active": False}
+
+@app.post("/admin/users/{username}/activate", tags=["Authentication"])
+def activate_user(username: str, current_user: User = Depends(require_admin)):
+    """Re-activate a user (admin only)"""
+    if username not in USERS_DB:
+        raise HTTPException(status_code=404, detail="User not found")
+    set_user_active(username, True)
+    logger.info(f"User {current_user.username} activated {username}")
+    return {"status": "ok", "username": username, "active": True}
+
 # ============================================================================
 # MAIN APPLICATION
 # ============================================================================
 
-sim = EngineSimulator()
-
-SENSOR_THRESHOLDS = {
-    'LPC_Outlet_Temp': 643.67,
-    'HPC_Outlet_Temp': 1603.05,
-    'LPT_Outlet_Temp': 1427.59,
-    'HPC_Outlet_Pressure': 563.43,
-    'Combustion_Pressure': 48.11,
-    'Fuel_Flow_Ratio': 530.97,
-    'LPT_Coolant_Bleed': 23.66,
-    'Core_Speed': 9120.25,
-    'Fan_Speed': 2388.33,
-}
+sensor_rules = SensorRuleSet.load(SENSOR_RULES_PATH)
+
+# Online spike/drift detection for the live stream (per engine, per sensor)
+anomaly_detector = StreamingAnomalyDetector(SENSOR_ORDER)
+
+# Every prediction with its sensor readings, for /engines/{id}/history
+# (None when disabled; opened by the lifespan)
+timeseries = None
+
+def open_storage():
+    """
+    Open the SQLite-backed stores in the working directory: alerts,
+    prediction history, with shared state the counters and user status,
+    and with shared rate limits the token buckets. Called by the lifespan,
+    so importing this module creates no files.
+    """
+    global alert_store, timeseries, server_state, user_status
+    alert_store = build_alert_store()
+    timeseries = TimeSeriesStore(
+        TIMESERIES_DB,
+        SENSOR_ORDER,
+        batch_size=TIMESERIES_BATCH_SIZE,
+        flush_interval=TIMESERIES_FLUSH_SECONDS,
+        queue_size=TIMESERIES_QUEUE_SIZE
+    ) if TIMESERIES_DB else None
+    if STATE_BACKEND == "sqlite":
+        server_state = build_server_state(shared=True)
+        user_status = SharedUserStatus(STATE_DB, server_state.deployment)
+    if RATE_LIMIT_BACKEND == "sqlite":
+        rate_limiter.store = build_rate_limit_store(shared=True)
+
+def close_storage():
+    # Persist the in-memory alert window to the spill tier
+    alert_store.close()
+    if timeseries is not None:
+        timeseries.close()
+    server_state.close()
+    if user_status is not None:
+        user_status.close()
+
+# Rolling feature and anomaly state of engines reporting through /predict/batch
+fleet_features = FleetStreamingFeatures(len(SENSOR_ORDER))
+fleet_anomaly_detector = StreamingAnomalyDetector(SENSOR_ORDER)
+
+# Latest RUL/status of every engine from all prediction paths, for /fleet/summary
+fleet_view = FleetView()
 
 class EngineConfig(BaseModel):
     unit_id: int
 
-@app.post("/set_engine", tags=["Engine Control"])
+@app.post("/set_engine", tags=["Engine Control"], dependencies=[Depends(wait_for_runtime)])
 def set_engine_config(
     config: EngineConfig,
     current_user: User = Depends(check_rate_limit)
 ):
     """Switch to a different engine unit (authenticated)"""
-    system_health["total_requests"] += 1
+    server_state.incr("total_requests")
     logger.info(f"User {current_user.username} switching to Engine {config.unit_id}")
     
     sim.set_engine(config.unit_id)
@@ -460,68 +987,25 @@ def set_engine_config(
         "user": current_user.username
     }
 
-def validate_sensor_data(features: dict) -> dict:
-    """Validate sensor data and detect anomalies"""
-    anomalies = []
-    out_of_range = []
-    
-    valid_ranges = {
-        'LPC_Outlet_Temp': (535, 646),
-        'HPC_Outlet_Temp': (1240, 1620),
-        'LPT_Outlet_Temp': (1020, 1445),
-        'HPC_Outlet_Pressure': (135, 575),
-        'Fan_Speed': (1910, 2390),
-        'Core_Speed': (7980, 9250),
-        'Combustion_Pressure': (36, 49),
-        'Fuel_Flow_Ratio': (128, 540),
-        'Corrected_Fan_Speed': (2025, 2395),
-        'Corrected_Core_Speed': (7840, 8300),
-        'Bypass_Ratio': (8.1, 11.1),
-        'Bleed_Enthalpy': (300, 405),
-        'HPT_Coolant_Bleed': (10, 40),
-        'LPT_Coolant_Bleed': (6, 24)
-    }
-    
-    for sensor, value in features.items():
-        if sensor in valid_ranges:
-            min_val, max_val = valid_ranges[sensor]
-            if value < min_val or value > max_val:
-                out_of_range.append({
-                    'sensor': sensor,
-                    'value': value,
-                    'expected_range': f'{min_val}-{max_val}'
-                })
+@app.post("/admin/sensor_rules/reload", tags=["Engine Control"])
+def reload_sensor_rules(current_user: User = Depends(require_admin)):
+    """Reload sensor valid ranges and critical thresholds from the rules file (admin only)"""
+    global sensor_rules
+    try:
+        new_rules = SensorRuleSet.load(SENSOR_RULES_PATH)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Sensor rules reload failed: {e}")
+        raise HTTPException(status_code=400, detail=f"Invalid sensor rules file: {e}")
     
+    sensor_rules = new_rules
+    logger.info(f"User {current_user.username} reloaded sensor rules from {SENSOR_RULES_PATH}")
     return {
-        'valid': len(out_of_range) == 0,
-        'out_of_range': out_of_range,
-        'anomalies': anomalies
+        "status": "ok",
+        "sensors": len(sensor_rules.sensors),
+        "critical_thresholds": len(sensor_rules.critical_reasons)
     }
 
-def identify_critical_sensors(features: dict) -> list:
-    """Identify critical sensors using data-driven thresholds"""
-    critical_sensors = []
-    
-    if features.get('LPC_Outlet_Temp', 0) > SENSOR_THRESHOLDS['LPC_Outlet_Temp']:
-        critical_sensors.append('High LPC Temperature')
-    if features.get('HPC_Outlet_Temp', 0) > SENSOR_THRESHOLDS['HPC_Outlet_Temp']:
-        critical_sensors.append('High HPC Temperature')
-    if features.get('LPT_Outlet_Temp', 0) > SENSOR_THRESHOLDS['LPT_Outlet_Temp']:
-        critical_sensors.append('High LPT Temperature')
-    if features.get('HPC_Outlet_Pressure', 0) > SENSOR_THRESHOLDS['HPC_Outlet_Pressure']:
-        critical_sensors.append('High HPC Pressure')
-    if features.get('Combustion_Pressure', 0) > SENSOR_THRESHOLDS['Combustion_Pressure']:
-        critical_sensors.append('High Combustion Pressure')
-    if features.get('Fuel_Flow_Ratio', 0) > SENSOR_THRESHOLDS['Fuel_Flow_Ratio']:
-        critical_sensors.append('High Fuel Flow Parameter')
-    if features.get('LPT_Coolant_Bleed', 0) > SENSOR_THRESHOLDS['LPT_Coolant_Bleed']:
-        critical_sensors.append('High Vibration')
-    if features.get('Core_Speed', 0) > SENSOR_THRESHOLDS['Core_Speed']:
-        critical_sensors.append('High Core Speed')
-    
-    return critical_sensors
-
-@app.post("/upload_test", tags=["Batch Analysis"])
+@app.post("/upload_test", tags=["Batch Analysis"], response_class=FastJSONResponse, dependencies=[Depends(wait_for_runtime)])
 async def analyze_upload(
     file: UploadFile = File(...),
     current_user: User = Depends(check_rate_limit)
@@ -530,181 +1014,525 @@ async def analyze_upload(
     Batch RUL analysis for multiple engines (authenticated).
     Upload NASA C-MAPSS test data for comprehensive analysis.
     """
-    system_health["total_requests"] += 1
+    server_state.incr("total_requests")
     logger.info(f"User {current_user.username} uploading test file: {file.filename}")
     
-    contents = await file.read()
+    import pandas as pd
     
-    try:
-        index_names = ['unit_nr', 'time_cycles']
-        setting_names = ['setting_1', 'setting_2', 'setting_3']
-        sensor_names = ['s_{}'.format(i) for i in range(1, 22)]
-        col_names = index_names + setting_names + sensor_names
-        
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')), sep=r'\s+', header=None, names=col_names)
-        
-        sensor_map = {
-            's_2': 'LPC_Outlet_Temp',
-            's_3': 'HPC_Outlet_Temp',
-            's_4': 'LPT_Outlet_Temp',
-            's_7': 'HPC_Outlet_Pressure',
-            's_8': 'Fan_Speed',
-            's_9': 'Core_Speed',
-            's_11': 'Combustion_Pressure',
-            's_12': 'Fuel_Flow_Ratio',
-            's_13': 'Corrected_Fan_Speed',
-            's_14': 'Corrected_Core_Speed',
-            's_15': 'Bypass_Ratio',
-            's_17': 'Bleed_Enthalpy',
-            's_20': 'HPT_Coolant_Bleed',
-            's_21': 'LPT_Coolant_Bleed'
-        }
-        df = df.rename(columns=sensor_map)
-        
-        report = []
-        grouped = df.groupby('unit_nr')
+    with tracer.trace("upload_test", filename=file.filename):
+        contents = await file.read()
         
-        for engine_id, group in grouped:
-            last_row = group.iloc[-1].to_dict()
-            max_cycle = int(last_row['time_cycles'])
+        try:
+            index_names = ['unit_nr', 'time_cycles']
+            setting_names = ['setting_1', 'setting_2', 'setting_3']
+            sensor_names = ['s_{}'.format(i) for i in range(1, 22)]
+            col_names = index_names + setting_names + sensor_names
             
-            features = {k: v for k, v in last_row.items() 
-                       if k not in ['unit_nr', 'time_cycles', 'setting_1', 'setting_2', 'setting_3']}
+            start = time.perf_counter()
+            df = pd.read_csv(io.StringIO(contents.decode('utf-8')), sep=r'\s+', header=None, names=col_names)
             
-            validation = validate_sensor_data(features)
-            rul = predict_rul(features)
-            system_health["total_predictions"] += 1
+            sensor_map = {
+                's_2': 'LPC_Outlet_Temp',
+                's_3': 'HPC_Outlet_Temp',
+                's_4': 'LPT_Outlet_Temp',
+                's_7': 'HPC_Outlet_Pressure',
+                's_8': 'Fan_Speed',
+                's_9': 'Core_Speed',
+                's_11': 'Combustion_Pressure',
+                's_12': 'Fuel_Flow_Ratio',
+                's_13': 'Corrected_Fan_Speed',
+                's_14': 'Corrected_Core_Speed',
+                's_15': 'Bypass_Ratio',
+                's_17': 'Bleed_Enthalpy',
+                's_20': 'HPT_Coolant_Bleed',
+                's_21': 'LPT_Coolant_Bleed'
+            }
+            df = df.rename(columns=sensor_map)
+            stage_done(STAGE_PARSE, "parse", start)
             
-            rul = min(rul, 125)
-            rul = max(rul, 0)
+            report = []
+            last_rows = df.drop_duplicates('unit_nr', keep='last').sort_values('unit_nr')
             
-            status = "Healthy"
-            if rul < 50: status = "Warning"
-            if rul < 20: status = "Critical"
+            # Range and threshold checks for every engine in one vectorized pass
+            start = time.perf_counter()
+            checks = sensor_rules.evaluate(sensor_rules.frame_matrix(last_rows))
+            stage_done(STAGE_RULES, "rules", start)
+            # Spike/drift detection over each engine's full history in the file
+            start = time.perf_counter()
+            anomaly_flags = detect_in_frame(df, SENSOR_ORDER)
+            stage_done(STAGE_ANOMALY, "anomaly", start)
             
-            estimated_failure_cycle = max_cycle + int(rul)
-            critical_sensors = identify_critical_sensors(features)
-            failure_reason = ", ".join(critical_sensors) if critical_sensors else "Normal wear and tear"
+            for i, last_row in enumerate(last_rows.to_dict('records')):
+                engine_id = last_row['unit_nr']
+                max_cycle = int(last_row['time_cycles'])
+                
+                features = {k: v for k, v in last_row.items() 
+                           if k not in ['unit_nr', 'time_cycles', 'setting_1', 'setting_2', 'setting_3']}
+                
+                start = time.perf_counter()
+                model_input = build_features(features)
+                stage_done(STAGE_FEATURES, "features", start)
+                start = time.perf_counter()
+                rul = predict_features(model_input)
+                stage_done(STAGE_PREDICT, "predict", start)
+                server_state.incr("total_predictions")
+                
+                rul = min(rul, 125)
+                rul = max(rul, 0)
+                
+                status = "Healthy"
+                if rul < 50: status = "Warning"
+                if rul < 20: status = "Critical"
+                
+                if timeseries is not None:
+                    timeseries.append(int(engine_id), max_cycle, rul, status, [features.get(s, nan) for s in SENSOR_ORDER])
+                fleet_view.update(int(engine_id), max_cycle, rul, status, [item['sensor'] for item in checks.out_of_range(i)])
+                
+                estimated_failure_cycle = max_cycle + int(rul)
+                critical_sensors = checks.reasons(i)
+                failure_reason = ", ".join(critical_sensors) if critical_sensors else "Normal wear and tear"
+                
+                # Check for alerts
+                start = time.perf_counter()
+                for alert in check_alert_conditions(int(engine_id), max_cycle, rul, features):
+                    await send_alert(alert)
+                    server_state.incr("total_alerts")
+                stage_done(STAGE_ALERTS, "alerts", start)
+                
+                report_entry = {
+                    "engine_id": int(engine_id),
+                    "current_cycle": max_cycle,
+                    "predicted_RUL": round(rul, 1),
+                    "estimated_failure_cycle": estimated_failure_cycle,
+                    "status": status,
+                    "failure_reason": failure_reason,
+                    "confidence": 94.2,
+                    "data_quality": "valid" if checks.valid[i] else "anomaly_detected"
+                }
+                
+                if not checks.valid[i]:
+                    report_entry['warnings'] = checks.out_of_range(i)
+                
+                spike, drift = anomaly_flags[engine_id]
+                if spike.any() or drift.any():
+                    report_entry['anomalies'] = anomaly_detector.describe(spike, drift)
+                
+                report.append(report_entry)
             
-            # Check for alerts
-            alert = check_alert_conditions(int(engine_id), max_cycle, rul, features)
-            if alert:
-                await send_alert(alert)
-                system_health["total_alerts"] += 1
+            report = sorted(report, key=lambda x: x['predicted_RUL'])
             
-            report_entry = {
-                "engine_id": int(engine_id),
-                "current_cycle": max_cycle,
-                "predicted_RUL": round(rul, 1),
-                "estimated_failure_cycle": estimated_failure_cycle,
-                "status": status,
-                "failure_reason": failure_reason,
-                "confidence": 94.2,
-                "data_quality": "valid" if validation['valid'] else "anomaly_detected"
-            }
+            logger.info(f"Batch analysis complete: {len(report)} engines analyzed by {current_user.username}")
+            start = time.perf_counter()
+            response = FastJSONResponse(report)  # body is encoded here
+            stage_done(STAGE_SERIALIZE, "serialize", start)
+            return response
             
-            if not validation['valid']:
-                report_entry['warnings'] = validation['out_of_range']
-            
-            report.append(report_entry)
+        except Exception as e:
+            logger.error(f"Upload analysis error: {str(e)}")
+            return FastJSONResponse({"error": str(e)})
+
+# Binary readings: little-endian float64 rows of [engine_id, cycle, *SENSOR_ORDER]
+READING_COLUMNS = 2 + len(SENSOR_ORDER)
+BINARY_CONTENT_TYPE = "application/octet-stream"
+
+def parse_readings_json(body: bytes):
+    """
+    {"readings": [{"engine_id", "cycle", "sensors": {name: value}}, ...]}
+    -> (engine_ids, cycles, sensor matrix with NaN for missing, sensor dicts)
+    """
+    payload = loads(body)
+    readings = payload.get("readings") if isinstance(payload, dict) else None
+    if not isinstance(readings, list):
+        raise ValueError('Expected {"readings": [...]}')
+    if len(readings) > PREDICT_BATCH_MAX_READINGS:
+        raise OverflowError(f"At most {PREDICT_BATCH_MAX_READINGS} readings per request")
+    try:
+        engine_ids = np.array([r["engine_id"] for r in readings], dtype=np.int64)
+        cycles = np.array([r["cycle"] for r in readings], dtype=np.int64)
+        sensors = [r["sensors"] for r in readings]
+        X = np.array([[s.get(name, nan) for name in SENSOR_ORDER] for s in sensors], dtype=np.float64)
+    except (KeyError, TypeError, AttributeError, ValueError) as e:
+        raise ValueError(f"Invalid reading ({type(e).__name__}: {e}); expected engine_id, cycle and a sensors object")
+    return engine_ids, cycles, X.reshape(len(readings), len(SENSOR_ORDER)), sensors
+
+def parse_readings_binary(body: bytes):
+    """Raw float64 rows (see READING_COLUMNS) -> (engine_ids, cycles, sensor matrix, None)"""
+    row_bytes = 8 * READING_COLUMNS
+    if len(body) % row_bytes:
+        raise ValueError(f"Body length {len(body)} is not a multiple of {row_bytes} bytes "
+                         f"({READING_COLUMNS} float64 values per reading)")
+    if len(body) // row_bytes > PREDICT_BATCH_MAX_READINGS:
+        raise OverflowError(f"At most {PREDICT_BATCH_MAX_READINGS} readings per request")
+    data = np.frombuffer(body, dtype="<f8").reshape(-1, READING_COLUMNS)
+    if not np.isfinite(data[:, :2]).all():
+        raise ValueError("engine_id and cycle must be finite")
+    return data[:, 0].astype(np.int64), data[:, 1].astype(np.int64), data[:, 2:].astype(np.float64), None
+
+@app.post("/predict/batch", tags=["Batch Analysis"], response_class=FastJSONResponse, dependencies=[Depends(wait_for_runtime)])
+async def predict_batch(request: Request, current_user: User = Depends(check_rate_limit)):
+    """
+    Bulk RUL prediction for live engine telemetry (authenticated).
+    
+    Body: JSON {"readings": [{"engine_id", "cycle", "sensors": {...}}]} or,
+    with Content-Type application/octet-stream, little-endian float64 rows
+    of engine_id, cycle and the sensors in SENSOR_ORDER (NaN = missing).
+    
+    Each engine's rolling window is kept between requests; readings of one
+    engine are applied in the order received. All readings are scored in
+    one model call.
+    """
+    server_state.incr("total_requests")
+    if inference.model is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    
+    body = await request.body()
+    if len(body) > PREDICT_BATCH_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Request body larger than {PREDICT_BATCH_MAX_BYTES} bytes")
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+    if content_type == BINARY_CONTENT_TYPE:
+        parse = parse_readings_binary
+    elif content_type == "application/json":
+        parse = parse_readings_json
+    else:
+        raise HTTPException(status_code=415, detail=f"Use application/json or {BINARY_CONTENT_TYPE}")
+    
+    with tracer.trace("predict_batch", user=current_user.username):
+        start = time.perf_counter()
+        try:
+            engine_ids, cycles, X, sensor_dicts = parse(body)
+        except OverflowError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        stage_done(STAGE_PARSE, "parse", start)
+        n = len(engine_ids)
         
-        report = sorted(report, key=lambda x: x['predicted_RUL'])
+        start = time.perf_counter()
+        import pandas as pd
+        checks = sensor_rules.evaluate(sensor_rules.frame_matrix(pd.DataFrame(X, columns=SENSOR_ORDER)))
+        stage_done(STAGE_RULES, "rules", start)
         
-        logger.info(f"Batch analysis complete: {len(report)} engines analyzed by {current_user.username}")
-        return report
+        # Per-engine state advances one reading per engine per round
+        rounds = lockstep_rounds(engine_ids)
+        start = time.perf_counter()
+        spike = np.zeros(X.shape, dtype=bool)
+        drift = np.zeros(X.shape, dtype=bool)
+        for idx in rounds:
+            spike[idx], drift[idx] = fleet_anomaly_detector.update_batch(engine_ids[idx].tolist(), X[idx])
+        stage_done(STAGE_ANOMALY, "anomaly", start)
+        start = time.perf_counter()
+        model_input = np.empty((n, 2 * len(SENSOR_ORDER)))
+        X_model = np.nan_to_num(X, nan=0.0)  # missing sensors read as 0, as in StatefulPredictor
+        for idx in rounds:
+            model_input[idx] = fleet_features.update_batch(engine_ids[idx].tolist(), X_model[idx])
+        stage_done(STAGE_FEATURES, "features", start)
         
-    except Exception as e:
-        logger.error(f"Upload analysis error: {str(e)}")
-        return {"error": str(e)}
+        start = time.perf_counter()
+        ruls = np.clip(predict_matrix(model_input), 0, 125) if n else np.zeros(0)
+        stage_done(STAGE_PREDICT, "predict", start)
+        server_state.incr("total_predictions", n)
+        statuses = np.where(ruls < 20, "Critical", np.where(ruls < 50, "Warning", "Healthy")).tolist()
+        
+        start = time.perf_counter()
+        alerts = []
+        engine_list, cycle_list, rul_list = engine_ids.tolist(), cycles.tolist(), ruls.tolist()
+        if timeseries is not None:
+            timeseries.append_many(engine_list, cycle_list, rul_list, statuses, X)
+        fleet_view.update_many(engine_list, cycle_list, rul_list, statuses, checks.out_of_range_mask, sensor_rules.sensors)
+        for i in range(n):
+            sensors = sensor_dicts[i] if sensor_dicts is not None else dict(zip(SENSOR_ORDER, X[i].tolist()))
+            for alert in check_alert_conditions(engine_list[i], cycle_list[i], rul_list[i], sensors):
+                await send_alert(alert)
+                server_state.incr("total_alerts")
+                alerts.append(alert)
+        stage_done(STAGE_ALERTS, "alerts", start)
+        
+        valid, critical = checks.valid.tolist(), checks.has_critical.tolist()
+        flagged = (spike.any(axis=1) | drift.any(axis=1)).tolist()
+        results = []
+        for i, (engine_id, cycle, rul, status) in enumerate(zip(engine_list, cycle_list, rul_list, statuses)):
+            entry = {
+                "engine_id": engine_id,
+                "cycle": cycle,
+                "RUL": round(rul, 2),
+                "status": status,
+                "data_quality": "valid" if valid[i] else "anomaly"
+            }
+            if critical[i]:
+                entry["failure_reasons"] = checks.reasons(i)
+            if flagged[i]:
+                entry["anomalies"] = fleet_anomaly_detector.describe(spike[i], drift[i])
+            results.append(entry)
+        
+        start = time.perf_counter()
+        response = FastJSONResponse({
+            "readings": n,
+            "engines": len(np.unique(engine_ids)),
+            "results": results,
+            "alerts": alerts
+        })
+        stage_done(STAGE_SERIALIZE, "serialize", start)
+        return response
 
-@app.websocket("/ws")
+@app.websocket("/ws", dependencies=[Depends(wait_for_runtime)])
 async def websocket_endpoint(websocket: WebSocket):
     """
     Real-time engine monitoring WebSocket.
     Note: WebSocket authentication should be implemented via query params or initial message.
     """
     await websocket.accept()
-    system_health["active_connections"] += 1
+    server_state.incr("active_connections")
     
-    logger.info(f"WebSocket client connected. Active connections: {system_health['active_connections']}")
+    logger.info(f"WebSocket client connected. Active connections: {server_state.get('active_connections')}")
     
     sim.reset()
     reset_predictor()
+    anomaly_detector.reset_engine(sim.current_unit)
+    alert_engine.reset_engine(sim.current_unit)
     
     try:
         while True:
-            raw_data = sim.get_next_cycle()
-            
-            if raw_data is None:
-                await websocket.send_text(json.dumps({"finished": True}))
-                await asyncio.sleep(2)
-                continue
-            
-            features = {k: v for k, v in raw_data.items() 
-                       if k not in ['unit_nr', 'time_cycles', 'setting_1', 'setting_2', 'setting_3']}
-            
-            validation = validate_sensor_data(features)
-            rul = predict_rul(features)
-            system_health["total_predictions"] += 1
-            
-            rul = min(rul, 125)
-            rul = max(rul, 0)
-            
-            status = "Healthy"
-            if rul < 50: status = "Warning"
-            if rul < 20: status = "Critical"
-            
-            failure_reasons = identify_critical_sensors(features)
-            
-            # Check for alerts
-            alert = check_alert_conditions(sim.current_unit, int(raw_data['time_cycles']), rul, features)
-            if alert:
-                await send_alert(alert)
-                system_health["total_alerts"] += 1
-            
-            payload = {
-                "finished": False,
-                "cycle": int(raw_data['time_cycles']),
-                "RUL": round(rul, 2),
-                "status": status,
-                "sensors": features,
-                "failure_reasons": failure_reasons if failure_reasons else ["Normal operation"],
-                "data_quality": "valid" if validation['valid'] else "anomaly",
-                "alert": alert.dict() if alert else None
-            }
-            
-            if not validation['valid']:
-                payload['warnings'] = [f"{item['sensor']}: {item['value']:.2f} (expected {item['expected_range']})" 
-                                      for item in validation['out_of_range'][:3]]
-            
-            await websocket.send_text(json.dumps(payload, default=str))
+            with tracer.trace("ws_cycle", engine_id=sim.current_unit):
+                raw_data = sim.get_next_cycle()
+                
+                if raw_data is None:
+                    await websocket.send_text(dumps_str({"finished": True}))
+                    await asyncio.sleep(2)
+                    continue
+                
+                features = {k: v for k, v in raw_data.items() 
+                           if k not in ['unit_nr', 'time_cycles', 'setting_1', 'setting_2', 'setting_3']}
+                
+                start = time.perf_counter()
+                checks = sensor_rules.evaluate_one(features)
+                stage_done(STAGE_RULES, "rules", start)
+                values = [features.get(s, nan) for s in SENSOR_ORDER]
+                start = time.perf_counter()
+                if anomaly_detector.update(sim.current_unit, values):
+                    anomalies = anomaly_detector.describe(anomaly_detector.spike, anomaly_detector.drift)
+                else:
+                    anomalies = []
+                stage_done(STAGE_ANOMALY, "anomaly", start)
+                start = time.perf_counter()
+                model_input = build_features(features)
+                stage_done(STAGE_FEATURES, "features", start)
+                start = time.perf_counter()
+                rul = predict_stream_features(model_input)
+                stage_done(STAGE_PREDICT, "predict", start)
+                server_state.incr("total_predictions")
+                
+                rul = min(rul, 125)
+                rul = max(rul, 0)
+                
+                status = "Healthy"
+                if rul < 50: status = "Warning"
+                if rul < 20: status = "Critical"
+                
+                failure_reasons = checks.reasons(0)
+                
+                if timeseries is not None:
+                    timeseries.append(sim.current_unit, int(raw_data['time_cycles']), rul, status, values)
+                fleet_view.update(sim.current_unit, int(raw_data['time_cycles']), rul, status,
+                                  [item['sensor'] for item in checks.out_of_range(0)])
+                
+                # Check for alerts
+                start = time.perf_counter()
+                alerts = check_alert_conditions(sim.current_unit, int(raw_data['time_cycles']), rul, features)
+                for alert in alerts:
+                    await send_alert(alert)
+                    server_state.incr("total_alerts")
+                stage_done(STAGE_ALERTS, "alerts", start)
+                
+                payload = {
+                    "finished": False,
+                    "cycle": int(raw_data['time_cycles']),
+                    "RUL": round(rul, 2),
+                    "status": status,
+                    "sensors": features,
+                    "failure_reasons": failure_reasons if failure_reasons else ["Normal operation"],
+                    "data_quality": "valid" if checks.valid[0] else "anomaly",
+                    "anomalies": anomalies,
+                    "alert": alerts[0] if alerts else None
+                }
+                
+                if not checks.valid[0]:
+                    payload['warnings'] = [f"{item['sensor']}: {item['value']:.2f} (expected {item['expected_range']})" 
+                                          for item in checks.out_of_range(0)[:3]]
+                
+                start = time.perf_counter()
+                message = dumps_str(payload)
+                stage_done(STAGE_SERIALIZE, "serialize", start)
+                start = time.perf_counter()
+                await websocket.send_text(message)
+                stage_done(STAGE_WS_SEND, "ws_send", start)
             await asyncio.sleep(0.3)
             
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
-        system_health["active_connections"] -= 1
-        logger.info(f"WebSocket client disconnected. Active connections: {system_health['active_connections']}")
+        server_state.incr("active_connections", -1)
+        logger.info(f"WebSocket client disconnected. Active connections: {server_state.get('active_connections')}")
+
+def alert_to_dict(seq: int, a: Alert) -> dict:
+    """Public representation of a stored alert"""
+    return {
+        "id": seq,
+        "timestamp": a.timestamp,
+        "engine_id": a.engine_id,
+        "type": a.alert_type,
+        "rul": a.rul,
+        "cycle": a.cycle,
+        "message": a.message
+    }
+
+def sse_event(seq: int, a: Alert) -> str:
+    return f"id: {seq}\nevent: alert\ndata: {dumps_str(alert_to_dict(seq, a))}\n\n"
 
-@app.get("/alerts", tags=["Alerts"])
+@app.get("/alerts", tags=["Alerts"], response_class=FastJSONResponse)
 async def get_alerts(
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=500),
+    engine_id: Optional[int] = None,
+    alert_type: Optional[str] = Query(None, alias="type"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[int] = None,
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get recent alert history"""
-    return {
-        "total": len(alert_history),
-        "alerts": [
-            {
-                "timestamp": a.timestamp.isoformat(),
-                "engine_id": a.engine_id,
-                "type": a.alert_type,
-                "rul": a.rul,
-                "cycle": a.cycle,
-                "message": a.message
-            } for a in alert_history[-limit:]
-        ]
-    }
+    """
+    Get alert history, newest first.
+    
+    Filter by engine, type ("critical", "warning", "info") and time range.
+    Pass `next_cursor` from the response as `cursor` to fetch the next (older) page.
+    """
+    page, next_cursor = alert_store.query(
+        engine_id=engine_id,
+        alert_type=alert_type,
+        since=since,
+        until=until,
+        cursor=cursor,
+        limit=limit
+    )
+    return FastJSONResponse({
+        "total": alert_store.total,
+        "alerts": [alert_to_dict(seq, a) for seq, a in page],
+        "next_cursor": next_cursor
+    })
+
+@app.get("/alerts/stream", tags=["Alerts"])
+async def stream_alerts(
+    engine_id: Optional[int] = None,
+    alert_type: Optional[str] = Query(None, alias="type"),
+    last_event_id: Optional[int] = Header(None),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Server-sent events stream of new alerts.
+    
+    Each event has `id` = alert ID and JSON `data` shaped like the /alerts items.
+    Reconnect with the `Last-Event-ID` header to receive everything missed since that ID.
+    """
+    logger.info(f"User {current_user.username} subscribed to alert stream")
+    
+    def replay(after_seq):
+        """Every stored match after `after_seq`, read a page at a time"""
+        while True:
+            page = alert_store.since_seq(after_seq, engine_id, alert_type, limit=SSE_REPLAY_PAGE)
+            yield from page
+            if len(page) < SSE_REPLAY_PAGE:
+                return
+            after_seq = page[-1][0]
+    
+    async def events():
+        # Subscribe only once the body is iterated (a response that is never
+        # sent never unsubscribes). Subscribe before replaying so nothing added
+        # in between is lost, and take the live starting point at the same time
+        sub = alert_store.subscribe(engine_id, alert_type, queue_size=SSE_QUEUE_SIZE)
+        last_sent = last_event_id if last_event_id is not None else alert_store.last_seq
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            if last_event_id is not None:
+                for seq, alert in replay(last_event_id):
+                    yield sse_event(seq, alert)
+                    last_sent = seq
+            
+            while True:
+                if sub.overflowed:
+                    # Consumer fell behind: drop the queue and resync from the store
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    sub.overflowed = False
+                    for seq, alert in replay(last_sent):
+                        yield sse_event(seq, alert)
+                        last_sent = seq
+                try:
+                    seq, alert = await asyncio.wait_for(sub.queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if seq <= last_sent:
+                    continue  # already sent during replay
+                yield sse_event(seq, alert)
+                last_sent = seq
+        finally:
+            alert_store.unsubscribe(sub)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ============================================================================
+# PREDICTION HISTORY
+# ============================================================================
+
+@app.get("/engines/{engine_id}/history", tags=["History"], response_class=FastJSONResponse)
+async def get_engine_history(
+    engine_id: int,
+    field: str = "rul",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    max_points: int = Query(HISTORY_DEFAULT_POINTS, ge=10, le=HISTORY_MAX_POINTS),
+    method: str = Query("lttb", description=f"Downsampling: {', '.join(DOWNSAMPLE_METHODS)}"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    One engine's prediction history in time order (authenticated).
+    
+    `field` is "rul" or a sensor name. Series longer than `max_points` are
+    downsampled on the server: "lttb" keeps the line's shape, "minmax" keeps
+    each time bucket's extremes. Predictions become visible within
+    about a second (background batch writes).
+    """
+    if timeseries is None:
+        raise HTTPException(status_code=503, detail="Prediction history is disabled")
+    try:
+        history = await asyncio.to_thread(
+            timeseries.history, engine_id, field, since=since, until=until, max_points=max_points, method=method
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(history)
+
+# ============================================================================
+# FLEET SUMMARY
+# ============================================================================
+
+@app.get("/fleet/summary", tags=["Fleet"], response_class=FastJSONResponse)
+async def get_fleet_summary(
+    lowest: int = Query(FLEET_SUMMARY_DEFAULT_LOWEST, ge=1, le=FLEET_SUMMARY_MAX_LOWEST),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Current state of the fleet (authenticated): engines per status, the
+    `lowest` engines by latest predicted RUL, and sensors ranked by how many
+    readings fell outside their valid range (with how many engines are out
+    of range on each right now).
+    
+    Maintained incrementally as predictions arrive from the WebSocket,
+    /upload_test and /predict/batch, so polling it is cheap.
+    """
+    return FastJSONResponse(fleet_view.summary(lowest))
 
 @app.get("/", tags=["Info"])
 async def root():
@@ -720,5 +1548,6 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
+    start_logging()
     logger.info("Starting AegisFlow API Server...")
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
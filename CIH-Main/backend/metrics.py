@@ -0,0 +1,320 @@
+"""
+METRICS
+=======
+Minimal Prometheus instrumentation that is cheap enough to leave on.
+
+- Counter, Gauge and Histogram families with optional labels (counter
+  names carry their own `_total` suffix)
+- Histogram buckets are fixed at creation: an observation is one bisect
+  into the bucket bounds plus two additions, with no per-sample storage
+- Callback counters/gauges read their value (queue depth, connections...) only when
+  scraped, so instrumented code does not change
+- `Registry.expose()` renders the Prometheus text format (version 0.0.4)
+
+Resolve label children once and keep them (e.g. at module level), so hot
+paths skip the label lookup:
+
+    PREDICT = PIPELINE_SECONDS.labels("predict")
+    start = perf_counter(); ...; PREDICT.observe(perf_counter() - start)
+
+Updates are not locked. Threads that race on the same child may at worst
+lose an increment, which is acceptable for monitoring data.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+from math import inf
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans sub-millisecond stage timings up to slow uploads
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value) -> str:
+    if value == inf:
+        return "+Inf"
+    if value == -inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra="") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# ============================================================================
+# METRIC CHILDREN (one per label combination)
+# ============================================================================
+
+class _CounterChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def inc(self, amount=1.0):
+        self.value += amount
+
+    def set_function(self, function):
+        """Read the total from `function()` at scrape time (must never decrease)"""
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1.0):
+        self.value += amount
+
+    def dec(self, amount=1.0):
+        self.value -= amount
+
+    def set_function(self, function):
+        """Read the value from `function()` at scrape time instead"""
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # per bucket, last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+# ============================================================================
+# METRIC FAMILIES
+# ============================================================================
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Child for one label combination (created on first use)"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self):
+        """Yield (suffix, label_values, extra_label, value)"""
+        raise NotImplementedError
+
+    def expose(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, values, extra, value in self._samples():
+            labels = _label_text(self.labelnames, values, extra)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield "", values, "", child.get()
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default.set(value)
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount=1.0):
+        self._default.dec(amount)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield "", values, "", child.get()
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.bounds = tuple(sorted(float(b) for b in buckets if b != inf))
+        self._le = [_format_value(b) for b in self.bounds] + ["+Inf"]
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            counts = list(child.counts)
+            cumulative = 0
+            for le, count in zip(self._le, counts):
+                cumulative += count
+                yield "_bucket", values, f'le="{le}"', cumulative
+            yield "_sum", values, "", child.sum
+            yield "_count", values, "", cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def expose(self) -> str:
+        return "\n".join(m.expose() for m in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ============================================================================
+# INSTRUMENTATION HELPERS
+# ============================================================================
+
+class HTTPMetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template (not raw
+    path, to keep label cardinality bounded). Latency is measured up to the
+    response start, so long-lived streams are counted once, not for their
+    whole lifetime.
+    """
+
+    def __init__(self, app, histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        observed = False
+
+        def observe(status):
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            self.histogram.labels(scope["method"], path, status).observe(time.perf_counter() - start)
+
+        async def send_wrapper(message):
+            nonlocal observed
+            if message["type"] == "http.response.start" and not observed:
+                observed = True
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not observed:
+                observe(500)
+
+
+async def monitor_event_loop_lag(gauge, histogram=None, interval=0.5):
+    """
+    Background task: how late the event loop wakes up from a sleep. Sustained
+    lag means something is blocking the loop (sync I/O, heavy CPU in a
+    coroutine).
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        gauge.set(lag)
+        if histogram is not None:
+            histogram.observe(lag)
+
+
+# Measure observation cost and show a sample exposition
+if __name__ == "__main__":
+    registry = Registry()
+    requests = Counter("demo_requests_total", "Requests handled", ["route"], registry=registry)
+    depth = Gauge("demo_queue_depth", "Items waiting", registry=registry)
+    latency = Histogram("demo_latency_seconds", "Stage latency", ["stage"], registry=registry)
+
+    stage = latency.labels("predict")
+    n = 1_000_000
+    start = time.perf_counter()
+    for i in range(n):
+        stage.observe(i * 1e-9)
+    print(f"Histogram.observe(): {(time.perf_counter() - start) / n * 1e9:.0f} ns/call")
+
+    route = requests.labels("/ws")
+    start = time.perf_counter()
+    for _ in range(n):
+        route.inc()
+    print(f"Counter.inc():       {(time.perf_counter() - start) / n * 1e9:.0f} ns/call")
+
+    depth.set_function(lambda: 7)
+    requests.labels('/upload "test"').inc()
+    latency.labels("parse").observe(0.003)
+    print()
+    print(registry.expose())
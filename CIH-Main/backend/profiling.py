@@ -0,0 +1,193 @@
+"""
+PROFILING & TRACING
+===================
+On-demand diagnostics that cost nothing while switched off.
+
+- SamplingProfiler: for N seconds, snapshots every thread's Python stack at
+  a fixed interval (sys._current_frames) and aggregates them into the
+  collapsed-stack format read by flamegraph.pl, speedscope and similar
+  tools ("frame;frame;frame count" per line). No thread runs and no hook
+  is installed outside a profiling window.
+- Tracer: per-request traces made of named stage spans. While disabled,
+  `trace()` returns a shared no-op context manager and `record()` returns
+  after one attribute check. Finished traces are kept in a bounded buffer.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+
+# ============================================================================
+# SAMPLING PROFILER
+# ============================================================================
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, max_depth=128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def _stack(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            names.append(self._frame_name(frame))
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+    def run(self, seconds, interval=None) -> tuple:
+        """
+        Sample all other threads for `seconds` (blocking; call from a worker
+        thread). Returns (collapsed_stacks_text, number_of_samples).
+        Raises ProfilerBusy if a profile is already running.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            interval = interval or self.interval
+            own_ident = threading.get_ident()
+            stacks = Counter()
+            samples = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_ident:
+                        continue
+                    thread = names.get(ident, str(ident)).replace(";", "_").replace(" ", "_")
+                    stacks[f"{thread};{self._stack(frame)}"] += 1
+                samples += 1
+                time.sleep(interval)
+            return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common()), samples
+        finally:
+            self._lock.release()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+
+# ============================================================================
+# TRACING
+# ============================================================================
+
+_current_trace = ContextVar("current_trace", default=None)
+
+
+class _NoopTrace:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_TRACE = _NoopTrace()
+
+
+class _Trace:
+    __slots__ = ("tracer", "name", "attrs", "spans", "wall_start", "start", "end", "_token")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.spans = []  # (name, start, end) in perf_counter seconds
+
+    def __enter__(self):
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        self._token = _current_trace.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.end = time.perf_counter()
+        _current_trace.reset(self._token)
+        self.tracer._finished.append(self)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "started_at": self.wall_start,
+            "duration_ms": (self.end - self.start) * 1e3,
+            "attrs": self.attrs,
+            "spans": [
+                {"name": name, "offset_ms": (start - self.start) * 1e3, "duration_ms": (end - start) * 1e3}
+                for name, start, end in self.spans
+            ]
+        }
+
+
+class Tracer:
+    def __init__(self, capacity=200):
+        self.enabled = False
+        self._finished = deque(maxlen=capacity)
+
+    def trace(self, name, **attrs):
+        """Context manager opening a trace; spans recorded inside it attach to it"""
+        if not self.enabled:
+            return _NOOP_TRACE
+        return _Trace(self, name, attrs)
+
+    def record(self, name, start, end):
+        """Attach a finished span (perf_counter timestamps) to the current trace"""
+        if not self.enabled:
+            return
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append((name, start, end))
+
+    def recent(self, limit=50) -> list:
+        """Most recent finished traces, newest first"""
+        traces = list(self._finished)[-limit:]
+        return [t.to_dict() for t in reversed(traces)]
+
+    def clear(self):
+        self._finished.clear()
+
+
+# Measure the cost of disabled tracing and profile a small workload
+if __name__ == "__main__":
+    tracer = Tracer()
+    n = 1_000_000
+    start = time.perf_counter()
+    for _ in range(n):
+        with tracer.trace("request"):
+            tracer.record("stage", 0.0, 0.0)
+    print(f"Disabled trace + span: {(time.perf_counter() - start) / n * 1e9:.0f} ns")
+
+    tracer.enabled = True
+    start = time.perf_counter()
+    for _ in range(n // 10):
+        with tracer.trace("request"):
+            t0 = time.perf_counter()
+            tracer.record("stage", t0, time.perf_counter())
+    print(f"Enabled trace + span:  {(time.perf_counter() - start) / (n // 10) * 1e9:.0f} ns")
+    print(f"Last trace: {tracer.recent(1)[0]}")
+
+    def busy():
+        end = time.monotonic() + 1.0
+        while time.monotonic() < end:
+            sum(i * i for i in range(1000))
+
+    worker = threading.Thread(target=busy, name="busy worker")
+    worker.start()
+    collapsed, samples = SamplingProfiler(interval=0.002).run(0.5)
+    worker.join()
+    print(f"\nProfiled {samples} samples; hottest stacks:")
+    for line in collapsed.splitlines()[:3]:
+        print(f"  {line}")
@@ -0,0 +1,176 @@
+"""
+TOKEN-BUCKET RATE LIMITING
+==========================
+Each key (username) owns a bucket of `capacity` tokens refilled at `rate`
+tokens per second; a request spends one token. Unlike fixed windows there
+is no reset edge, so a client can never burst more than `capacity` on top
+of the sustained rate.
+
+Bucket state lives in a pluggable store:
+- MemoryBucketStore: per-process, LRU-bounded, updates under a lock (safe
+  for the threadpool that runs sync endpoints)
+- SQLiteBucketStore: a local SQLite file shared by every uvicorn worker;
+  each update is one IMMEDIATE transaction, so limits hold across processes
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def _refill(tokens, updated, now, rate, capacity):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+def _spend(tokens, cost, rate):
+    """(allowed, tokens_after, retry_after_seconds)"""
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rate
+
+
+class MemoryBucketStore:
+    """In-process buckets; least recently used keys are evicted beyond max_keys"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [tokens, updated]
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity, cost, now):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [capacity, now]
+                if len(self._buckets) > self.max_keys:
+                    # An evicted bucket would have been full soon anyway
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            tokens = _refill(bucket[0], bucket[1], now, rate, capacity)
+            allowed, bucket[0], retry_after = _spend(tokens, cost, rate)
+            bucket[1] = now
+            return allowed, retry_after
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """Buckets shared across processes through a local SQLite database"""
+
+    def __init__(self, path, prune_every=1000):
+        self.path = path
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._ops = 0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+
+    def _conn(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, capacity, cost, now):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")  # takes the write lock: read-modify-write is atomic
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else _refill(row[0], row[1], now, rate, capacity)
+            allowed, tokens, retry_after = _spend(tokens, cost, rate)
+            conn.execute(
+                "INSERT INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now)
+            )
+            self._ops += 1
+            if self._ops % self.prune_every == 0:
+                # Buckets idle long enough to be full again carry no state
+                conn.execute("DELETE FROM rate_buckets WHERE updated < ?", (now - capacity / rate,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0]
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate, capacity, store=None, clock=time.time):
+        """rate: tokens per second; capacity: maximum burst"""
+        self.rate = rate
+        self.capacity = capacity
+        self.store = store if store is not None else MemoryBucketStore()
+        # Wall clock (not monotonic) so timestamps agree across processes
+        self.clock = clock
+
+    def acquire(self, key, cost=1):
+        """Spend `cost` tokens from key's bucket. Returns (allowed, retry_after_seconds)."""
+        return self.store.take(key, self.rate, self.capacity, cost, self.clock())
+
+
+# Test the limiter under threads and processes
+if __name__ == "__main__":
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from multiprocessing import Pool
+
+    RATE, CAPACITY, REQUESTS = 50.0, 20, 400
+
+    def hammer(limiter, n):
+        return sum(limiter.acquire("user")[0] for _ in range(n))
+
+    def expected_max(elapsed):
+        return CAPACITY + RATE * elapsed
+
+    # Threads sharing one in-memory store
+    limiter = TokenBucketLimiter(RATE, CAPACITY, MemoryBucketStore())
+    start = time.time()
+    with ThreadPoolExecutor(8) as pool:
+        allowed = sum(pool.map(lambda _: hammer(limiter, REQUESTS // 8), range(8)))
+    elapsed = time.time() - start
+    print(f"memory, 8 threads:   {allowed} of {REQUESTS} allowed (bound {expected_max(elapsed):.0f})")
+    assert allowed <= expected_max(elapsed)
+
+    # LRU bound
+    store = MemoryBucketStore(max_keys=100)
+    limiter = TokenBucketLimiter(RATE, CAPACITY, store)
+    for i in range(1000):
+        limiter.acquire(f"user{i}")
+    print(f"memory, 1000 keys:   {len(store)} buckets kept (max_keys=100)")
+
+    # Processes sharing one SQLite store
+    path = os.path.join(tempfile.mkdtemp(), "rate_limits.db")
+    SQLiteBucketStore(path)
+
+    def worker(n):
+        return hammer(TokenBucketLimiter(RATE, CAPACITY, SQLiteBucketStore(path)), n)
+
+    start = time.time()
+    with Pool(4) as pool:
+        allowed = sum(pool.map(worker, [REQUESTS // 4] * 4))
+    elapsed = time.time() - start
+    print(f"sqlite, 4 processes: {allowed} of {REQUESTS} allowed (bound {expected_max(elapsed):.0f})")
+    assert allowed <= expected_max(elapsed)
+
+    limiter = TokenBucketLimiter(RATE, CAPACITY, SQLiteBucketStore(path))
+    start = time.perf_counter()
+    for i in range(1000):
+        limiter.acquire(f"bench{i % 10}")
+    print(f"sqlite acquire():    {(time.perf_counter() - start) / 1000 * 1e6:.1f} us/call")
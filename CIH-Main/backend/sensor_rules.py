@@ -0,0 +1,134 @@
+"""
+SENSOR RULE ENGINE
+==================
+Declarative sensor rules (valid ranges + critical thresholds) loaded from
+sensor_rules.json and compiled into NumPy vectors.
+
+A batch of readings is a float matrix (rows = readings, columns =
+`SensorRuleSet.sensors`, NaN = missing). Evaluation is two vectorized
+comparisons producing boolean masks; the human-readable out-of-range
+details and failure reasons are only built for rows that actually fail.
+"""
+
+import json
+import os
+
+import numpy as np
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sensor_rules.json')
+
+
+class RuleResult:
+    """Masks for one evaluated batch, with lazily materialized details"""
+
+    def __init__(self, rules, X, out_of_range, critical):
+        self._rules = rules
+        self._X = X
+        self.out_of_range_mask = out_of_range
+        self.critical_mask = critical
+        self.valid = ~out_of_range.any(axis=1)
+        self.has_critical = critical.any(axis=1)
+
+    def out_of_range(self, row) -> list:
+        """[{'sensor', 'value', 'expected_range'}] for one row (empty if valid)"""
+        if self.valid[row]:
+            return []
+        rules = self._rules
+        return [
+            {
+                'sensor': rules.sensors[col],
+                'value': float(self._X[row, col]),
+                'expected_range': rules.range_labels[col]
+            }
+            for col in np.flatnonzero(self.out_of_range_mask[row])
+        ]
+
+    def reasons(self, row) -> list:
+        """Failure reasons for one row, in rule order (empty if none)"""
+        if not self.has_critical[row]:
+            return []
+        return [self._rules.critical_reasons[k] for k in np.flatnonzero(self.critical_mask[row])]
+
+
+class SensorRuleSet:
+    def __init__(self, valid_ranges: dict, critical_thresholds: list, source=None):
+        self.source = source
+        self.sensors = list(valid_ranges)
+        for rule in critical_thresholds:
+            if rule['sensor'] not in self.sensors:
+                self.sensors.append(rule['sensor'])
+        self._col = {sensor: i for i, sensor in enumerate(self.sensors)}
+
+        n = len(self.sensors)
+        self.lo = np.full(n, -np.inf)
+        self.hi = np.full(n, np.inf)
+        self.range_labels = [None] * n
+        for sensor, (min_val, max_val) in valid_ranges.items():
+            col = self._col[sensor]
+            self.lo[col] = min_val
+            self.hi[col] = max_val
+            self.range_labels[col] = f'{min_val}-{max_val}'
+
+        self.critical_cols = np.array([self._col[r['sensor']] for r in critical_thresholds], dtype=np.intp)
+        self.critical_above = np.array([r['above'] for r in critical_thresholds], dtype=np.float64)
+        self.critical_reasons = [r['reason'] for r in critical_thresholds]
+
+    @classmethod
+    def load(cls, path=DEFAULT_RULES_PATH):
+        with open(path) as f:
+            config = json.load(f)
+        return cls(config['valid_ranges'], config['critical_thresholds'], source=path)
+
+    # ------------------------------------------------------------------
+    # Building input matrices
+    # ------------------------------------------------------------------
+
+    def row_vector(self, features: dict) -> np.ndarray:
+        """One reading as a 1 x n matrix (missing sensors -> NaN)"""
+        nan = np.nan
+        return np.array([[features.get(s, nan) for s in self.sensors]], dtype=np.float64)
+
+    def frame_matrix(self, df) -> np.ndarray:
+        """DataFrame with named sensor columns -> n x len(sensors) matrix"""
+        return df.reindex(columns=self.sensors).to_numpy(dtype=np.float64)
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    def evaluate(self, X: np.ndarray) -> RuleResult:
+        """Evaluate all rules on a batch. NaN never fails a rule."""
+        out_of_range = (X < self.lo) | (X > self.hi)
+        critical = X[:, self.critical_cols] > self.critical_above
+        return RuleResult(self, X, out_of_range, critical)
+
+    def evaluate_one(self, features: dict) -> RuleResult:
+        return self.evaluate(self.row_vector(features))
+
+
+# Test the rule engine
+if __name__ == "__main__":
+    import time
+
+    rules = SensorRuleSet.load()
+    print(f"Loaded {len(rules.sensors)} sensors, {len(rules.critical_reasons)} critical thresholds "
+          f"from {rules.source}")
+
+    rng = np.random.default_rng(0)
+    mid = np.where(np.isfinite(rules.lo), (rules.lo + rules.hi) / 2, 0)
+    span = np.where(np.isfinite(rules.lo), (rules.hi - rules.lo) / 2, 1)
+
+    for n in (1, 100, 10000):
+        X = mid + span * rng.uniform(-1.05, 1.05, (n, len(rules.sensors)))
+        best = float('inf')
+        for _ in range(50):
+            start = time.perf_counter()
+            result = rules.evaluate(X)
+            best = min(best, time.perf_counter() - start)
+        print(f"  batch of {n:5d}: {best * 1e6:8.1f} us  "
+              f"({int((~result.valid).sum())} invalid rows, {int(result.has_critical.sum())} with critical sensors)")
+
+    result = rules.evaluate_one({'LPT_Outlet_Temp': 1450.0, 'LPC_Outlet_Temp': 644.0})
+    print(f"\nSingle row: valid={bool(result.valid[0])}")
+    print(f"  out_of_range: {result.out_of_range(0)}")
+    print(f"  reasons:      {result.reasons(0)}")
@@ -6,6 +6,9 @@ This ensures each WebSocket connection starts from the beginning of the engine's
 
 import pandas as pd
 import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Base paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -28,7 +31,7 @@ class EngineSimulator:
         col_names = index_names + setting_names + sensor_names
 
         if not os.path.exists(DATA_PATH):
-            print(f"❌ Error: Data not found at {DATA_PATH}")
+            logger.error(f"Data not found at {DATA_PATH}")
             return pd.DataFrame()
 
         df = pd.read_csv(DATA_PATH, sep=r'\s+', header=None, names=col_names)
@@ -52,15 +55,9 @@ class EngineSimulator:
         }
         df = df.rename(columns=sensor_map)
         
-        print("\n" + "="*80)
-        print("SENSOR SIMULATOR INITIALIZED")
-        print("="*80)
-        print("\nLoaded sensors:")
-        for old, new in sensor_map.items():
-            if new in df.columns:
-                print(f"  ✓ {new:30s} (was {old})")
-        print("\nNote: LPT_Coolant_Bleed represents vibration-related measurements")
-        print("="*80 + "\n")
+        loaded = [f"{new} (was {old})" for old, new in sensor_map.items() if new in df.columns]
+        logger.info(f"Sensor simulator initialized with {len(loaded)} sensors: {', '.join(loaded)}")
+        logger.info("Note: LPT_Coolant_Bleed represents vibration-related measurements")
         
         return df
 
@@ -71,11 +68,10 @@ class EngineSimulator:
         self.current_idx = 0
         
         if len(self.unit_data) > 0:
-            print(f"🔄 Simulator switched to Engine #{unit_id}")
-            print(f"   Total cycles: {len(self.unit_data)}")
-            print(f"   Sensor count: {len([c for c in self.unit_data.columns if c not in ['unit_nr', 'time_cycles', 'setting_1', 'setting_2', 'setting_3']])}")
+            sensor_count = len([c for c in self.unit_data.columns if c not in ['unit_nr', 'time_cycles', 'setting_1', 'setting_2', 'setting_3']])
+            logger.info(f"Simulator switched to Engine #{unit_id} ({len(self.unit_data)} cycles, {sensor_count} sensors)")
         else:
-            print(f"❌ No data found for Engine #{unit_id}")
+            logger.warning(f"No data found for Engine #{unit_id}")
 
     def reset(self):
         """
@@ -83,7 +79,7 @@ class EngineSimulator:
         This should be called at the start of each WebSocket connection.
         """
         self.current_idx = 0
-        print(f"🔄 Simulator reset to cycle 0 for Engine #{self.current_unit}")
+        logger.info(f"Simulator reset to cycle 0 for Engine #{self.current_unit}")
 
     def get_next_cycle(self):
         """
@@ -109,7 +105,7 @@ class EngineSimulator:
         
         missing = [s for s in expected_sensors if s not in row or pd.isna(row[s])]
         if missing:
-            print(f"⚠️  Warning: Missing sensors in cycle {self.current_idx}: {missing}")
+            logger.warning(f"Missing sensors in cycle {self.current_idx}: {missing}")
         
         return row
 
@@ -215,6 +211,7 @@ class EngineSimulator:
 
 # Test the simulator
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
     print("\nTesting Sensor Simulator...")
     print("="*80)
     
@@ -0,0 +1,245 @@
+"""
+SHARED SERVER STATE
+===================
+Request, prediction and alert counters and the open-connection gauge
+behind /health, /health/detailed and /metrics.
+
+- LocalState:  one process. Values live in a dict under a lock; sync
+  endpoints run in the threadpool, so a bare `+=` could lose updates.
+- SQLiteState: several uvicorn workers (`--workers N`). Each worker counts
+  in memory exactly like LocalState, and a background thread publishes its
+  values to a shared SQLite file (one row per worker and name) every
+  `publish_interval` seconds, reading back the sum of the other workers.
+  get() returns this worker's live value plus that sum, so increments
+  never touch the database and reads are at most one interval stale.
+
+Rows are scoped to a deployment: the uvicorn process that spawned the
+workers, or the server process itself when it runs alone, identified by
+pid and start time so a restarted server (even under the same parent, or
+as PID 1 of a new container) never reuses an id; AEGISFLOW_DEPLOYMENT_ID
+overrides it. A worker uvicorn restarts keeps contributing to the same
+totals, while a restarted server starts from zero as it does in-process. Gauges
+are only summed over workers that published recently, so a crashed
+worker's open connections do not linger.
+
+SharedUserStatus keeps users' active flags in the same file, so a user
+deactivated on one worker is refused by all of them: each change bumps the
+user's generation, and workers compare it with the last one they applied
+on every authenticated request (one primary-key read).
+"""
+
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+
+
+def process_id(pid) -> str:
+    """"pid:start time", unique on this machine until reboot (Linux); the bare pid elsewhere"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the parenthesised command name; the start time is field 22
+            start_time = f.read().rsplit(")", 1)[1].split()[19]
+        return f"{pid}:{start_time}"
+    except (OSError, IndexError):
+        return str(pid)
+
+
+def default_deployment() -> str:
+    """Id of the server this process belongs to: the uvicorn supervisor that spawned it, else itself"""
+    configured = os.environ.get("AEGISFLOW_DEPLOYMENT_ID")
+    if configured:
+        return configured
+    parent = multiprocessing.parent_process()
+    return process_id(parent.pid if parent is not None else os.getpid())
+
+
+class LocalState:
+    """Counters and gauges of this process"""
+    multiprocess = False
+
+    def __init__(self, counters=(), gauges=()):
+        self.counters = tuple(counters)
+        self.gauges = tuple(gauges)
+        self._values = dict.fromkeys(self.counters + self.gauges, 0)
+        self._lock = threading.Lock()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._values[name] += amount
+
+    def get(self, name):
+        return self._values[name]
+
+    def snapshot(self) -> dict:
+        return {name: self.get(name) for name in self._values}
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteState(LocalState):
+    """Counters and gauges summed over every worker sharing `path`"""
+    multiprocess = True
+
+    def __init__(self, path, counters=(), gauges=(), publish_interval=1.0,
+                 deployment=None, worker=None, clock=time.time):
+        super().__init__(counters, gauges)
+        self.path = path
+        self.publish_interval = publish_interval
+        self.stale_after = 3 * publish_interval
+        self.deployment = default_deployment() if deployment is None else deployment
+        self.worker = os.getpid() if worker is None else worker
+        self.clock = clock
+        self.publish_errors = 0
+        self._others = {}  # name -> sum over the other workers at the last publish
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS state_values (
+                deployment TEXT NOT NULL,
+                worker INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                value INTEGER NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (deployment, worker, name)
+            )
+        """)
+        # Earlier server runs; a live deployment sharing the file keeps its rows fresh
+        self._conn.execute("DELETE FROM state_values WHERE deployment != ? AND updated < ?",
+                           (self.deployment, self.clock() - self.stale_after))
+        self.publish()
+
+    def get(self, name):
+        return self._values[name] + self._others.get(name, 0)
+
+    def publish(self):
+        """Write this worker's values and refresh the other workers' sums"""
+        with self._lock:
+            values = list(self._values.items())
+        now = self.clock()
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO state_values (deployment, worker, name, value, updated) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(deployment, worker, name) DO UPDATE SET value = excluded.value, updated = excluded.updated",
+                [(self.deployment, self.worker, name, value, now) for name, value in values]
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        # Counters of every worker; gauges only of workers still publishing
+        is_counter = f"name NOT IN ({', '.join('?' * len(self.gauges))})" if self.gauges else "1"
+        rows = conn.execute(
+            "SELECT name, SUM(value) FROM state_values WHERE deployment = ? AND worker != ? "
+            f"AND (updated >= ? OR {is_counter}) GROUP BY name",
+            (self.deployment, self.worker, now - self.stale_after, *self.gauges)
+        ).fetchall()
+        self._others = dict(rows)
+
+    def _run(self):
+        while not self._stop.wait(self.publish_interval):
+            try:
+                self.publish()
+            except sqlite3.Error:
+                self.publish_errors += 1
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="state-publisher", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Publish the final values and stop the publisher"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        try:
+            self.publish()
+        except sqlite3.Error:
+            self.publish_errors += 1
+        self._conn.close()
+
+
+class SharedUserStatus:
+    """Users' active flags for one deployment, shared by its workers"""
+
+    def __init__(self, path, deployment):
+        self.deployment = deployment
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS user_status (
+                deployment TEXT NOT NULL,
+                username TEXT NOT NULL,
+                active INTEGER NOT NULL,
+                generation INTEGER NOT NULL,
+                PRIMARY KEY (deployment, username)
+            )
+        """)
+
+    def set_active(self, username, active) -> int:
+        """Record a change; returns the user's new generation"""
+        with self._lock:
+            return self._conn.execute(
+                "INSERT INTO user_status (deployment, username, active, generation) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(deployment, username) DO UPDATE SET active = excluded.active, "
+                "generation = generation + 1 RETURNING generation",
+                (self.deployment, username, int(active))
+            ).fetchone()[0]
+
+    def get(self, username):
+        """(active, generation) of the last change to a user, None if it never changed"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT active, generation FROM user_status WHERE deployment = ? AND username = ?",
+                (self.deployment, username)
+            ).fetchone()
+        return None if row is None else (bool(row[0]), row[1])
+
+    def close(self):
+        self._conn.close()
+
+
+# Aggregation across processes
+if __name__ == "__main__":
+    import tempfile
+    from multiprocessing import Pool
+
+    COUNTERS, GAUGES = ("total_requests",), ("active_connections",)
+    path = os.path.join(tempfile.mkdtemp(), "state.db")
+
+    def worker(n):
+        state = SQLiteState(path, COUNTERS, GAUGES, publish_interval=0.05, deployment=1)
+        state.start()
+        for _ in range(n):
+            state.incr("total_requests")
+        state.incr("active_connections")
+        time.sleep(0.2)
+        state.incr("active_connections", -1)
+        state.close()
+        return n
+
+    with Pool(4) as pool:
+        sent = sum(pool.map(worker, [2500] * 4))
+    reader = SQLiteState(path, COUNTERS, GAUGES, deployment=1)
+    print(f"4 processes: {reader.get('total_requests')} of {sent} requests counted, "
+          f"{reader.get('active_connections')} connections open")
+
+    local = LocalState(COUNTERS)
+    start = time.perf_counter()
+    for _ in range(100_000):
+        local.incr("total_requests")
+    print(f"incr(): {(time.perf_counter() - start) / 100_000 * 1e6:.2f} us/call")
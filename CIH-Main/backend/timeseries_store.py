@@ -0,0 +1,297 @@
+"""
+PREDICTION TIME-SERIES STORE
+============================
+Append-only history of every prediction (RUL, status and the sensor
+readings it was made from) in a SQLite database in WAL mode.
+
+Writers never touch the database: `append()` / `append_many()` only put
+rows on a bounded queue. A background thread drains it and inserts rows in
+one transaction per batch (group commit: it waits up to `flush_interval`
+for more rows, so a quiet stream does not commit per reading). When the
+queue is full, rows are dropped and counted instead of blocking the caller.
+
+Reads open their own connection (WAL lets them run alongside the writer)
+and downsample on the server:
+- lttb:   Largest-Triangle-Three-Buckets, keeps the visual shape of a line
+- minmax: the lowest and highest point of each time bucket, keeps spikes
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from alert_store import to_epoch
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax", "none")
+
+_STOP = object()
+
+
+# ============================================================================
+# DOWNSAMPLING
+# ============================================================================
+
+def lttb(x, y, n_out) -> np.ndarray:
+    """
+    Indices of the n_out points Largest-Triangle-Three-Buckets keeps.
+    First and last points are always kept; missing (NaN) values count as
+    the series mean when comparing triangle areas.
+    """
+    n = len(x)
+    if n <= n_out:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1], dtype=np.intp)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64), nan=np.nanmean(y) if np.isfinite(y).any() else 0.0)
+    x = np.asarray(x, dtype=np.float64)
+    # Interior points split into n_out - 2 buckets of (nearly) equal count
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    keep = np.empty(n_out, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        if i + 2 < len(edges):
+            nx, ny = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            nx, ny = x[n - 1], y[n - 1]
+        area = np.abs((x[a] - nx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (ny - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax_buckets(x, y, n_out) -> np.ndarray:
+    """Indices of the min and max point of each of n_out // 2 equal-width x buckets, in x order"""
+    n = len(x)
+    n_buckets = max(1, n_out // 2)
+    if n <= n_out:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    span = x[-1] - x[0]
+    bucket = np.minimum(((x - x[0]) / span * n_buckets).astype(np.intp), n_buckets - 1) if span > 0 \
+        else np.arange(n) * n_buckets // n
+    # Per bucket: values ascending, then missing (NaN) points. Min and max are
+    # taken over the values; a bucket without any keeps one point for the gap
+    valid = ~np.isnan(y)
+    order = np.lexsort((y, ~valid, bucket))
+    sorted_bucket = bucket[order]
+    starts = np.flatnonzero(np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]])
+    n_valid = np.add.reduceat(valid[order].astype(np.intp), starts)
+    ends = starts + np.maximum(n_valid, 1) - 1
+    return np.unique(np.r_[order[starts], order[ends]])
+
+
+def downsample(x, y, max_points, method="lttb") -> np.ndarray:
+    if method == "none" or len(x) <= max_points:
+        return np.arange(len(x))
+    if method == "lttb":
+        return lttb(x, y, max_points)
+    if method == "minmax":
+        return minmax_buckets(x, y, max_points)
+    raise ValueError(f"Unknown downsampling method {method!r} (use one of {', '.join(DOWNSAMPLE_METHODS)})")
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class TimeSeriesStore:
+    def __init__(self, path, sensors, batch_size=5000, flush_interval=1.0, queue_size=10000):
+        self.path = path
+        self.sensors = list(sensors)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)  # items are lists of rows
+        self._thread = None
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS predictions (
+                engine_id INTEGER NOT NULL,
+                ts REAL NOT NULL,
+                cycle INTEGER,
+                rul REAL,
+                status TEXT
+            )
+        """)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(predictions)")}
+        for sensor in self.sensors:
+            if sensor not in existing:
+                conn.execute(f'ALTER TABLE predictions ADD COLUMN "{sensor}" REAL')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_engine_ts ON predictions (engine_id, ts)")
+        conn.close()
+
+        columns = ["engine_id", "ts", "cycle", "rul", "status"] + [f'"{s}"' for s in self.sensors]
+        self._insert = f"INSERT INTO predictions ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ------------------------------------------------------------------
+    # Writes (any thread; never block)
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="timeseries-writer", daemon=True)
+            self._thread.start()
+
+    def _put(self, rows):
+        try:
+            self._queue.put_nowait(rows)
+        except queue.Full:
+            self.dropped += len(rows)
+
+    def append(self, engine_id, cycle, rul, status, values, ts=None):
+        """One prediction; values are the sensor readings in `sensors` order"""
+        self._put([(engine_id, time.time() if ts is None else ts, cycle, rul, status, *values)])
+
+    def append_many(self, engine_ids, cycles, ruls, statuses, X, ts=None):
+        """Many predictions (lists or arrays of equal length; X is n x len(sensors))"""
+        ts = time.time() if ts is None else ts
+        self._put([
+            (e, ts, c, r, s, *x)
+            for e, c, r, s, x in zip(engine_ids, cycles, ruls, statuses, X.tolist() if hasattr(X, "tolist") else X)
+        ])
+
+    @property
+    def pending(self) -> int:
+        """Queued batches not yet written"""
+        return self._queue.qsize()
+
+    def _run(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+            rows, taken = list(item), 1
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is _STOP:
+                    stopping = True
+                    break
+                rows.extend(item)
+            try:
+                conn.execute("BEGIN")
+                conn.executemany(self._insert, rows)
+                conn.execute("COMMIT")
+                self.written += len(rows)
+            except sqlite3.Error:
+                self.write_errors += 1
+                self.dropped += len(rows)
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            for _ in range(taken):
+                self._queue.task_done()
+        conn.close()
+
+    def flush(self):
+        """Block until everything queued so far is written"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def history(self, engine_id, field="rul", since=None, until=None, max_points=500, method="lttb") -> dict:
+        """
+        One engine's series of `field` ("rul" or a sensor) in time order,
+        optionally limited to [since, until] and downsampled to max_points.
+        """
+        if field != "rul" and field not in self.sensors:
+            raise ValueError(f"Unknown field {field!r} (use 'rul' or a sensor name)")
+        if method not in DOWNSAMPLE_METHODS:
+            raise ValueError(f"Unknown downsampling method {method!r} (use one of {', '.join(DOWNSAMPLE_METHODS)})")
+        clauses, params = ["engine_id = ?"], [engine_id]
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(to_epoch(since))
+        if until is not None:
+            clauses.append("ts <= ?")
+            params.append(to_epoch(until))
+        sql = f'SELECT ts, cycle, "{field}" FROM predictions WHERE {" AND ".join(clauses)} ORDER BY ts, rowid'
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+        points = []
+        if rows:
+            data = np.array(rows, dtype=np.float64)
+            keep = downsample(data[:, 0], data[:, 2], max_points, method)
+            for ts, cycle, value in data[keep].tolist():
+                points.append({
+                    "timestamp": datetime.fromtimestamp(ts, timezone.utc),
+                    "cycle": int(cycle),
+                    "value": None if value != value else value
+                })
+        return {
+            "engine_id": engine_id,
+            "field": field,
+            "method": method if len(rows) > max_points else "none",
+            "total_points": len(rows),
+            "points": points
+        }
+
+
+# Write throughput and downsampling speed
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    sensors = ["LPT_Outlet_Temp", "Fan_Speed"]
+    path = os.path.join(tempfile.mkdtemp(), "timeseries.db")
+    store = TimeSeriesStore(path, sensors, flush_interval=0.05)
+    store.start()
+
+    n = 200_000
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n, 2)) * [5, 10] + [1400, 2388]
+    ruls = np.clip(125 - np.arange(n) * 125 / n + rng.normal(size=n) * 3, 0, 125)
+    start = time.perf_counter()
+    for i in range(0, n, 100):
+        store.append_many([7] * 100, range(i, i + 100), ruls[i:i + 100].tolist(), ["Healthy"] * 100,
+                          X[i:i + 100], ts=1_700_000_000 + i)
+    enqueue_s = time.perf_counter() - start
+    store.flush()
+    total_s = time.perf_counter() - start
+    print(f"{n} rows: enqueue {enqueue_s / n * 1e6:.2f} us/row, written at {n / total_s:,.0f} rows/s "
+          f"(dropped {store.dropped})")
+
+    for method in ("lttb", "minmax"):
+        start = time.perf_counter()
+        result = store.history(7, max_points=500, method=method)
+        print(f"history({method}): {result['total_points']} -> {len(result['points'])} points "
+              f"in {(time.perf_counter() - start) * 1e3:.1f} ms")
+    store.close()
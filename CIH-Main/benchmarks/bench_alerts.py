@@ -0,0 +1,61 @@
+"""
+ALERT VOLUME BENCHMARK
+======================
+Replays the FD001 training fleet (100 engines run to failure, ground-truth
+RUL per cycle) through:
+  - the old stateless rule (one alert per cycle while RUL < 50 / LPT hot)
+  - the stateful AlertEngine (raise once, escalate, hysteresis, cooldown)
+
+Usage:
+    python CIH-Main/benchmarks/bench_alerts.py
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(BACKEND_DIR)
+from alert_engine import AlertEngine
+
+DATA_PATH = os.path.join(BACKEND_DIR, '../../dataset/train_FD001.txt')
+
+
+def stateless_alert(rul, sensors):
+    """The pre-AlertEngine check_alert_conditions decision"""
+    if rul < 50:
+        return True
+    return sensors.get('LPT_Outlet_Temp', 0) > 1427
+
+
+def main():
+    cols = ['unit_nr', 'time_cycles'] + [f'setting_{i}' for i in range(1, 4)] + [f's_{i}' for i in range(1, 22)]
+    df = pd.read_csv(DATA_PATH, sep=r'\s+', header=None, names=cols)
+    df['RUL'] = df.groupby('unit_nr')['time_cycles'].transform('max') - df['time_cycles']
+    readings = [
+        (int(unit), float(rul), {'LPT_Outlet_Temp': float(temp)})
+        for unit, rul, temp in zip(df['unit_nr'], df['RUL'], df['s_4'])
+    ]
+
+    start = time.perf_counter()
+    old = sum(1 for _, rul, sensors in readings if stateless_alert(rul, sensors))
+    old_s = time.perf_counter() - start
+
+    engine = AlertEngine()
+    start = time.perf_counter()
+    new = sum(len(engine.evaluate(unit, rul, sensors)) for unit, rul, sensors in readings)
+    new_s = time.perf_counter() - start
+
+    print("=" * 80)
+    print(f"ALERT VOLUME: {len(readings)} predictions, {df['unit_nr'].nunique()} engines")
+    print("=" * 80)
+    print(f"Stateless rule : {old:6d} alerts  ({old_s * 1e6 / len(readings):.2f} us/prediction)")
+    print(f"AlertEngine    : {new:6d} alerts  ({new_s * 1e6 / len(readings):.2f} us/prediction)")
+    print(f"Reduction      : {old / max(new, 1):.0f}x")
+    print(f"Engine stats   : {engine.stats}")
+
+
+if __name__ == "__main__":
+    main()
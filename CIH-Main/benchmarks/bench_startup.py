@@ -0,0 +1,195 @@
+"""
+STARTUP BENCHMARK
+=================
+What a cold API process costs before it can serve:
+  - import: `python -X importtime -c "import main"`: total, and the
+    modules main imports directly ranked by cumulative time
+  - serve:  uvicorn started on a free port, timed from spawn to
+      * the first /health response (target: under 1 s)
+      * /health reporting "healthy" (model and simulator loaded)
+      * the first 200 from /readyz (model warmed up, canary passed)
+
+Each run uses a temporary working directory, so logs and SQLite files
+stay out of the backend directory. Medians over --runs are written as
+JSON; startup_baseline.json next to this file is the tracked baseline,
+and --baseline prints the change against it.
+
+Usage:
+    python CIH-Main/benchmarks/bench_startup.py [--runs 3] [--output startup.json]
+        [--baseline CIH-Main/benchmarks/startup_baseline.json] [--target 1.0]
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_baseline.json')
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)')
+
+
+def parse_importtime(stderr) -> list:
+    """[(module, depth, self_us, cumulative_us)] in output order (children before parents)"""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, (len(indent) - 1) // 2, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def import_profile(env):
+    """(seconds to import main, {module main imports directly: seconds})"""
+    with tempfile.TemporaryDirectory() as workdir:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import main'],
+            cwd=workdir, env=dict(env, PYTHONPATH=BACKEND_DIR), capture_output=True, text=True, check=True
+        )
+    entries = parse_importtime(result.stderr)
+    main_us = next(cum for module, depth, _, cum in entries if module == 'main' and depth == 0)
+    # Children are listed before their parent: depth-1 entries right before 'main'
+    direct = {}
+    for module, depth, _, cum in entries:
+        if module == 'main' and depth == 0:
+            break
+        if depth == 1:
+            direct[module] = cum / 1e6
+        elif depth == 0:
+            direct.clear()  # an unrelated top-level import (site, encodings, ...)
+    return main_us / 1e6, direct
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def get(url):
+    """(status, JSON body) or None if nothing is listening yet"""
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read() or b'null')
+    except urllib.error.HTTPError as e:
+        return e.code, None
+    except (urllib.error.URLError, ConnectionError):
+        return None
+
+
+def serve_profile(env, timeout=120.0) -> dict:
+    """Seconds from spawning uvicorn to first /health, healthy /health and ready /readyz"""
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--app-dir', BACKEND_DIR,
+             '--port', str(port), '--log-level', 'warning'],
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        timings = {}
+        try:
+            while len(timings) < 3:
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError(f"Server not ready after {timeout:.0f}s (got {sorted(timings)})")
+                if server.poll() is not None:
+                    raise RuntimeError(f"Server exited with code {server.returncode}")
+                health = get(base + '/health')
+                now = time.perf_counter() - start
+                if health is not None:
+                    timings.setdefault('first_health_s', now)
+                    if health[0] == 200 and health[1].get('status') == 'healthy':
+                        timings.setdefault('healthy_s', now)
+                    if 'ready_s' not in timings:
+                        ready = get(base + '/readyz')
+                        if ready is not None and ready[0] == 200:
+                            timings['ready_s'] = time.perf_counter() - start
+                # Fine-grained until the server answers, then lighter so polling
+                # does not compete with the background model load for the CPU
+                time.sleep(0.01 if health is None else 0.05)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    return timings
+
+
+def run(runs=3) -> dict:
+    env = dict(os.environ, AEGISFLOW_LOG_FILE='')
+    imports, serves = [], []
+    for i in range(runs):
+        imports.append(import_profile(env))
+        serves.append(serve_profile(env))
+        print(f"  run {i + 1}: import main {imports[-1][0]:.3f}s, first /health {serves[-1]['first_health_s']:.3f}s, "
+              f"healthy {serves[-1]['healthy_s']:.3f}s, ready {serves[-1]['ready_s']:.3f}s")
+
+    modules = {}
+    for _, direct in imports:
+        for module, seconds in direct.items():
+            modules.setdefault(module, []).append(seconds)
+    heaviest = sorted(((m, statistics.median(t)) for m, t in modules.items()), key=lambda item: -item[1])
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': sys.platform,
+            'cpu_count': os.cpu_count()
+        },
+        'runs': runs,
+        'import_main_s': statistics.median(t for t, _ in imports),
+        'direct_imports_s': dict(heaviest[:15]),
+        **{key: statistics.median(s[key] for s in serves) for key in ('first_health_s', 'healthy_s', 'ready_s')}
+    }
+
+
+def print_report(report, baseline=None, target=1.0):
+    print("\n" + "=" * 80)
+    print("STARTUP")
+    print("=" * 80)
+    for key, label in (('import_main_s', 'import main'), ('first_health_s', 'first /health'),
+                       ('healthy_s', '/health healthy'), ('ready_s', '/readyz ready')):
+        line = f"{label:<18} {report[key]:7.3f} s"
+        if baseline and key in baseline:
+            line += f"   (baseline {baseline[key]:.3f} s, {report[key] / baseline[key] - 1:+.0%})"
+        print(line)
+    print("\nHeaviest imports of main (cumulative):")
+    for module, seconds in report['direct_imports_s'].items():
+        print(f"  {module:<28} {seconds * 1e3:8.1f} ms")
+    verdict = "within" if report['first_health_s'] < target else "OVER"
+    print(f"\nFirst /health {verdict} the {target:.1f} s target")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure API import time and time to first /health')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--output', default='startup.json')
+    parser.add_argument('--baseline', default=None, help=f'Report to compare with (e.g. {BASELINE_PATH})')
+    parser.add_argument('--target', type=float, default=1.0, help='Seconds to the first /health')
+    args = parser.parse_args()
+
+    report = run(args.runs)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline, args.target)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"✓ Report saved to: {args.output}")
+    if report['first_health_s'] >= args.target:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+"""
+LOAD TEST
+=========
+Drives a local API with the traffic of a busy control room and reports
+what it sustains:
+  - dashboards: N WebSocket clients on /ws. The stream sends a frame every
+    0.3 s; a gap of k intervals between two frames counts k - 1 dropped
+  - uploaders:  M clients posting test_FD001.txt to /upload_test back to back
+  - logins:     every --login-interval seconds, a burst of concurrent /auth/login
+
+Reported per workload: throughput and p50/p99 latency, dropped frames,
+the server's event-loop lag (scraped from /metrics) and its RSS, plus a
+timeline of both and of throughput every --sample-interval seconds.
+
+The server is always local:
+  - default:      uvicorn spawned on a free port in a temporary directory,
+                  with the rate limit lifted so uploaders measure the
+                  pipeline rather than 429s
+  - --in-process: uvicorn in a thread of this process (the clients share
+                  its GIL; handy under a profiler)
+  - --url:        a server already running on localhost (--server-pid for RSS;
+                  its rate limit applies and shows up as 429s)
+
+load_baseline.json next to this file is the tracked baseline; --baseline
+prints the change against it and exits 1 when a metric is more than
+--tolerance worse.
+
+Usage:
+    python CIH-Main/benchmarks/load_test.py [--dashboards 20] [--uploaders 2] [--login-burst 10]
+        [--duration 30] [--in-process | --url http://127.0.0.1:8000 [--server-pid PID]]
+        [--output load.json] [--baseline CIH-Main/benchmarks/load_baseline.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+import httpx
+import websockets
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'load_baseline.json')
+UPLOAD_PATH = os.path.normpath(os.path.join(BACKEND_DIR, '../../dataset/test_FD001.txt'))
+
+STREAM_INTERVAL = 0.3  # seconds between /ws frames
+LOCAL_HOSTS = ('127.0.0.1', 'localhost', '::1')
+CREDENTIALS = {'username': 'admin', 'password': 'admin123'}
+SERVER_ENV = {
+    'AEGISFLOW_LOG_FILE': '',
+    'AEGISFLOW_RATE_LIMIT_REQUESTS': '1000000',
+    'AEGISFLOW_RATE_LIMIT_BURST': '100000'
+}
+LAG_GAUGE = 'aegisflow_event_loop_lag_seconds'
+LAG_HISTOGRAM = 'aegisflow_event_loop_lag_distribution_seconds'
+
+# Regression checks: (section, metric, higher is better, smallest change that counts)
+CHECKS = (
+    ('uploads', 'throughput_rps', True, 0.05),
+    ('uploads', 'p99_ms', False, 50.0),
+    ('logins', 'p99_ms', False, 50.0),
+    ('dashboards', 'frames_per_s', True, 1.0),
+    ('dashboards', 'dropped_frames', False, 5),
+    ('event_loop_lag', 'p99_ms', False, 10.0),
+    ('rss_mb', 'peak', False, 20.0)
+)
+
+
+def percentile(values, q):
+    """Nearest-rank percentile, None without values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def ms(seconds):
+    return None if seconds is None else round(seconds * 1e3, 1)
+
+
+class RequestStats:
+    """Latencies and outcomes of one kind of request"""
+
+    def __init__(self):
+        self.latencies = []
+        self.ok = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    def record(self, seconds, status):
+        self.latencies.append(seconds)
+        if status == 200:
+            self.ok += 1
+        elif status == 429:
+            self.rate_limited += 1
+        else:
+            self.errors += 1
+
+    def summary(self, elapsed) -> dict:
+        return {
+            'requests': len(self.latencies),
+            'ok': self.ok,
+            'rate_limited': self.rate_limited,
+            'errors': self.errors,
+            'throughput_rps': round(self.ok / elapsed, 3),
+            'p50_ms': ms(percentile(self.latencies, 0.5)),
+            'p99_ms': ms(percentile(self.latencies, 0.99))
+        }
+
+
+class DashboardStats:
+    """Frames seen by the /ws clients"""
+
+    def __init__(self):
+        self.connected = 0
+        self.failed = 0
+        self.disconnected = 0
+        self.frames = 0
+        self.dropped = 0
+        self.intervals = []
+
+    def summary(self, elapsed) -> dict:
+        return {
+            'connected': self.connected,
+            'failed': self.failed,
+            'disconnected': self.disconnected,
+            'frames': self.frames,
+            'frames_per_s': round(self.frames / elapsed, 2),
+            'dropped_frames': self.dropped,
+            'interval_p50_ms': ms(percentile(self.intervals, 0.5)),
+            'interval_p99_ms': ms(percentile(self.intervals, 0.99))
+        }
+
+
+# ============================================================================
+# SERVER SIDE
+# ============================================================================
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid):
+    """Resident memory of `pid` in MB (Linux /proc), None if unavailable"""
+    if pid is None:
+        return None
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def lag_metrics(text):
+    """(latest event-loop lag in seconds, {bucket bound: cumulative count}) from /metrics"""
+    latest, buckets = None, {}
+    for line in text.splitlines():
+        if line.startswith(LAG_GAUGE + ' '):
+            latest = float(line.split()[1])
+        elif line.startswith(LAG_HISTOGRAM + '_bucket{'):
+            le = line[line.index('le="') + 4:line.index('"}')]
+            buckets[float(le)] = float(line.rsplit(' ', 1)[1])
+    return latest, buckets
+
+
+def bucket_quantile(start, end, q):
+    """Upper bound of the bucket holding quantile q of the observations between two scrapes"""
+    bounds = sorted(end)
+    counts = [end[b] - start.get(b, 0) for b in bounds]
+    if not counts or not counts[-1]:
+        return None
+    for i, (bound, count) in enumerate(zip(bounds, counts)):
+        if count >= q * counts[-1]:
+            # Past the last finite bucket: report that bound as a floor
+            return bound if math.isfinite(bound) else bounds[i - 1]
+
+
+def wait_ready(base_url, server=None, timeout=120.0):
+    """Block until /readyz answers 200 (model loaded and warmed up)"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            if httpx.get(base_url + '/readyz', timeout=5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"{base_url} not ready after {timeout:.0f}s")
+
+
+@contextlib.contextmanager
+def spawned_server():
+    """(base URL, pid) of a uvicorn process serving main:app from a temporary directory"""
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as workdir:
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--app-dir', BACKEND_DIR,
+             '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+            cwd=workdir, env=dict(os.environ, **SERVER_ENV),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_ready(base_url, server)
+            yield base_url, server.pid
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+@contextlib.contextmanager
+def in_process_server():
+    """(base URL, pid) of uvicorn serving main:app from a thread of this process"""
+    os.environ.update(SERVER_ENV)
+    sys.path.append(BACKEND_DIR)
+    import uvicorn
+
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # main opens its SQLite files relative to the working directory
+        server = uvicorn.Server(uvicorn.Config('main:app', host='127.0.0.1', port=port, log_level='warning'))
+        thread = threading.Thread(target=server.run, name='uvicorn', daemon=True)
+        thread.start()
+        try:
+            wait_ready(base_url)
+            yield base_url, os.getpid()
+        finally:
+            server.should_exit = True
+            thread.join(timeout=30)
+            os.chdir(cwd)
+
+
+@contextlib.contextmanager
+def running_server(url, pid):
+    """An already running local server"""
+    wait_ready(url.rstrip('/'), timeout=30)
+    yield url.rstrip('/'), pid
+
+
+# ============================================================================
+# CLIENTS
+# ============================================================================
+
+async def dashboard(ws_url, stats, deadline):
+    """One /ws client counting frames until the deadline"""
+    loop = asyncio.get_running_loop()
+    try:
+        async with websockets.connect(ws_url, max_size=None, open_timeout=60) as ws:
+            stats.connected += 1
+            last, after_finish = None, False
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    message = await asyncio.wait_for(ws.recv(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                now = loop.time()
+                stats.frames += 1
+                # The stream pauses deliberately once an engine's data runs out
+                if last is not None and not after_finish:
+                    gap = now - last
+                    stats.intervals.append(gap)
+                    stats.dropped += max(0, round(gap / STREAM_INTERVAL) - 1)
+                last, after_finish = now, json.loads(message).get('finished', False)
+    except websockets.ConnectionClosed:
+        stats.disconnected += 1
+    except (OSError, asyncio.TimeoutError, websockets.InvalidHandshake):
+        stats.failed += 1
+
+
+async def uploader(client, headers, body, stats, deadline):
+    """One client uploading the test file back to back until the deadline"""
+    loop = asyncio.get_running_loop()
+    while loop.time() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.post('/upload_test', headers=headers,
+                                         files={'file': ('test_FD001.txt', body, 'text/plain')})
+            stats.record(time.perf_counter() - start, response.status_code)
+        except httpx.HTTPError:
+            stats.record(time.perf_counter() - start, None)
+
+
+async def login(client, stats):
+    start = time.perf_counter()
+    try:
+        response = await client.post('/auth/login', json=CREDENTIALS)
+        stats.record(time.perf_counter() - start, response.status_code)
+    except httpx.HTTPError:
+        stats.record(time.perf_counter() - start, None)
+
+
+async def login_bursts(client, burst, interval, stats, deadline):
+    """`burst` concurrent logins every `interval` seconds until the deadline"""
+    loop = asyncio.get_running_loop()
+    while burst and (start := loop.time()) < deadline:
+        await asyncio.gather(*(login(client, stats) for _ in range(burst)))
+        await asyncio.sleep(max(0.0, min(start + interval, deadline) - loop.time()))
+
+
+async def sampler(client, headers, pid, interval, deadline, workloads, timeline):
+    """Server RSS, event-loop lag and throughput every `interval` seconds"""
+    loop = asyncio.get_running_loop()
+    start = previous_time = loop.time()
+    previous = {name: 0 for name in workloads}
+    while True:
+        await asyncio.sleep(max(0.0, min(interval, deadline - loop.time())))
+        now = loop.time()
+        try:
+            lag, _ = lag_metrics((await client.get('/metrics', headers=headers)).text)
+        except httpx.HTTPError:
+            lag = None
+        sample = {'t': round(now - start, 1), 'rss_mb': rss_mb(pid), 'event_loop_lag_ms': ms(lag)}
+        for name, count in workloads.items():
+            done = count()
+            sample[f'{name}_per_s'] = round((done - previous[name]) / (now - previous_time), 2)
+            previous[name] = done
+        previous_time = now
+        timeline.append(sample)
+        if now >= deadline:
+            return
+
+
+async def drive(base_url, pid, args) -> dict:
+    with open(args.upload_file, 'rb') as f:
+        body = f.read()
+    ws_url = 'ws' + base_url[len('http'):] + '/ws'
+    dashboards, uploads, logins = DashboardStats(), RequestStats(), RequestStats()
+    timeline = []
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        response = await client.post('/auth/login', json=CREDENTIALS)
+        response.raise_for_status()
+        headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+        _, lag_before = lag_metrics((await client.get('/metrics', headers=headers)).text)
+        rss_before = rss_mb(pid)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + args.duration
+        workloads = {'frames': lambda: dashboards.frames, 'uploads': lambda: uploads.ok,
+                     'logins': lambda: logins.ok}
+        await asyncio.gather(
+            *(dashboard(ws_url, dashboards, deadline) for _ in range(args.dashboards)),
+            *(uploader(client, headers, body, uploads, deadline) for _ in range(args.uploaders)),
+            login_bursts(client, args.login_burst, args.login_interval, logins, deadline),
+            sampler(client, headers, pid, args.sample_interval, deadline, workloads, timeline)
+        )
+        elapsed = loop.time() - start
+        _, lag_after = lag_metrics((await client.get('/metrics', headers=headers)).text)
+
+    sampled_lag = [s['event_loop_lag_ms'] for s in timeline if s['event_loop_lag_ms'] is not None]
+    sampled_rss = [s['rss_mb'] for s in timeline if s['rss_mb'] is not None]
+    return {
+        'elapsed_s': round(elapsed, 2),
+        'dashboards': dashboards.summary(elapsed),
+        'uploads': uploads.summary(elapsed),
+        'logins': logins.summary(elapsed),
+        'event_loop_lag': {
+            'p50_ms': ms(bucket_quantile(lag_before, lag_after, 0.5)),
+            'p99_ms': ms(bucket_quantile(lag_before, lag_after, 0.99)),
+            'max_sampled_ms': max(sampled_lag, default=None)
+        },
+        'rss_mb': {
+            'start': rss_before,
+            'peak': max(sampled_rss, default=None),
+            'end': sampled_rss[-1] if sampled_rss else None
+        },
+        'timeline': timeline
+    }
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def run(args) -> dict:
+    if args.url:
+        server, mode = running_server(args.url, args.server_pid), 'url'
+    elif args.in_process:
+        server, mode = in_process_server(), 'in-process'
+    else:
+        server, mode = spawned_server(), 'spawned'
+    with server as (base_url, pid):
+        report = asyncio.run(drive(base_url, pid, args))
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': sys.platform,
+            'cpu_count': os.cpu_count()
+        },
+        'config': {
+            'server': mode,
+            'dashboards': args.dashboards,
+            'uploaders': args.uploaders,
+            'login_burst': args.login_burst,
+            'login_interval_s': args.login_interval,
+            'duration_s': args.duration
+        },
+        **report
+    }
+
+
+def compare(report, baseline, tolerance) -> list:
+    """Lines describing each check against the baseline; regressions end with 'REGRESSION'"""
+    lines = []
+    for section, metric, higher_is_better, min_change in CHECKS:
+        value = report.get(section, {}).get(metric)
+        base = baseline.get(section, {}).get(metric)
+        if value is None or base is None:
+            continue
+        worse_by = (base - value) if higher_is_better else (value - base)
+        change = f"{value / base - 1:+.0%}" if base else "n/a"
+        line = f"  {section + '.' + metric:<28} {value:>10} (baseline {base}, {change})"
+        if worse_by > max(min_change, tolerance * abs(base)):
+            line += "  REGRESSION"
+        lines.append(line)
+    return lines
+
+
+def print_report(report, baseline=None, tolerance=0.25) -> bool:
+    """Print the report (and the baseline comparison); False if a metric regressed"""
+    config = report['config']
+    print("\n" + "=" * 80)
+    print(f"LOAD: {config['dashboards']} dashboards, {config['uploaders']} uploaders, "
+          f"{config['login_burst']} logins every {config['login_interval_s']:g}s "
+          f"for {report['elapsed_s']:.0f}s ({config['server']} server)")
+    print("=" * 80)
+    print(f"{'workload':<14} {'requests':>8} {'ok':>6} {'429':>5} {'errors':>6} {'ok/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for label, key in (('/upload_test', 'uploads'), ('/auth/login', 'logins')):
+        w = report[key]
+        print(f"{label:<14} {w['requests']:>8} {w['ok']:>6} {w['rate_limited']:>5} {w['errors']:>6} "
+              f"{w['throughput_rps']:>8.2f} {w['p50_ms'] or 0:>9.1f} {w['p99_ms'] or 0:>9.1f}")
+    d = report['dashboards']
+    print(f"\n/ws: {d['connected']} connected, {d['failed']} failed, {d['disconnected']} disconnected; "
+          f"{d['frames']} frames ({d['frames_per_s']}/s), {d['dropped_frames']} dropped; "
+          f"frame interval p50 {d['interval_p50_ms']} ms, p99 {d['interval_p99_ms']} ms")
+    lag = report['event_loop_lag']
+    print(f"Event-loop lag: p50 <= {lag['p50_ms']} ms, p99 <= {lag['p99_ms']} ms, "
+          f"max sampled {lag['max_sampled_ms']} ms")
+    rss = report['rss_mb']
+    print(f"Server RSS: {rss['start']} MB at start, {rss['peak']} MB peak, {rss['end']} MB at end")
+
+    if not baseline:
+        return True
+    print(f"\nAgainst the baseline (tolerance {tolerance:.0%}):")
+    lines = compare(report, baseline, tolerance)
+    for line in lines:
+        print(line)
+    return not any(line.endswith("REGRESSION") for line in lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the API and WebSocket stream on localhost')
+    parser.add_argument('--dashboards', type=int, default=20, help='Concurrent /ws clients')
+    parser.add_argument('--uploaders', type=int, default=2, help='Concurrent /upload_test clients')
+    parser.add_argument('--login-burst', type=int, default=10, help='Concurrent logins per burst (0: none)')
+    parser.add_argument('--login-interval', type=float, default=5.0, help='Seconds between login bursts')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds of load')
+    parser.add_argument('--sample-interval', type=float, default=1.0, help='Seconds between timeline samples')
+    parser.add_argument('--upload-file', default=UPLOAD_PATH)
+    server = parser.add_mutually_exclusive_group()
+    server.add_argument('--in-process', action='store_true', help='Serve from a thread of this process')
+    server.add_argument('--url', default=None, help='Running local server, e.g. http://127.0.0.1:8000')
+    parser.add_argument('--server-pid', type=int, default=None, help='pid of the --url server, for RSS')
+    parser.add_argument('--output', default='load.json')
+    parser.add_argument('--baseline', default=None, help=f'Report to compare with (e.g. {BASELINE_PATH})')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Relative change that counts as a regression')
+    args = parser.parse_args()
+    if args.url and urlparse(args.url).hostname not in LOCAL_HOSTS:
+        parser.error(f"--url must point at this machine ({', '.join(LOCAL_HOSTS)})")
+
+    report = run(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    passed = print_report(report, baseline, args.tolerance)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"✓ Report saved to: {args.output}")
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# ai_engine is imported as a package (as the backend does); backend modules are flat
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend'))
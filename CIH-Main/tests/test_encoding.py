@@ -0,0 +1,38 @@
+"""
+The standard-library fallback must encode like orjson, including
+non-finite floats (null, never the invalid NaN/Infinity literals).
+"""
+
+import importlib
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+import encoding
+
+
+@pytest.fixture
+def fallback(monkeypatch):
+    """encoding imported as if orjson were not installed"""
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    monkeypatch.delitem(sys.modules, "encoding")
+    module = importlib.import_module("encoding")
+    assert module.BACKEND == "json"
+    return module
+
+
+@pytest.mark.skipif(encoding.BACKEND != "orjson", reason="orjson is not installed")
+def test_fallback_matches_orjson(fallback):
+    payload = {
+        "timestamp": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        "rul": np.float64(42.5),
+        "cycle": np.int64(120),
+        "sensors": {"LPT_Outlet_Temp": float("nan"), "Fan_Speed": np.float64("inf")},
+        "history": np.array([1.0, np.nan, -np.inf]),
+        "pair": (1, float("-inf")),
+        7: [None, True, "x"]
+    }
+    assert fallback.dumps(payload) == encoding.dumps(payload)
+    assert fallback.dumps_str({"v": float("nan")}) == '{"v":null}'
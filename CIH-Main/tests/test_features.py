@@ -0,0 +1,82 @@
+"""
+Streaming features (one engine or a whole fleet) and chunked features (a
+file read in row chunks) must match the batch path bit for bit, and the
+batch path must match pandas groupby-rolling to within 1e-9.
+
+Run from CIH-Main:
+    python -m pytest -q tests
+"""
+
+import numpy as np
+import pandas as pd
+
+from ai_engine.features import (ChunkedFeatures, FleetStreamingFeatures, StreamingFeatures, first_difference,
+                                lockstep_rounds, rolling_mean, segment_bounds)
+
+
+def random_engines(seed, trials=200):
+    """(window, values, units) cases: random engine lengths, windows and sensor scales"""
+    rng = np.random.default_rng(seed)
+    for trial in range(trials):
+        window = int(rng.integers(1, 16))
+        n_sensors = int(rng.integers(1, 6))
+        lengths = rng.integers(1, 60, size=int(rng.integers(1, 8)))
+        units = np.repeat(rng.permutation(100)[:len(lengths)], lengths)
+        scale = 10.0 ** rng.uniform(-3, 4, size=n_sensors)
+        values = rng.normal(size=(len(units), n_sensors)) * scale + rng.normal(size=n_sensors) * scale * 10
+        if trial % 5 == 0:
+            values = np.round(values)  # integer-valued sensors
+        yield window, values, units
+
+
+def batch_features(values, units, window):
+    return np.hstack([values, rolling_mean(values, units, window), first_difference(values, units)])
+
+
+def test_batch_matches_pandas():
+    for window, values, units in random_engines(0):
+        frame = pd.DataFrame(values, columns=[f"c{j}" for j in range(values.shape[1])])
+        frame['unit_nr'] = units
+        grouped = frame.groupby('unit_nr', sort=False)[list(frame.columns[:-1])]
+        reference_mean = grouped.rolling(window=window, min_periods=1).mean().reset_index(drop=True).to_numpy()
+        reference_diff = grouped.diff().fillna(0).to_numpy()
+        scale = np.abs(values).max()
+        np.testing.assert_allclose(rolling_mean(values, units, window), reference_mean, rtol=1e-9, atol=1e-9 * scale)
+        np.testing.assert_allclose(first_difference(values, units), reference_diff, rtol=1e-12, atol=0)
+
+
+def test_streaming_identical_to_batch():
+    for window, values, units in random_engines(1):
+        streamed = np.empty((len(units), 3 * values.shape[1]))
+        for a, b in zip(*segment_bounds(units)):
+            state = StreamingFeatures(values.shape[1], window, derivatives=True)
+            for i in range(a, b):
+                streamed[i] = state.update(values[i])
+        assert np.array_equal(batch_features(values, units, window), streamed)
+
+
+def test_fleet_identical_to_batch():
+    rng = np.random.default_rng(2)
+    for window, values, units in random_engines(2):
+        # The same readings interleaved across engines, as a fleet would send
+        # them: random arrival times, increasing within each engine
+        arrival_time = rng.random(len(units))
+        for a, b in zip(*segment_bounds(units)):
+            arrival_time[a:b] = np.cumsum(arrival_time[a:b])
+        interleaved = np.argsort(arrival_time, kind='stable')
+        fleet = FleetStreamingFeatures(values.shape[1], window, derivatives=True, capacity=2)
+        rows = np.empty((len(units), 3 * values.shape[1]))
+        for idx in lockstep_rounds(units[interleaved]):
+            rows[interleaved[idx]] = fleet.update_batch(units[interleaved[idx]], values[interleaved[idx]])
+        assert np.array_equal(batch_features(values, units, window), rows)
+
+
+def test_chunked_identical_to_batch():
+    rng = np.random.default_rng(3)
+    for window, values, units in random_engines(3):
+        # Random row chunks: engines split across chunks, empty chunks included
+        chunked = ChunkedFeatures([f"c{j}" for j in range(values.shape[1])], window)
+        cuts = np.sort(rng.integers(0, len(units) + 1, size=int(rng.integers(0, 6))))
+        rows = [np.hstack([values[a:b], *chunked.transform(values[a:b], units[a:b])])
+                for a, b in zip(np.r_[0, cuts], np.r_[cuts, len(units)])]
+        assert np.array_equal(batch_features(values, units, window), np.vstack(rows))
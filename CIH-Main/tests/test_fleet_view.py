@@ -0,0 +1,30 @@
+"""
+The incrementally maintained fleet summary must equal one recomputed from
+every engine's latest prediction.
+"""
+
+import numpy as np
+
+from fleet_view import FleetView
+
+
+def test_fleet_summary_matches_recomputation():
+    rng = np.random.default_rng(7)
+    view = FleetView()
+    latest = {}
+
+    def status_of(rul):
+        return "Critical" if rul < 20 else "Warning" if rul < 50 else "Healthy"
+
+    for i in range(5_000):
+        engine_id, rul = int(rng.integers(0, 500)), round(float(rng.uniform(0, 125)), 2)
+        view.update(engine_id, i, rul, status_of(rul), [])
+        latest[engine_id] = rul
+
+    summary = view.summary(10)
+    counts = {}
+    for rul in latest.values():
+        counts[status_of(rul)] = counts.get(status_of(rul), 0) + 1
+    lowest = sorted((rul, e) for e, rul in latest.items())[:10]
+    assert summary["status_counts"] == counts
+    assert [(x["rul"], x["engine_id"]) for x in summary["lowest_rul"]] == lowest
@@ -0,0 +1,59 @@
+"""
+SQLiteState sums counters over worker processes and expires the gauges of
+a worker that stopped publishing; SharedUserStatus changes reach every
+worker of the same deployment and no other.
+"""
+
+import multiprocessing
+
+from shared_state import SharedUserStatus, SQLiteState
+
+COUNTERS, GAUGES = ("total_requests",), ("active_connections",)
+
+
+def _count_requests(args):
+    path, n = args
+    state = SQLiteState(path, COUNTERS, GAUGES, publish_interval=0.05, deployment="d")
+    state.start()
+    for _ in range(n):
+        state.incr("total_requests")
+    state.close()
+    return n
+
+
+def test_sqlite_state_sums_worker_processes(tmp_path):
+    path = str(tmp_path / "state.db")
+    with multiprocessing.get_context("spawn").Pool(3) as pool:
+        sent = sum(pool.map(_count_requests, [(path, 500)] * 3))
+    reader = SQLiteState(path, COUNTERS, GAUGES, deployment="d")
+    assert reader.get("total_requests") == sent and reader.get("active_connections") == 0
+    assert SQLiteState(path, COUNTERS, GAUGES, deployment="other").get("total_requests") == 0
+
+
+def test_sqlite_state_expires_silent_workers_gauges(tmp_path):
+    path = str(tmp_path / "state.db")
+    now = [1_000.0]
+    clock = lambda: now[0]  # noqa: E731
+    crashed = SQLiteState(path, COUNTERS, GAUGES, publish_interval=1.0, deployment="d", worker=1, clock=clock)
+    reader = SQLiteState(path, COUNTERS, GAUGES, publish_interval=1.0, deployment="d", worker=2, clock=clock)
+    crashed.incr("total_requests", 5)
+    crashed.incr("active_connections", 3)
+    reader.incr("total_requests", 2)
+    reader.incr("active_connections", 1)
+    crashed.publish()
+    reader.publish()
+    assert reader.get("total_requests") == 7 and reader.get("active_connections") == 4
+
+    now[0] += reader.stale_after + 1
+    reader.publish()
+    assert reader.get("total_requests") == 7 and reader.get("active_connections") == 1
+
+
+def test_user_status_shared_within_deployment(tmp_path):
+    path = str(tmp_path / "state.db")
+    worker_a, worker_b = SharedUserStatus(path, "d"), SharedUserStatus(path, "d")
+    assert worker_b.get("engineer") is None
+    assert worker_a.set_active("engineer", False) == 1
+    assert worker_b.get("engineer") == (False, 1)
+    assert worker_b.set_active("engineer", True) == 2 and worker_a.get("engineer") == (True, 2)
+    assert SharedUserStatus(path, "other").get("engineer") is None
@@ -0,0 +1,63 @@
+"""
+Downsampling keeps the points it promises: min-max the extremes of every
+bucket (ignoring missing values), LTTB exactly n_out points in order
+including both endpoints, and both an isolated spike.
+"""
+
+import numpy as np
+import pytest
+
+from timeseries_store import downsample, lttb, minmax_buckets
+
+
+def random_series(rng, n, nan_share=0.0):
+    x = np.cumsum(rng.uniform(0.1, 2.0, size=n))
+    y = np.cumsum(rng.normal(size=n))
+    y[rng.random(n) < nan_share] = np.nan
+    return x, y
+
+
+def test_minmax_keeps_each_buckets_extremes():
+    rng = np.random.default_rng(5)
+    for trial in range(300):
+        n, n_out = int(rng.integers(10, 400)), int(rng.integers(2, 60))
+        x, y = random_series(rng, n, nan_share=rng.choice([0.0, 0.2, 0.9]))
+        kept = minmax_buckets(x, y, n_out)
+        assert np.array_equal(kept, np.unique(kept))
+        if n <= n_out:
+            assert np.array_equal(kept, np.arange(n))
+            continue
+        n_buckets = max(1, n_out // 2)
+        bucket = np.minimum(((x - x[0]) / (x[-1] - x[0]) * n_buckets).astype(np.intp), n_buckets - 1)
+        for b in np.unique(bucket):
+            members = np.flatnonzero(bucket == b)
+            values = y[members]
+            mine = kept[bucket[kept] == b]
+            if np.isnan(values).all():
+                assert len(mine) == 1  # one point marks the gap
+                continue
+            assert len(mine) <= 2 and not np.isnan(y[mine]).any()
+            assert np.nanmin(values) == y[mine].min() and np.nanmax(values) == y[mine].max()
+
+
+def test_lttb_keeps_endpoints_in_order():
+    rng = np.random.default_rng(6)
+    for trial in range(100):
+        n, n_out = int(rng.integers(10, 2000)), int(rng.integers(3, 300))
+        x, y = random_series(rng, n, nan_share=rng.choice([0.0, 0.1]))
+        kept = lttb(x, y, n_out)
+        if n <= n_out:
+            assert np.array_equal(kept, np.arange(n))
+            continue
+        assert len(kept) == n_out and kept[0] == 0 and kept[-1] == n - 1
+        assert (np.diff(kept) > 0).all()
+        # Missing values compare as the series mean
+        assert np.array_equal(kept, lttb(x, np.nan_to_num(y, nan=np.nanmean(y)), n_out))
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_downsampling_keeps_isolated_spike(method):
+    x = np.arange(20_000, dtype=np.float64)
+    y = np.sin(x / 500)
+    y[3456] = 50
+    assert 3456 in downsample(x, y, 300, method)